@@ -0,0 +1,84 @@
+import os
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+DEFAULT_BACKEND = "decimal"
+BACKEND_NAMES = ("decimal", "float", "fraction")
+
+class Backend(NamedTuple):
+    """A numeric type that operands are parsed into, and so the type every operation computes in."""
+    name: str
+    parse: Callable[[Any], Any]  # Raises InvalidOperation for text that is not a number
+
+def _strict(number_type: type) -> Callable[[Any], Any]:
+    """Wraps a number constructor so that bad input raises InvalidOperation, exactly as Decimal does."""
+    def parse(value):
+        try:
+            return number_type(value)
+        except (TypeError, ValueError) as e:
+            raise InvalidOperation(f"Invalid number: {value}") from e
+    parse.__name__ = number_type.__name__
+    return parse
+
+def _load(name: str) -> Backend:
+    if name == "decimal":
+        return Backend(name, Decimal)  # Decimal already raises InvalidOperation, and needs no wrapper
+    if name == "float":
+        return Backend(name, _strict(float))
+    if name == "fraction":
+        from fractions import Fraction  # pylint: disable=import-outside-toplevel
+        return Backend(name, _strict(Fraction))
+    raise ValueError(f"Unknown backend: {name} (choose from {', '.join(BACKEND_NAMES)})")
+
+_loaded: Dict[str, Backend] = {}
+
+def load_backend(name: str) -> Backend:
+    """
+    Returns a backend by name without making it the active one.
+
+    Args:
+        name (str): 'decimal' (exact decimal arithmetic at the context precision, the
+            default), 'float' (binary floating point, fastest) or 'fraction' (exact
+            rationals; only non-integral powers fall back to float).
+
+    Raises:
+        ValueError: If there is no backend by that name.
+    """
+    name = name.strip().lower()
+    backend = _loaded.get(name)
+    if backend is None:
+        backend = _loaded[name] = _load(name)
+    return backend
+
+# Backend of this process; main() sets it from --backend or CALC_BACKEND
+_active = load_backend(DEFAULT_BACKEND)
+
+def get_backend() -> Backend:
+    """Returns the backend used by this process."""
+    return _active
+
+def set_backend(name: str) -> Backend:
+    """Makes the named backend the one this process parses operands with, and returns it."""
+    global _active  # pylint: disable=global-statement
+    _active = load_backend(name)
+    return _active
+
+def backend_from_environment() -> str:
+    """Returns the backend named by CALC_BACKEND, 'decimal' when unset."""
+    return os.getenv("CALC_BACKEND") or DEFAULT_BACKEND
+
+def parse_stored(*texts: str) -> Tuple[Any, ...]:
+    """
+    Parses the operands of one calculation read back from a history store.
+
+    Stores may hold calculations written under any backend. When an operand is a
+    fraction ('1/3'), which no other backend can parse, all of the calculation's
+    operands are read back as fractions so they can still be computed together;
+    otherwise they are parsed with the active backend.
+    """
+    parse = _active.parse
+    for text in texts:
+        if "/" in text:
+            parse = load_backend("fraction").parse
+            break
+    return tuple(map(parse, texts))
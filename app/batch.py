@@ -0,0 +1,150 @@
+import sys
+import time
+from collections import deque
+from decimal import InvalidOperation
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from app.backends import get_backend
+from app.calculation import Calculation
+from app.evaluation import refuse_operands
+from app.operations import operations
+from app.pool import CalculationPool
+from app.reductions import reduce_values, reductions
+
+Record = Tuple[int, str]  # (line number, raw line)
+
+class BatchSummary(NamedTuple):
+    """Throughput and latency figures for one batch run."""
+    records: int
+    errors: int
+    elapsed: float
+    chunk_latencies: List[float]
+
+    @property
+    def throughput(self) -> float:
+        """Records evaluated per second."""
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, percentile: float) -> float:
+        """Returns the given percentile (0-100) of the per-chunk round-trip latency in seconds."""
+        if not self.chunk_latencies:
+            return 0.0
+        ordered = sorted(self.chunk_latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    def report(self) -> str:
+        """Formats the summary for printing at the end of a run."""
+        return (f"Processed {self.records} records ({self.errors} errors) in {self.elapsed:.3f}s: "
+                f"{self.throughput:,.0f} records/s, chunk latency p50={self.latency(50) * 1000:.2f}ms "
+                f"p99={self.latency(99) * 1000:.2f}ms max={self.latency(100) * 1000:.2f}ms")
+
+def read_records(stream: TextIO) -> Iterator[Record]:
+    """Yields (line number, text) for every non-blank line of the stream."""
+    for line_no, line in enumerate(stream, start=1):
+        text = line.strip()
+        if text:
+            yield line_no, text
+
+def chunked(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    """Groups records into lists of at most size items without reading ahead further."""
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def evaluate_record(line_no: int, text: str) -> str:
+    """
+    Evaluates one '<number1> <number2> <operation>' record (or three numbers for modpow,
+    or any number of them for a reduction such as sum) into an output row.
+
+    Errors never propagate: they become rows of the form '<line>\\terror\\t<message>'.
+
+    Returns:
+        str: '<line>\\tok\\t<result>' or '<line>\\terror\\t<message>'.
+    """
+    parts = text.split()
+    if len(parts) < 3:
+        return f"{line_no}\terror\tMalformed record: expected <number1> <number2> <operation>"
+
+    *operands, operation = parts
+    name = operation.lower()
+    refused = refuse_operands(name, len(operands))
+    if refused is not None:
+        return f"{line_no}\terror\t{refused[0]}"
+    func = operations.get(name)
+    reduction = reductions.get(name) if func is None else None
+    try:
+        parse = get_backend().parse
+        values = [parse(operand) for operand in operands]
+        if reduction is not None:
+            result = reduce_values(name, values)
+        else:
+            result = Calculation(values[0], values[1], func, *values[2:]).perform()
+    except ZeroDivisionError:
+        return f"{line_no}\terror\tCannot divide by zero"
+    except InvalidOperation:
+        return f"{line_no}\terror\tInvalid number input: {', '.join(operands[:-1])} or {operands[-1]} is not a valid number."
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return f"{line_no}\terror\t{type(e).__name__}: {e}"
+    return f"{line_no}\tok\t{result}"
+
+def evaluate_chunk(chunk: List[Record]) -> List[str]:
+    """Evaluates a chunk of records in input order; runs inside pool workers."""
+    return [evaluate_record(line_no, text) for line_no, text in chunk]
+
+def run_batch(records: Iterable[Record], output: TextIO, pool: Optional[CalculationPool] = None,
+              chunk_size: int = 1000, max_in_flight: Optional[int] = None) -> BatchSummary:
+    """
+    Streams records through the pool and writes the output rows in input order.
+
+    At most max_in_flight chunks are queued on the pool at any time, so memory stays
+    bounded no matter how large the input is.
+
+    Args:
+        records (Iterable): (line number, text) pairs, typically from read_records().
+        output (TextIO): Where output rows are written.
+        pool (CalculationPool): Pool to evaluate chunks on; None evaluates in this process.
+        chunk_size (int): Records sent to a worker at once.
+        max_in_flight (int): Chunks queued at once, defaults to twice the pool size.
+
+    Returns:
+        BatchSummary: Record and error counts with throughput and chunk latencies.
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * pool.processes if pool is not None else 1
+    in_flight: deque = deque()
+    latencies: List[float] = []
+    counts = [0, 0]  # records, errors
+
+    def write_oldest():
+        handle, submitted, chunk = in_flight.popleft()
+        try:
+            rows = handle.get() if pool is not None else handle
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # The whole chunk failed, e.g. its worker ran out of its budget or died; the other chunks go on
+            rows = [f"{line_no}\terror\t{type(e).__name__}: {e}" for line_no, _ in chunk]
+        latencies.append(time.perf_counter() - submitted)
+        counts[0] += len(rows)
+        counts[1] += sum(1 for row in rows if "\terror\t" in row)
+        output.write("\n".join(rows))
+        output.write("\n")
+
+    started = time.perf_counter()
+    for chunk in chunked(records, chunk_size):
+        submitted = time.perf_counter()
+        handle = pool.dispatch(evaluate_chunk, (chunk,)) if pool is not None else evaluate_chunk(chunk)
+        in_flight.append((handle, submitted, chunk))
+        if len(in_flight) >= max_in_flight:
+            write_oldest()
+    while in_flight:
+        write_oldest()
+    output.flush()
+    return BatchSummary(counts[0], counts[1], time.perf_counter() - started, latencies)
+
+def run_batch_file(path: str, output: TextIO = sys.stdout, **kwargs) -> BatchSummary:
+    """Runs run_batch() over a file, or over stdin when path is '-'."""
+    if path == "-":
+        return run_batch(read_records(sys.stdin), output, **kwargs)
+    with open(path, encoding="utf-8") as stream:
+        return run_batch(read_records(stream), output, **kwargs)
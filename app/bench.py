@@ -0,0 +1,242 @@
+import contextlib
+import fnmatch
+import json
+import platform
+import sys
+import time
+from decimal import Decimal
+from typing import Callable, ContextManager, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from app.calculation import Calculation
+from app.calculations import Calculations, IndexedHistory
+from app.commands import Command, CommandHandler
+from app.operations import operations
+
+BASELINE_VERSION = 1
+# A benchmark is slower than its baseline when its median grows by more than this fraction
+DEFAULT_THRESHOLD = 0.10
+# Entries in the history for the 'history.*' benchmarks
+DEFAULT_SCALE = 100_000
+
+OPERANDS = (Decimal("123.456"), Decimal("7.89"))
+POWER_OPERANDS = (Decimal("1.0001"), Decimal("25"))
+MODPOW_OPERANDS = (Decimal(2 ** 127 - 3), Decimal(65537), Decimal(2 ** 127 - 1))
+
+# Name -> setup that yields the callable to time, and cleans up when the benchmark is done
+BENCHMARKS: Dict[str, Callable[[int], ContextManager[Callable[[], object]]]] = {}
+
+def benchmark(name: str):
+    """Registers a generator function as the setup of a named benchmark."""
+    def register(setup):
+        BENCHMARKS[name] = contextlib.contextmanager(setup)
+        return setup
+    return register
+
+class BenchmarkResult(NamedTuple):
+    """Timings of one benchmark, in nanoseconds per call."""
+    name: str
+    median_ns: float
+    best_ns: float
+    calls: int
+
+class Comparison(NamedTuple):
+    """A benchmark result set against its baseline."""
+    name: str
+    baseline_ns: float
+    current_ns: float
+
+    @property
+    def ratio(self) -> float:
+        """Current median over baseline median; above 1 means slower."""
+        return self.current_ns / self.baseline_ns if self.baseline_ns else float("inf")
+
+    def regressed(self, threshold: float = DEFAULT_THRESHOLD) -> bool:
+        """True when the benchmark got slower by more than threshold."""
+        return self.ratio > 1 + threshold
+
+def _operation_benchmark(name: str, operands) -> None:
+    def setup(_scale):
+        calculation = Calculation(operands[0], operands[1], operations[name], *operands[2:])
+        yield calculation.perform
+    benchmark(f"operation.{name}")(setup)
+
+_operation_benchmark("add", OPERANDS)
+_operation_benchmark("subtract", OPERANDS)
+_operation_benchmark("multiply", OPERANDS)
+_operation_benchmark("divide", OPERANDS)
+_operation_benchmark("modulus", OPERANDS)  # Plugin
+_operation_benchmark("power", POWER_OPERANDS)  # Plugin
+_operation_benchmark("modpow", MODPOW_OPERANDS)  # Plugin
+
+@contextlib.contextmanager
+def _history(store) -> Iterator[None]:
+    saved, Calculations.history = Calculations.history, store
+    try:
+        yield
+    finally:
+        Calculations.history = saved
+
+def _filled_history(scale: int, capacity: Optional[int] = None) -> IndexedHistory:
+    store = IndexedHistory(capacity)
+    names = ["add", "subtract", "multiply", "divide", "modulus", "power"]
+    for i in range(scale):
+        store.append(Calculation(Decimal(i), Decimal(2), operations[names[i % len(names)]]))
+    return store
+
+@benchmark("history.add_calculation")
+def _add_calculation(scale: int):
+    calculation = Calculation(*OPERANDS, operations["add"])
+    with _history(_filled_history(scale, capacity=scale)):  # Full, so every append also evicts
+        yield lambda: Calculations.add_calculation(calculation)
+
+@benchmark("history.find_by_operation")
+def _find_by_operation(scale: int):
+    with _history(_filled_history(scale)):
+        yield lambda: Calculations.find_by_operation("divide")  # Returns a sixth of the entries
+
+class _NoOpCommand(Command):
+    def execute(self):
+        pass
+
+@benchmark("dispatch.command_handler")
+def _command_dispatch(_scale: int):
+    handler = CommandHandler()
+    for i in range(100):
+        handler.register_command(f"command{i}", _NoOpCommand())
+    handler.register_command("greet", _NoOpCommand())
+    yield lambda: handler.execute_command("greet")
+
+@benchmark("end_to_end.evaluate")
+def _evaluate_in_process(_scale: int):
+    from app.evaluation import evaluate  # pylint: disable=import-outside-toplevel
+    with _history(IndexedHistory(capacity=1000)):
+        yield lambda: evaluate("123.456", "7.89", "multiply")
+
+@benchmark("end_to_end.execute_command")
+def _execute_on_pool(_scale: int):
+    from app.pool import CalculationPool  # pylint: disable=import-outside-toplevel
+    with CalculationPool(processes=1) as pool:
+        pool.run("1", "1", "add")  # The worker is started and warm before timing begins
+        yield lambda: pool.run("123.456", "7.89", "multiply")
+
+def _backend_benchmarks(backend: str) -> None:
+    def operation(_scale):
+        from app.backends import load_backend  # pylint: disable=import-outside-toplevel
+        parse = load_backend(backend).parse
+        calculation = Calculation(parse("123.456"), parse("7.89"), operations["divide"])
+        yield calculation.perform
+
+    def evaluate(_scale):
+        from app.backends import get_backend, set_backend  # pylint: disable=import-outside-toplevel
+        from app.evaluation import evaluate as evaluate_request  # pylint: disable=import-outside-toplevel
+        saved = get_backend().name
+        set_backend(backend)
+        try:
+            with _history(IndexedHistory(capacity=1000)):
+                yield lambda: evaluate_request("123.456", "7.89", "divide")
+        finally:
+            set_backend(saved)
+
+    benchmark(f"backend.{backend}.divide")(operation)
+    benchmark(f"backend.{backend}.evaluate")(evaluate)  # Parsing and formatting included
+
+for _backend in ("decimal", "float", "fraction"):
+    _backend_benchmarks(_backend)
+
+@benchmark("process.pool_start")
+def _pool_start(_scale: int):
+    from app.pool import CalculationPool  # pylint: disable=import-outside-toplevel
+
+    def start_and_stop():
+        with CalculationPool(processes=1) as pool:
+            pool.run("1", "1", "add")
+    yield start_and_stop
+
+def _calls_for(func: Callable[[], object], min_time: float) -> int:
+    """Doubles the number of calls per round until a round takes at least min_time seconds."""
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        if time.perf_counter() - started >= min_time or calls >= 1 << 20:
+            return calls
+        calls *= 2
+
+def measure(name: str, func: Callable[[], object], repeat: int = 7, min_time: float = 0.02) -> BenchmarkResult:
+    """
+    Times a callable in several rounds and reports nanoseconds per call.
+
+    Args:
+        name (str): Name to report the result under.
+        func (Callable): The code to time, called without arguments.
+        repeat (int): Number of timed rounds.
+        min_time (float): Seconds each round should take at least.
+
+    Returns:
+        BenchmarkResult: Median and best time per call over the rounds.
+    """
+    calls = _calls_for(func, min_time)
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        rounds.append((time.perf_counter_ns() - started) / calls)
+    rounds.sort()
+    return BenchmarkResult(name, rounds[len(rounds) // 2], rounds[0], calls)
+
+def run_benchmarks(pattern: str = "*", repeat: int = 7, min_time: float = 0.02,
+                   scale: int = DEFAULT_SCALE) -> List[BenchmarkResult]:
+    """Runs the registered benchmarks whose name matches a glob pattern."""
+    results = []
+    for name, setup in BENCHMARKS.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            with setup(scale) as func:
+                results.append(measure(name, func, repeat, min_time))
+    return results
+
+def save_baseline(results: Sequence[BenchmarkResult], path: str) -> None:
+    """Writes results as a JSON baseline, along with the interpreter and machine they came from."""
+    document = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": sys.platform,
+        "results": {result.name: result._asdict() for result in results},
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=2)
+
+def load_baseline(path: str) -> Dict[str, BenchmarkResult]:
+    """Reads a baseline written by save_baseline()."""
+    with open(path, encoding="utf-8") as file:
+        document = json.load(file)
+    if document.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version in {path}: {document.get('version')}")
+    return {name: BenchmarkResult(**result) for name, result in document["results"].items()}
+
+def compare(results: Sequence[BenchmarkResult], baseline: Dict[str, BenchmarkResult]) -> List[Comparison]:
+    """Pairs each result with its baseline by name; benchmarks missing from the baseline are left out."""
+    return [Comparison(result.name, baseline[result.name].median_ns, result.median_ns)
+            for result in results if result.name in baseline]
+
+def _format_ns(ns: float) -> str:
+    for unit, size in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= size:
+            return f"{ns / size:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+def report(results: Sequence[BenchmarkResult], comparisons: Sequence[Comparison] = (),
+           threshold: float = DEFAULT_THRESHOLD) -> str:
+    """Formats results as a table, with the change against the baseline when there is one."""
+    compared = {comparison.name: comparison for comparison in comparisons}
+    width = max((len(result.name) for result in results), default=10)
+    lines = [f"{'benchmark':<{width}}  {'median':>10}  {'best':>10}  {'calls':>8}  change"]
+    for result in results:
+        line = f"{result.name:<{width}}  {_format_ns(result.median_ns):>10}  {_format_ns(result.best_ns):>10}  {result.calls:>8}"
+        comparison = compared.get(result.name)
+        if comparison is not None:
+            line += f"  {comparison.ratio - 1:+.1%}" + ("  REGRESSION" if comparison.regressed(threshold) else "")
+        lines.append(line)
+    return "\n".join(lines)
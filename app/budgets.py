@@ -0,0 +1,132 @@
+import os
+import signal
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+# Seconds a task may overrun its time budget before the parent kills its worker. Within
+# them, a calculation that is running Python code stops by itself with OperationTimeout.
+GRACE_SECONDS = 1.0
+# Slots of the table in which workers note the budgeted task they are running
+WATCH_SLOTS = 1 << 14
+
+class OperationTimeout(TimeoutError):
+    """Raised in a calculation that ran out of its time budget."""
+
+class Budget(NamedTuple):
+    """Limits for one task on the pool; None leaves a limit off."""
+    seconds: Optional[float] = None
+    memory_bytes: Optional[int] = None
+
+def parse_limits(text: str) -> Dict[str, float]:
+    """
+    Parses per-operation limits such as 'power=2,*=10', where '*' applies to every other task.
+
+    Raises:
+        ValueError: If an entry is not name=number or a limit is not positive.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        name, separator, value = entry.partition("=")
+        if not separator or not name.strip() or float(value) <= 0:
+            raise ValueError(f"Expected name=limit with a positive limit, got {entry!r}")
+        limits[name.strip().lower()] = float(value)
+    return limits
+
+def budgets_from_environment() -> Dict[str, Budget]:
+    """Builds per-operation budgets from CALC_POOL_TIMEOUTS (seconds) and CALC_POOL_MEMORY_MB, e.g. 'power=2,*=30'."""
+    seconds = parse_limits(os.getenv("CALC_POOL_TIMEOUTS", ""))
+    megabytes = parse_limits(os.getenv("CALC_POOL_MEMORY_MB", ""))
+    budgets = {}
+    for name in {*seconds, *megabytes}:
+        memory = megabytes.get(name, megabytes.get("*"))
+        budgets[name] = Budget(seconds.get(name, seconds.get("*")), int(memory * (1 << 20)) if memory else None)
+    return budgets
+
+def _limit_memory(extra: int) -> Optional[Tuple[int, int]]:
+    """Caps the address space at its current size plus extra bytes and returns the previous limits."""
+    import resource  # pylint: disable=import-outside-toplevel  # Unix only, and only with a memory budget
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            used = int(statm.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        return None  # The address space cannot be measured here, so it is left unlimited
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    limit = used + extra
+    if previous[1] != resource.RLIM_INFINITY:
+        limit = min(limit, previous[1])
+    resource.setrlimit(resource.RLIMIT_AS, (limit, previous[1]))
+    return previous
+
+@contextmanager
+def enforced(budget: Budget) -> Iterator[None]:
+    """
+    Runs the body of the with statement within a budget, in a worker's main thread.
+
+    Once budget.seconds have passed, SIGALRM raises OperationTimeout in whatever Python
+    code is running, which cancels a calculation stuck in a loop without losing the
+    worker. Code that does not return to the interpreter, such as a single huge integer
+    power, cannot be interrupted this way; the parent kills its worker after the grace
+    period. Allocations beyond budget.memory_bytes more than the worker uses already
+    raise MemoryError.
+    """
+    previous_memory = _limit_memory(budget.memory_bytes) if budget.memory_bytes else None
+    timed = budget.seconds is not None and hasattr(signal, "setitimer")  # No interval timers on Windows
+    running = True
+
+    def expired(_signum, _frame):
+        if running:  # A timer that fires once the body is done must not fail the cleanup below
+            raise OperationTimeout(f"it took longer than {budget.seconds:g}s")
+
+    if timed:
+        previous_handler = signal.signal(signal.SIGALRM, expired)
+        signal.setitimer(signal.ITIMER_REAL, budget.seconds)
+    try:
+        yield
+    finally:
+        running = False
+        try:
+            if timed:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        finally:
+            try:
+                if timed:
+                    signal.signal(signal.SIGALRM, previous_handler)
+            finally:
+                if previous_memory is not None:
+                    import resource  # pylint: disable=import-outside-toplevel
+                    resource.setrlimit(resource.RLIMIT_AS, previous_memory)
+
+class TaskWatch:
+    """
+    Shared table in which workers note which budgeted task they run, in which process and since when.
+
+    Each task has a slot of its own, its number modulo WATCH_SLOTS. The parent reads
+    the table to find tasks that overran their budget and the workers running them.
+    """
+
+    def __init__(self, context):
+        """Allocates the table with a multiprocessing context."""
+        self._tasks = context.RawArray("q", WATCH_SLOTS)
+        self._pids = context.RawArray("q", WATCH_SLOTS)
+        self._starts = context.RawArray("d", WATCH_SLOTS)
+
+    def begin(self, task: int) -> None:
+        """Notes, in a worker, that it starts a task."""
+        slot = task % WATCH_SLOTS
+        self._pids[slot] = os.getpid()
+        self._starts[slot] = time.monotonic()  # The same clock in every process
+        self._tasks[slot] = task  # Last, so the parent never sees the task with another's start
+
+    def end(self, task: int) -> None:
+        """Notes, in a worker, that it is done with a task."""
+        slot = task % WATCH_SLOTS
+        if self._tasks[slot] == task:
+            self._tasks[slot] = 0
+
+    def running(self, task: int) -> Optional[Tuple[float, int]]:
+        """Returns when a task started and the pid of its worker, or None unless it is running."""
+        slot = task % WATCH_SLOTS
+        if self._tasks[slot] != task:
+            return None
+        return self._starts[slot], self._pids[slot]
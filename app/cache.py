@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+from decimal import Decimal, getcontext
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from app.calculation import Calculation
+
+HITS, MISSES, EVICTIONS = range(3)
+
+class CacheStats(NamedTuple):
+    """Counters describing how well the result cache is doing."""
+    hits: int
+    misses: int
+    evictions: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+def _context_key() -> Tuple:
+    """Returns the parts of the active decimal context that can change a result."""
+    ctx = getcontext()
+    return (ctx.prec, ctx.rounding, ctx.Emin, ctx.Emax, ctx.clamp,
+            tuple(signal.__name__ for signal, trapped in ctx.traps.items() if trapped))
+
+class ResultCache:
+    """
+    LRU cache of operation results keyed on (operation, a, b, operand type, decimal context).
+
+    Operands are keyed by their type and string form so that Decimal('1.0') and
+    Decimal('1'), which are equal but give differently formatted results, never share
+    an entry, and neither do Decimal('2') and Fraction(2) from different backends.
+    Errors are not cached. Counters may live in shared memory (a multiprocessing Array
+    with a lock) so that caches in several worker processes report combined figures.
+    Behind the in-memory entries there may be a PersistentCache file, which keeps
+    expensive results across runs; its hits count as hits.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 8 * 1024 * 1024,
+                 enabled_operations: Optional[Iterable[str]] = None, counters=None):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_entries (int): Entries kept before the least recently used one is evicted.
+            max_bytes (int): Approximate memory budget for keys and results.
+            enabled_operations (Iterable[str]): Operations to cache, None for all of them.
+            counters: Mutable sequence of three ints (hits, misses, evictions) to count into.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled_operations = set(enabled_operations) if enabled_operations is not None else None
+        self.counters = counters if counters is not None else [0, 0, 0]
+        self._lock = counters.get_lock() if hasattr(counters, "get_lock") else None
+        self._entries: "OrderedDict[Tuple, Tuple[Decimal, int]]" = OrderedDict()
+        self.bytes = 0
+        self.store = None  # PersistentCache behind the in-memory entries, if any
+
+    @classmethod
+    def from_settings(cls, settings: dict, counters=None) -> "ResultCache":
+        """
+        Creates a cache from settings such as settings_from_environment() returns.
+
+        Args:
+            settings (dict): ResultCache arguments, and under 'persistent' PersistentCache
+                arguments for a cache file behind the cache.
+            counters: Mutable sequence of three ints (hits, misses, evictions) to count into.
+        """
+        settings = dict(settings)
+        persistent = settings.pop("persistent", None)
+        cache = cls(**settings, counters=counters)
+        if persistent is not None:
+            from app.persistent_cache import PersistentCache  # pylint: disable=import-outside-toplevel
+            cache.store = PersistentCache(**persistent)
+        return cache
+
+    def enable(self, operation: str) -> None:
+        """Starts caching an operation."""
+        if self.enabled_operations is not None:
+            self.enabled_operations.add(operation)
+
+    def disable(self, operation: str) -> None:
+        """Stops caching an operation; its existing entries age out normally."""
+        if self.enabled_operations is None:
+            from app.operations import operations  # pylint: disable=import-outside-toplevel
+            self.enabled_operations = set(operations)
+        self.enabled_operations.discard(operation)
+
+    def is_enabled(self, operation: str) -> bool:
+        """Returns True if results of the operation are cached."""
+        return self.enabled_operations is None or operation in self.enabled_operations
+
+    def _count(self, counter: int) -> None:
+        if self._lock is None:
+            self.counters[counter] += 1
+        else:
+            with self._lock:
+                self.counters[counter] += 1
+
+    def perform(self, operation: str, calculation: Calculation) -> Decimal:
+        """
+        Returns the result of a calculation, from the cache when possible.
+
+        Args:
+            operation (str): Registry name of the calculation's operation.
+            calculation (Calculation): The calculation to perform on a miss.
+
+        Returns:
+            Decimal: The result of the calculation.
+        """
+        if not self.is_enabled(operation):
+            return calculation.perform()
+        calculation.result = self._lookup(operation, calculation)
+        return calculation.result
+
+    def _lookup(self, operation: str, calculation: Calculation) -> Decimal:
+        key = (operation, str(calculation.a), str(calculation.b), type(calculation.a), _context_key())
+        if calculation.c is not None:
+            key += (str(calculation.c),)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self._count(HITS)
+            return entry[0]
+
+        store = self.store
+        result = store.get(calculation.operation, key) if store is not None else None
+        if result is not None:
+            self._count(HITS)
+        else:
+            self._count(MISSES)
+            started = time.perf_counter()
+            result = calculation.perform()
+            if store is not None:
+                store.put(calculation.operation, key, result, time.perf_counter() - started)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key: Tuple, result: Decimal) -> None:
+        size = sys.getsizeof(result) + sum(sys.getsizeof(part) for part in key[:3])
+        if size <= self.max_bytes:
+            self._entries[key] = (result, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self._count(EVICTIONS)
+
+    def stats(self) -> CacheStats:
+        """Returns the hit, miss and eviction counters."""
+        return CacheStats(*self.counters[:3])
+
+    def clear(self) -> None:
+        """Drops every entry, in the cache file too; the counters are kept."""
+        self._entries.clear()
+        self.bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def settings_from_environment() -> Optional[dict]:
+    """
+    Reads CALC_CACHE, CALC_CACHE_SIZE, CALC_CACHE_BYTES and CALC_CACHE_OPS; None when caching is off.
+
+    CALC_CACHE_FILE names a persistent cache file, and turns caching on by itself;
+    CALC_CACHE_FILE_SIZE caps its entries and CALC_CACHE_FILE_MIN_US sets the shortest
+    computation, in microseconds, whose result is worth storing in it.
+    """
+    path = os.getenv("CALC_CACHE_FILE")
+    if not path and os.getenv("CALC_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    settings = {}
+    if os.getenv("CALC_CACHE_SIZE"):
+        settings["max_entries"] = int(os.environ["CALC_CACHE_SIZE"])
+    if os.getenv("CALC_CACHE_BYTES"):
+        settings["max_bytes"] = int(os.environ["CALC_CACHE_BYTES"])
+    if os.getenv("CALC_CACHE_OPS"):
+        settings["enabled_operations"] = [name.strip() for name in os.environ["CALC_CACHE_OPS"].split(",") if name.strip()]
+    if path:
+        persistent = settings["persistent"] = {"path": path}
+        if os.getenv("CALC_CACHE_FILE_SIZE"):
+            persistent["max_entries"] = int(os.environ["CALC_CACHE_FILE_SIZE"])
+        if os.getenv("CALC_CACHE_FILE_MIN_US"):
+            persistent["min_seconds"] = int(os.environ["CALC_CACHE_FILE_MIN_US"]) / 1e6
+    return settings
+
+# Cache consulted by app.pool.evaluate in this process; None leaves caching off
+_active: Optional[ResultCache] = None
+
+def get_cache() -> Optional[ResultCache]:
+    """Returns the cache used by this process, if any."""
+    return _active
+
+def set_cache(cache: Optional[ResultCache]) -> None:
+    """Installs (or with None removes) the cache used by this process."""
+    global _active  # pylint: disable=global-statement
+    _active = cache
+
+_settings = settings_from_environment()
+if _settings is not None:
+    set_cache(ResultCache.from_settings(_settings))
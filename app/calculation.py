@@ -1,14 +1,22 @@
 from decimal import Decimal
-from typing import Callable
+from time import perf_counter_ns, time
+from typing import Callable, Optional
+
+from app.metrics import OPERATION, metrics, operation_name
 
 class Calculation:
-    """Represents a single mathematical calculation between two operands."""
+    """Represents a single mathematical calculation between two operands (three for e.g. modpow)."""
+    __slots__ = ("a", "b", "operation", "c", "timestamp", "result")  # No per-instance __dict__; history can hold millions of these
 
     def __repr__(self):
         """Returns a string representation of the calculation"""
+        if self.c is not None:
+            return f"Calculation({self.a}, {self.b}, {self.c}, {self.operation.__name__})"
         return f"Calculation({self.a}, {self.b}, {self.operation.__name__})"
 
-    def __init__(self, a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal]):
+    # One argument per field of a history entry, as the log, the columns and exports store them
+    def __init__(self, a: Decimal, b: Decimal, operation: Callable[..., Decimal], c: Optional[Decimal] = None,  # pylint: disable=too-many-arguments
+                 timestamp: Optional[float] = None):
         """
         Initializes a Calculation instance.
 
@@ -16,10 +24,15 @@ class Calculation:
             a (Decimal): First operand.
             b (Decimal): Second operand.
             operation (Callable): A function that performs an arithmetic operation on two Decimals.
+            c (Decimal): Third operand, only for operations that take three.
+            timestamp (float): When the calculation was made, in seconds since the epoch; now by default.
         """
         self.a = a
         self.b = b
         self.operation = operation
+        self.c = c
+        self.timestamp = time() if timestamp is None else timestamp
+        self.result: Optional[Decimal] = None  # Set once the calculation is performed
 
     @staticmethod
     def create(a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal]) -> "Calculation":
@@ -38,9 +51,21 @@ class Calculation:
 
     def perform(self) -> Decimal:
         """
-        Executes the stored calculation and returns the result.
+        Executes the stored calculation, remembers the result and returns it.
 
         Returns:
             Decimal: The result of the arithmetic operation.
         """
-        return self.operation(self.a, self.b)  # Ensure the operation is executed properly
+        if not metrics.enabled:
+            self.result = self.operation(self.a, self.b) if self.c is None else self.operation(self.a, self.b, self.c)
+            return self.result
+        started = perf_counter_ns()
+        try:
+            # Ensure the operation is executed properly
+            result = self.operation(self.a, self.b) if self.c is None else self.operation(self.a, self.b, self.c)
+        except Exception as e:
+            metrics.observe(OPERATION, operation_name(self.operation), perf_counter_ns() - started, type(e).__name__)
+            raise
+        metrics.observe(OPERATION, operation_name(self.operation), perf_counter_ns() - started)
+        self.result = result
+        return result
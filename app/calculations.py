@@ -1,10 +1,152 @@
-from collections import deque
-from typing import List, Optional
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol
 from app.calculation import Calculation
+from app.history_query import HistoryIndexes
+
+EVICTION_POLICIES = ("fifo", "lru")
+
+# Define a protocol (interface) for the storage behind Calculations
+class HistoryStore(Protocol):
+    """Defines the interface for calculation history storage."""
+    def append(self, calculation: Calculation) -> None:
+        """Stores a calculation as the newest entry."""
+    def extend(self, calculations: Iterable[Calculation]) -> None:
+        """Stores several calculations in order, e.g. a batch of an import."""
+    def latest(self) -> Optional[Calculation]:
+        """Returns the newest entry, or None when empty."""
+    def find(self, operation: str) -> List[Calculation]:
+        """Returns the entries whose operation has the given name, oldest first."""
+    def clear(self) -> None:
+        """Removes every entry."""
+    def select(self, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               **ranges) -> Iterator[Calculation]:
+        """Yields the entries that meet every criterion, see HistoryIndexes.select()."""
+    def __len__(self) -> int:
+        """Returns the number of stored entries."""
+    def __iter__(self) -> Iterator[Calculation]:
+        """Iterates over the entries, oldest first."""
+
+class IndexedHistory:
+    """In-memory history with an optional capacity, a per-operation secondary index and sorted indexes for select()."""
+
+    def __init__(self, capacity: Optional[int] = None, policy: str = "fifo"):
+        """
+        Creates an empty history.
+
+        Args:
+            capacity (int): Maximum number of entries kept, None for unbounded.
+            policy (str): 'fifo' evicts the oldest entry, 'lru' the least recently looked up one.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.policy = policy
+        self._next_id = 0
+        self._entries: "OrderedDict[int, Calculation]" = OrderedDict()  # insertion order
+        self._recency: "OrderedDict[int, None]" = OrderedDict()  # least recently used first, LRU only
+        self._by_operation: Dict[str, "OrderedDict[int, Calculation]"] = {}
+        self._indexes = HistoryIndexes(self._entries.get, lambda: list(self._entries),
+                                       lambda operation: self._by_operation.get(operation, {}))
+
+    def append(self, calculation: Calculation) -> None:
+        """Stores a calculation, evicting one entry first if the history is full."""
+        if self.capacity is not None and len(self._entries) >= self.capacity:
+            self._evict()
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = calculation
+        self._by_operation.setdefault(calculation.operation.__name__, OrderedDict())[entry_id] = calculation
+        if self.policy == "lru":
+            self._recency[entry_id] = None
+        self._indexes.add(entry_id)
+
+    def extend(self, calculations: Iterable[Calculation]) -> None:
+        """Stores several calculations in order, evicting as append() does."""
+        for calculation in calculations:
+            self.append(calculation)
+
+    def _evict(self) -> None:
+        if self.policy == "lru":
+            entry_id, _ = self._recency.popitem(last=False)
+            calculation = self._entries.pop(entry_id)
+        else:
+            entry_id, calculation = self._entries.popitem(last=False)
+        name = calculation.operation.__name__
+        index = self._by_operation[name]
+        del index[entry_id]
+        if not index:
+            del self._by_operation[name]
+        self._indexes.remove()
+
+    def _touch(self, entry_ids) -> None:
+        if self.policy == "lru":
+            for entry_id in entry_ids:
+                self._recency.move_to_end(entry_id)
+
+    def latest(self) -> Optional[Calculation]:
+        """Returns the newest entry in O(1)."""
+        if not self._entries:
+            return None
+        entry_id = next(reversed(self._entries))
+        self._touch((entry_id,))
+        return self._entries[entry_id]
+
+    def find(self, operation: str) -> List[Calculation]:
+        """Returns the entries for one operation in O(k), oldest first."""
+        index = self._by_operation.get(operation)
+        if not index:
+            return []
+        self._touch(index.keys())
+        return list(index.values())
+
+    def clear(self) -> None:
+        """Removes every entry and resets the index."""
+        self._entries.clear()
+        self._recency.clear()
+        self._by_operation.clear()
+        self._indexes.clear()
+
+    def select(self, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               **ranges) -> Iterator[Calculation]:
+        """Yields the entries that meet every criterion, found by bisecting sorted indexes; see HistoryIndexes.select()."""
+        return self._indexes.select(operation, since, until, **ranges)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Calculation]:
+        return iter(self._entries.values())
+
+def _history_from_environment() -> HistoryStore:
+    """Builds the default history from CALC_HISTORY_LOG, CALC_HISTORY_STORE, CALC_HISTORY_CAPACITY and CALC_HISTORY_POLICY."""
+    # The alternative stores are imported only when selected, keeping one-shot CLI startup lean
+    if os.getenv("CALC_HISTORY_LOG"):
+        from app.history_log import LogHistory  # pylint: disable=import-outside-toplevel
+        return LogHistory(os.environ["CALC_HISTORY_LOG"])
+    if os.getenv("CALC_HISTORY_STORE") == "columnar":
+        from app.columnar import ColumnarHistory  # pylint: disable=import-outside-toplevel
+        return ColumnarHistory()
+    capacity = os.getenv("CALC_HISTORY_CAPACITY")
+    return IndexedHistory(int(capacity) if capacity else None, os.getenv("CALC_HISTORY_POLICY", "fifo"))
 
 class Calculations:
     """Manages a history of calculations using the Command Pattern."""
-    history: deque[Calculation] = deque()
+    history: HistoryStore = _history_from_environment()
+
+    @classmethod
+    def configure(cls, capacity: Optional[int] = None, policy: str = "fifo") -> None:
+        """Replaces the history with a bounded one, keeping the newest existing entries."""
+        cls.use_store(IndexedHistory(capacity, policy))
+
+    @classmethod
+    def use_store(cls, store: HistoryStore) -> None:
+        """Moves the existing entries into another store, e.g. a ColumnarHistory, and uses it from now on."""
+        for calculation in cls.history:
+            store.append(calculation)
+        cls.history = store
 
     @classmethod
     def add_calculation(cls, calculation: Calculation) -> None:
@@ -14,7 +156,7 @@ class Calculations:
     @classmethod
     def get_latest(cls) -> Optional[Calculation]:
         """Returns the latest calculation if available."""
-        return cls.history[-1] if cls.history else None
+        return cls.history.latest()
 
     @classmethod
     def get_history(cls) -> List[Calculation]:
@@ -29,4 +171,29 @@ class Calculations:
     @classmethod
     def find_by_operation(cls, operation: str) -> List[Calculation]:
         """Finds calculations based on the operation name."""
-        return [calc for calc in cls.history if calc.operation.__name__ == operation]
+        return cls.history.find(operation)
+
+    @classmethod
+    def iterate(cls) -> Iterator[Calculation]:
+        """Iterates over the history, oldest first, without copying it."""
+        return iter(cls.history)
+
+    @classmethod
+    def query(cls, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              **ranges) -> Iterator[Calculation]:
+        """
+        Yields the calculations that meet every criterion given, lazily.
+
+        Example, all divisions of the last five minutes with a result of at least a million
+        in absolute value:
+        ```python
+        Calculations.query("divide", since=time.time() - 300, result=magnitude_at_least(10 ** 6))
+        ```
+
+        Args:
+            operation (str): Operation name.
+            since (float): Earliest timestamp, in seconds since the epoch.
+            until (float): Latest timestamp.
+            **ranges: a, b or result, each a Range, a (low, high) pair or a sequence of Ranges.
+        """
+        return cls.history.select(operation, since, until, **ranges)
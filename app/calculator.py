@@ -1,7 +1,8 @@
 from decimal import Decimal
 from .calculation import Calculation
 from .calculations import Calculations
-from .operations import add, subtract, multiply, divide
+from .operations import add, subtract, multiply, divide, operations
+from .vectorized import BatchResult, KERNELS, evaluate_exact, evaluate_vectorized
 
 class Calculator:
     """A calculator that performs arithmetic operations and stores a history of calculations."""
@@ -19,8 +20,9 @@ class Calculator:
             Decimal: The sum of a and b.
         """
         calculation = Calculation.create(a, b, add)
-        Calculations.add_calculation(calculation)
-        return calculation.perform()
+        result = calculation.perform()
+        Calculations.add_calculation(calculation)  # Recorded with its result
+        return result
 
     @staticmethod
     def subtract(a: Decimal, b: Decimal) -> Decimal:
@@ -35,8 +37,9 @@ class Calculator:
             Decimal: The result of a - b.
         """
         calculation = Calculation.create(a, b, subtract)
-        Calculations.add_calculation(calculation)
-        return calculation.perform()
+        result = calculation.perform()
+        Calculations.add_calculation(calculation)  # Recorded with its result
+        return result
 
     @staticmethod
     def multiply(a: Decimal, b: Decimal) -> Decimal:
@@ -51,8 +54,9 @@ class Calculator:
             Decimal: The result of a * b.
         """
         calculation = Calculation.create(a, b, multiply)
-        Calculations.add_calculation(calculation)
-        return calculation.perform()
+        result = calculation.perform()
+        Calculations.add_calculation(calculation)  # Recorded with its result
+        return result
 
     @staticmethod
     def divide(a: Decimal, b: Decimal) -> Decimal:
@@ -72,5 +76,29 @@ class Calculator:
         if b == 0:
             raise ZeroDivisionError("Cannot divide by zero")
         calculation = Calculation.create(a, b, divide)
-        Calculations.add_calculation(calculation)
-        return calculation.perform()
+        result = calculation.perform()
+        Calculations.add_calculation(calculation)  # Recorded with its result
+        return result
+
+    @staticmethod
+    def evaluate_batch(operation: str, a, b, exact: bool = False) -> BatchResult:
+        """
+        Applies an operation element-wise to two operand arrays in one call.
+
+        Unlike the scalar methods, batches are not recorded in the calculation history.
+        The built-in operations plus the modulus and power plugins run as NumPy kernels;
+        exact=True, or any operation without a kernel, uses the Decimal implementations.
+
+        Args:
+            operation (str): Name of a registered operation, e.g. 'add' or 'power'.
+            a (array_like): First operands.
+            b (array_like): Second operands.
+            exact (bool): Compute with Decimal instead of float64/int64.
+
+        Returns:
+            BatchResult: The values and a mask that is True where an element failed,
+            e.g. division by zero.
+        """
+        if exact or operation not in KERNELS or operations.arity(operation) != 2:
+            return evaluate_exact(operation, a, b)  # Which refuses operations that do not take two operands
+        return evaluate_vectorized(operation, a, b)
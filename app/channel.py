@@ -0,0 +1,148 @@
+import multiprocessing
+import struct
+from typing import Iterable, Iterator, List, Optional
+
+from app.calculation import Calculation
+from app.history_log import encode_record
+
+# Every record in the ring is prefixed with its length
+LENGTH = struct.Struct("<I")
+WRITTEN, READ = range(2)  # Slots of the position counters: total bytes ever written and ever read
+
+class RecordRing:
+    """
+    Fixed-size ring buffer of variable-length byte records in shared memory.
+
+    Any number of processes may write; exactly one process, the one that created the
+    ring, reads. The two position counters only ever grow, so the free space is the
+    capacity minus the bytes written but not yet read. Writers take the lock to reserve
+    and fill their space. The reader takes it only to read and advance the counters and
+    copies the records out without it, since writers never touch unread bytes.
+    """
+
+    def __init__(self, capacity: int = 1 << 20, context=None):
+        """
+        Allocates the shared buffer.
+
+        Args:
+            capacity (int): Size of the buffer in bytes.
+            context: Multiprocessing context to allocate with, the default one when None.
+        """
+        context = context or multiprocessing
+        self.capacity = capacity
+        self._buffer = context.RawArray("B", capacity)
+        self._positions = context.RawArray("Q", 2)
+        self._lock = context.Lock()
+        self._view: Optional[memoryview] = None
+
+    @property
+    def lock(self):
+        """The lock writers hold while they reserve and fill their space."""
+        return self._lock
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_view"] = None  # Rebuilt on first use in the receiving process
+        return state
+
+    def _memory(self) -> memoryview:
+        if self._view is None:
+            self._view = memoryview(self._buffer).cast("B")
+        return self._view
+
+    def write(self, record: bytes) -> bool:
+        """
+        Appends one record.
+
+        Returns:
+            bool: False, with nothing written, when the ring has no room for the record.
+        """
+        size = LENGTH.size + len(record)
+        with self._lock:
+            written = self._positions[WRITTEN]
+            if written - self._positions[READ] + size > self.capacity:
+                return False
+            self._copy_in(written % self.capacity, LENGTH.pack(len(record)) + record)
+            self._positions[WRITTEN] = written + size
+        return True
+
+    def _copy_in(self, offset: int, data: bytes) -> None:
+        memory = self._memory()
+        first = min(len(data), self.capacity - offset)
+        memory[offset:offset + first] = data[:first]
+        memory[:len(data) - first] = data[first:]
+
+    def drain(self) -> List[bytes]:
+        """Removes and returns every record written so far, oldest first; only the creating process may call this."""
+        positions = self._positions
+        if positions[WRITTEN] == positions[READ]:
+            return []  # Checked without the lock; a write that is missed here is picked up by the next drain
+        with self._lock:
+            written, read = positions[WRITTEN], positions[READ]
+        memory, offset = self._memory(), read % self.capacity
+        first = min(written - read, self.capacity - offset)
+        data = bytes(memory[offset:offset + first]) + bytes(memory[:written - read - first])
+        with self._lock:
+            positions[READ] = written
+        records, start = [], 0
+        while start < len(data):
+            (length,) = LENGTH.unpack_from(data, start)
+            start += LENGTH.size
+            records.append(data[start:start + length])
+            start += length
+        return records
+
+class ChannelHistory:
+    """
+    History store of a worker process that forwards every calculation to the parent.
+
+    Calculations are packed in the history log's record format and written to a
+    RecordRing, which the parent drains into its own history in batches. Nothing is kept
+    in the worker. When the ring is full the records wait in the worker, and the next
+    task result carries them to the parent instead.
+    """
+
+    def __init__(self, ring: RecordRing):
+        """Creates a store that writes to a ring created by the parent."""
+        self.ring = ring
+        self._overflow: List[bytes] = []
+
+    def append(self, calculation: Calculation) -> None:
+        """Sends a calculation to the parent."""
+        record = encode_record(calculation)
+        if self._overflow or not self.ring.write(record):
+            self._overflow.append(record)  # Also once the ring has room again, so records stay in order
+
+    def extend(self, calculations: Iterable[Calculation]) -> None:
+        """Sends several calculations to the parent, in order."""
+        for calculation in calculations:
+            self.append(calculation)
+
+    def take_overflow(self) -> Optional[List[bytes]]:
+        """Returns, and forgets, the records the ring had no room for; None when there are none."""
+        if not self._overflow:
+            return None
+        overflow, self._overflow = self._overflow, []
+        return overflow
+
+    def latest(self) -> Optional[Calculation]:
+        """Returns None: the history lives in the parent."""
+        return None
+
+    def find(self, _operation: str) -> List[Calculation]:
+        """Returns an empty list: the history lives in the parent."""
+        return []
+
+    def select(self, *_args, **_kwargs) -> Iterator[Calculation]:
+        """Yields nothing: the history lives in the parent."""
+        return iter(())
+
+    def clear(self) -> None:
+        """Drops records still waiting for the parent."""
+        self._overflow.clear()
+
+    def __len__(self) -> int:
+        return 0
+
+    def __iter__(self) -> Iterator[Calculation]:
+        return iter(())
@@ -0,0 +1,146 @@
+import decimal
+from array import array
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.calculation import Calculation
+from app.history_query import HistoryIndexes
+
+# Context used to shift coefficients without rounding, whatever their length
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+_SPILLED = -2 ** 31  # exponent marker for values kept in the spill dictionary
+
+class DecimalColumn:
+    """A packed column of Decimals stored as int64 coefficients and int32 exponents."""
+
+    def __init__(self):
+        """Creates an empty column."""
+        self.coefficients = array("q")
+        self.exponents = array("i")
+        self.spilled: Dict[int, Decimal] = {}  # NaN, Infinity, -0, coefficients beyond int64, non-Decimals
+
+    def append(self, value: Decimal) -> None:
+        """Packs a Decimal into the column; floats and Fractions from other backends are spilled as they are."""
+        exponent = value.as_tuple().exponent if isinstance(value, Decimal) else None
+        if isinstance(exponent, int) and -2 ** 31 < exponent < 2 ** 31 and not (value.is_zero() and value.is_signed()):
+            # isinstance() above rules out the None pylint infers for non-Decimals
+            coefficient = int(value.scaleb(-exponent, _EXACT))  # pylint: disable=invalid-unary-operand-type
+            if _INT64_MIN <= coefficient <= _INT64_MAX:
+                self.coefficients.append(coefficient)
+                self.exponents.append(exponent)
+                return
+        self.spilled[len(self.exponents)] = value
+        self.coefficients.append(0)
+        self.exponents.append(_SPILLED)
+
+    def __getitem__(self, index: int) -> Decimal:
+        exponent = self.exponents[index]
+        if exponent == _SPILLED:
+            return self.spilled[index % len(self.exponents)]
+        return Decimal(f"{self.coefficients[index]}E{exponent}")
+
+    def __len__(self) -> int:
+        return len(self.exponents)
+
+    def clear(self) -> None:
+        """Removes every value."""
+        self.coefficients = array("q")
+        self.exponents = array("i")
+        self.spilled.clear()
+
+class ColumnarHistory:
+    """
+    Array-backed history store that keeps calculations as packed columns.
+
+    Operations are interned to small integer ids and operands are packed into
+    DecimalColumns, so an entry costs a few dozen bytes instead of a Calculation
+    object and two Decimals. Calculation objects are only built when an entry is read.
+    """
+
+    def __init__(self):
+        """Creates an empty store."""
+        self._operations: List[Callable] = []
+        self._operation_ids: Dict[Callable, int] = {}
+        self._ops = array("I")
+        self._a = DecimalColumn()
+        self._b = DecimalColumn()
+        self._c: Dict[int, Decimal] = {}  # row -> third operand, for the few three-operand calculations
+        self._times = array("d")
+        self._results = DecimalColumn()  # None, for calculations never performed, is spilled
+        self._by_operation: Dict[str, array] = {}  # operation name -> row numbers
+        self._indexes = HistoryIndexes(self._lookup, lambda: range(len(self._ops)),
+                                       lambda operation: self._by_operation.get(operation, ()))
+
+    def _intern(self, operation: Callable) -> int:
+        operation_id = self._operation_ids.get(operation)
+        if operation_id is None:
+            operation_id = len(self._operations)
+            self._operations.append(operation)
+            self._operation_ids[operation] = operation_id
+        return operation_id
+
+    def append(self, calculation: Calculation) -> None:
+        """Packs a calculation into the columns."""
+        row = len(self._ops)
+        self._ops.append(self._intern(calculation.operation))
+        self._a.append(calculation.a)
+        self._b.append(calculation.b)
+        if calculation.c is not None:
+            self._c[row] = calculation.c
+        self._times.append(calculation.timestamp)
+        self._results.append(calculation.result)
+        self._by_operation.setdefault(calculation.operation.__name__, array("I")).append(row)
+        self._indexes.add(row)
+
+    def extend(self, calculations: Iterable[Calculation]) -> None:
+        """Packs several calculations into the columns, in order."""
+        for calculation in calculations:
+            self.append(calculation)
+
+    def row(self, index: int) -> Tuple[Decimal, Decimal, Callable, Optional[Decimal]]:
+        """Returns the unpacked (a, b, operation, c) of one entry; c is None for two-operand calculations."""
+        if index < 0:
+            index += len(self._ops)
+        return self._a[index], self._b[index], self._operations[self._ops[index]], self._c.get(index)
+
+    def __getitem__(self, index: int) -> Calculation:
+        """Materializes one entry as a Calculation view."""
+        if index < 0:
+            index += len(self._ops)
+        calculation = Calculation(*self.row(index), timestamp=self._times[index])
+        calculation.result = self._results[index]
+        return calculation
+
+    def _lookup(self, row: int) -> Optional[Calculation]:
+        return self[row] if row < len(self._ops) else None
+
+    def latest(self) -> Optional[Calculation]:
+        """Returns the newest entry."""
+        return self[-1] if self._ops else None
+
+    def find(self, operation: str) -> List[Calculation]:
+        """Returns the entries for one operation, oldest first."""
+        return [self[row] for row in self._by_operation.get(operation, ())]
+
+    def clear(self) -> None:
+        """Removes every entry; interned operations are kept."""
+        self._ops = array("I")
+        self._a.clear()
+        self._b.clear()
+        self._c.clear()
+        self._times = array("d")
+        self._results.clear()
+        self._by_operation.clear()
+        self._indexes.clear()
+
+    def select(self, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               **ranges) -> Iterator[Calculation]:
+        """Yields the entries that meet every criterion, found by bisecting sorted indexes; see HistoryIndexes.select()."""
+        return self._indexes.select(operation, since, until, **ranges)
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def __iter__(self) -> Iterator[Calculation]:
+        for index in range(len(self._ops)):
+            yield self[index]
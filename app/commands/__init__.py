@@ -1,37 +1,153 @@
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.operations import LazyOperations, operations as registered_operations
+from app.reductions import reductions
 
 class Command(ABC):
     """Abstract base class for all command implementations."""
 
     @abstractmethod
     def execute(self):
-        """Abstract method that must be implemented by subclasses."""
+        """
+        Abstract method that must be implemented by subclasses.
+
+        Implementations may take positional arguments; they receive the words typed after
+        the command name, as strings.
+        """
         raise NotImplementedError("Subclasses must implement the execute method.")
 
+class OperationCommand(Command):
+    """Command that evaluates a registered operation, e.g. 'add 5 3'."""
+
+    def __init__(self, name: str):
+        """Creates the command for the operation registered under name."""
+        self.name = name
+
+    def execute(self, *operands: str):
+        """Evaluates the operation on the operands in this process, prints the message and returns the Outcome."""
+        from app.evaluation import evaluate  # pylint: disable=import-outside-toplevel  # Imports the result cache
+        outcome = evaluate(*operands, self.name)
+        print(outcome.message)
+        return outcome
+
+class Signature(NamedTuple):
+    """How many positional arguments a command accepts, worked out once when the table is compiled."""
+    minimum: int
+    maximum: Optional[int]  # None when the command takes *args
+
+    def accepts(self, count: int) -> bool:
+        """Returns True if the command can be called with count arguments."""
+        return self.minimum <= count and (self.maximum is None or count <= self.maximum)
+
+    def describe(self) -> str:
+        """Describes the accepted number of arguments for error messages."""
+        if self.maximum is None:
+            return f"at least {self.minimum} arguments"
+        if self.minimum == self.maximum:
+            return f"{self.minimum} arguments"
+        return f"{self.minimum} to {self.maximum} arguments"
+
+class Dispatch(NamedTuple):
+    """One entry of the dispatch table: the callable to run and the arguments it takes."""
+    handler: Callable[..., Any]
+    signature: Signature
+
+def signature_of(handler: Callable) -> Signature:
+    """Reads the positional parameters of a bound execute() method."""
+    import inspect  # pylint: disable=import-outside-toplevel  # Only needed when the table is compiled
+    minimum, maximum = 0, 0
+    for parameter in inspect.signature(handler).parameters.values():
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            return Signature(minimum, None)
+        if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+            maximum += 1
+            if parameter.default is parameter.empty:
+                minimum += 1
+    return Signature(minimum, maximum)
+
 class CommandHandler:
-    """Handles command registration and execution."""
+    """
+    Handles command registration and execution.
+
+    Commands registered here, the operations of an operations registry, plugins
+    included, and the reductions such as 'sum' share one namespace. They are compiled
+    into a dispatch table that maps the first word of an input line straight to a
+    callable and its argument signature. The table is built on first use and rebuilt
+    only after a command is registered or the operations registry changes, so executing
+    a line is a split, a dictionary lookup and a call. A registered command shadows an
+    operation of the same name.
+    """
 
-    def __init__(self):
-        """Initializes an empty dictionary to store commands."""
+    def __init__(self, operations: Optional[LazyOperations] = registered_operations):
+        """
+        Initializes an empty dictionary to store commands.
+
+        Args:
+            operations (LazyOperations): Registry whose operations are commands too, None for none.
+        """
         self.commands = {}
+        self.operations = operations
+        self._table: Optional[Dict[str, Dispatch]] = None
+        self._operations_version = -1
 
     def register_command(self, command_name: str, command: Command):
         """Registers a command with a given name."""
         self.commands[command_name] = command
+        self._table = None
 
-    def execute_command(self, command_name: str):
+    def compile(self) -> Dict[str, Dispatch]:
+        """Builds the dispatch table; execute_command() does this when the table is out of date."""
+        table = {}
+        if self.operations is not None:
+            self._operations_version = self.operations.version
+            for name in self.operations:
+                arity = self.operations.arity(name)  # Known from the manifest, so plugins stay unimported
+                table[name] = Dispatch(OperationCommand(name).execute, Signature(arity, arity))
+            for name, reduction in reductions.items():
+                table.setdefault(name, Dispatch(OperationCommand(name).execute, Signature(reduction.minimum, None)))
+        for name, command in self.commands.items():
+            table[name] = Dispatch(command.execute, signature_of(command.execute))
+        self._table = table
+        return table
+
+    def _current_table(self) -> Dict[str, Dispatch]:
+        table = self._table
+        if table is None or (self.operations is not None and self.operations.version != self._operations_version):
+            table = self.compile()
+        return table
+
+    def names(self) -> List[str]:
+        """Returns every name execute_command() accepts: the operations, the reductions, then the registered commands."""
+        return list(self._current_table())
+
+    def menu(self) -> str:
+        """Formats the names of every command for the 'menu' of a REPL or the server."""
+        return "Available commands: " + ", ".join(self.names())
+
+    def execute_command(self, command_line: str):
         """
-        Executes a registered command.
+        Executes a registered command or operation, given with its arguments.
 
-        - **LBYL (Look Before You Leap)**: Checks existence before executing.
-        - **EAFP (Easier to Ask for Forgiveness than Permission)**: Uses exception handling.
+        - **LBYL (Look Before You Leap)**: Checks existence and argument count before executing.
+        - **EAFP (Easier to Ask for Forgiveness than Permission)**: Errors inside the command propagate.
 
         Example:
         ```python
         command_handler.execute_command("greet")
+        command_handler.execute_command("add 5 3")
         ```
+
+        Returns:
+            Whatever the command returns; None when it is unknown or given the wrong number of arguments.
         """
-        try:
-            self.commands[command_name].execute()
-        except KeyError:
-            print(f"No such command: {command_name}")
+        table = self._current_table()
+        name, *arguments = command_line.split() or [""]
+        entry = table.get(name)
+        if entry is None:
+            print(f"No such command: {name}")
+            return None
+        if not entry.signature.accepts(len(arguments)):
+            print(f"{name} takes {entry.signature.describe()}, got {len(arguments)}")
+            return None
+        return entry.handler(*arguments)
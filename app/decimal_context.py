@@ -0,0 +1,56 @@
+import decimal
+import os
+from typing import NamedTuple
+
+ROUNDING_MODES = (decimal.ROUND_CEILING, decimal.ROUND_DOWN, decimal.ROUND_FLOOR, decimal.ROUND_HALF_DOWN,
+                  decimal.ROUND_HALF_EVEN, decimal.ROUND_HALF_UP, decimal.ROUND_UP, decimal.ROUND_05UP)
+TRAPS = [decimal.InvalidOperation, decimal.DivisionByZero, decimal.Overflow]
+
+class ContextSettings(NamedTuple):
+    """The decimal precision and rounding every calculation runs under, in every process and thread."""
+    precision: int = 28
+    rounding: str = decimal.ROUND_HALF_EVEN
+
+    def context(self) -> decimal.Context:
+        """Builds a fresh decimal context with these settings and the standard traps."""
+        return decimal.Context(prec=self.precision, rounding=self.rounding, traps=TRAPS)
+
+    @classmethod
+    def from_environment(cls) -> "ContextSettings":
+        """Reads CALC_PRECISION and CALC_ROUNDING, falling back to Python's defaults of 28 digits, half-even."""
+        precision = int(os.getenv("CALC_PRECISION", "28"))
+        if precision < 1:
+            raise ValueError(f"CALC_PRECISION must be at least 1, got {precision}")
+        return cls(precision, parse_rounding(os.getenv("CALC_ROUNDING", decimal.ROUND_HALF_EVEN)))
+
+def parse_rounding(name: str) -> str:
+    """Accepts a rounding mode as 'ROUND_HALF_UP', 'half_up' or 'half-up' in any case."""
+    mode = name.strip().upper().replace("-", "_")
+    if not mode.startswith("ROUND_"):
+        mode = f"ROUND_{mode}"
+    if mode not in ROUNDING_MODES:
+        raise ValueError(f"Unknown rounding mode: {name}")
+    return mode
+
+def active_settings() -> ContextSettings:
+    """Returns the settings of the current thread's decimal context."""
+    context = decimal.getcontext()
+    return ContextSettings(context.prec, context.rounding)
+
+def apply_settings(settings: ContextSettings) -> decimal.Context:
+    """
+    Installs settings as the decimal context of this thread and of threads started later.
+
+    Setting the context once per thread, rather than entering a local context around
+    every calculation, keeps the operations themselves as cheap as plain Decimal
+    arithmetic. Worker processes call this from their initializer with the parent's
+    settings, so results do not depend on the start method.
+
+    Returns:
+        decimal.Context: The context now active in this thread.
+    """
+    decimal.DefaultContext.prec = settings.precision
+    decimal.DefaultContext.rounding = settings.rounding
+    context = settings.context()
+    decimal.setcontext(context)
+    return context
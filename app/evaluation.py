@@ -0,0 +1,109 @@
+import logging
+from decimal import Decimal, InvalidOperation
+from time import perf_counter_ns
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from app.backends import get_backend
+from app.budgets import OperationTimeout
+from app.cache import get_cache
+from app.calculation import Calculation
+from app.calculations import Calculations
+from app.metrics import REQUEST, metrics
+from app.operations import operations
+from app.reductions import reduce_values, reductions
+
+class Outcome(NamedTuple):
+    """The result of evaluating one calculation request, returned to the caller."""
+    ok: bool
+    message: str
+    result: Optional[Decimal] = None
+
+UNKNOWN_OPERATION = "unknown"
+
+def describe(operation: str, operands: Sequence[Decimal]) -> str:
+    """Writes a calculation the way results are reported: 'a op b' for two operands, 'op(a, b, c)' otherwise."""
+    if len(operands) == 2 and operation not in reductions:
+        return f"{operands[0]} {operation} {operands[1]}"
+    return f"{operation}({', '.join(str(operand) for operand in operands)})"
+
+def budget_exceeded(operation: str, error: BaseException) -> Outcome:
+    """Returns the Outcome of a calculation stopped for running out of its time or memory budget."""
+    reason = str(error) if isinstance(error, OperationTimeout) else "it needed more memory than its budget"
+    return Outcome(False, f"{operation} was stopped: {reason}")
+
+def refuse_operands(operation: str, count: int) -> Optional[Tuple[str, str]]:
+    """
+    Checks that an operation or reduction exists and takes count operands, before anything is parsed.
+
+    Returns:
+        tuple: The message and error type name when the call cannot run, None when it can.
+    """
+    reduction = reductions.get(operation) if operation not in operations else None  # Operations take precedence
+    if reduction is not None:
+        if count < reduction.minimum:
+            return f"{operation} takes at least {reduction.minimum} operands, got {count}", "WrongArity"
+        return None
+    if operation not in operations:
+        return f"Unknown operation: {operation}", "UnknownOperation"
+    arity = operations.arity(operation)
+    return (f"{operation} takes {arity} operands, got {count}", "WrongArity") if count != arity else None
+
+def evaluate(*tokens: str) -> Outcome:
+    """
+    Evaluates a single calculation and describes the result instead of printing it.
+
+    The whole request, from parsing the operands to recording the history, is timed
+    into the 'request' metrics; unknown operations are counted under a single name.
+
+    Args:
+        *tokens (str): The operands as entered by the user followed by the name of a
+            registered operation, e.g. ('5', '3', 'add') or ('4', '13', '497', 'modpow'),
+            or of a reduction, which takes any number of operands, e.g. ('1', '2', '3', 'sum').
+
+    Returns:
+        Outcome: Whether the calculation succeeded, the message to show, and the result.
+    """
+    started = perf_counter_ns()
+    *operands, operation = tokens
+    outcome, error = _evaluate(operands, operation)
+    if metrics.enabled:
+        name = operation if operation in operations or operation in reductions else UNKNOWN_OPERATION
+        metrics.observe(REQUEST, name, perf_counter_ns() - started, error)
+    return outcome
+
+def _evaluate(operands: Sequence[str], operation: str) -> Tuple[Outcome, Optional[str]]:
+    """Evaluates a calculation and returns its Outcome with the exception type name of a failure."""
+    refused = refuse_operands(operation, len(operands))
+    if refused is not None:
+        message, error = refused
+        logging.error(message)
+        return Outcome(False, message), error
+    reduction = reductions.get(operation) if operation not in operations else None
+
+    try:
+        parse = get_backend().parse
+        values = [parse(operand) for operand in operands]
+        if reduction is not None:
+            result = reduce_values(operation, values)  # Not kept in the history, which holds binary calculations
+        else:
+            calc = Calculation(values[0], values[1], operations[operation], *values[2:])
+            cache = get_cache()
+            result = cache.perform(operation, calc) if cache is not None else calc.perform()
+            Calculations.add_calculation(calc)
+        described = describe(operation, values)
+        logging.info("Calculated: %s = %s", described, result)
+        return Outcome(True, f"The result of {described} is equal to {result}", result), None
+    except ZeroDivisionError as e:
+        logging.error("Error: Cannot divide by zero")
+        return Outcome(False, "An error occurred: Cannot divide by zero"), type(e).__name__
+    except InvalidOperation as e:
+        listed = f"{', '.join(operands[:-1])} or {operands[-1]}"
+        logging.error("Invalid number input: %s is not a valid number.", listed)
+        return Outcome(False, f"Invalid number input: {listed} is not a valid number."), type(e).__name__
+    except (OperationTimeout, MemoryError) as e:
+        outcome = budget_exceeded(operation, e)
+        logging.error(outcome.message)
+        return outcome, type(e).__name__
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.exception("Unexpected error: %s", e)
+        return Outcome(False, f"An unexpected error occurred: {e}"), type(e).__name__
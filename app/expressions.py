@@ -0,0 +1,227 @@
+import re
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from app.backends import get_backend
+from app.operations import operations
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<reference>\$\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<punct>[(),])
+    )""", re.VERBOSE)
+
+LAST_RESULT = "_"
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be parsed or evaluated."""
+
+class Step(NamedTuple):
+    """One operation of a compiled plan: slot[target] = function(*slot[arguments])."""
+    target: int
+    name: str
+    function: Callable
+    arguments: Tuple[int, ...]
+
+class Plan(NamedTuple):
+    """
+    A compiled expression: a flat list of steps over numbered value slots.
+
+    Constants are placed in their slots at compile time, and identical subexpressions
+    share one slot, so they are evaluated once per run. Variables and references to
+    previous results ($1, $2, ... and _ for the latest) are bound at evaluation time,
+    which lets a cached plan be re-run with new operands without parsing again. Use
+    compile_expression() rather than building one directly.
+    """
+    text: str
+    slots: List[Optional[Decimal]]  # Constants in place, None where a step, variable or reference goes
+    variables: Dict[str, int]  # Variable name -> slot
+    references: Dict[int, int]  # n of $n, 0 for _ -> slot
+    steps: List[Step]
+    output: int  # Slot of the expression's value
+
+    def evaluate(self, variables: Optional[Mapping[str, Decimal]] = None, results: Sequence[Decimal] = ()) -> Decimal:
+        """
+        Runs the plan.
+
+        Args:
+            variables (Mapping): Values for the named operands of the expression.
+            results (Sequence): Earlier results that $1, $2, ... and _ refer to.
+
+        Returns:
+            Decimal: The value of the expression.
+
+        Raises:
+            ExpressionError: If a variable or reference is not bound.
+        """
+        values = list(self.slots)
+        for name, slot in self.variables.items():
+            if not variables or name not in variables:
+                raise ExpressionError(f"No value for variable '{name}'")
+            values[slot] = get_backend().parse(variables[name])
+        for number, slot in self.references.items():
+            index = len(results) - 1 if number == 0 else number - 1
+            if not 0 <= index < len(results):
+                raise ExpressionError("No previous result for " + ("_" if number == 0 else f"${number}"))
+            values[slot] = results[index]
+        for step in self.steps:
+            values[step.target] = step.function(*(values[argument] for argument in step.arguments))
+        return values[self.output]
+
+class _Compiler:
+    """Recursive-descent parser that emits plan steps while it parses."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.position = 0
+        self.slots: List[Optional[Decimal]] = []
+        self.keys: Dict[Tuple, int] = {}  # structural key of a subexpression -> its slot
+        self.variables: Dict[str, int] = {}
+        self.references: Dict[int, int] = {}
+        self.steps: List[Step] = []
+
+    @staticmethod
+    def _tokenize(text: str) -> List[Tuple[str, str]]:
+        tokens, position = [], 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                raise ExpressionError(f"Unexpected character at position {position}: {text[position:position + 10]!r}")
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def _slot(self, key: Tuple, value: Optional[Decimal] = None) -> Tuple[int, bool]:
+        slot = self.keys.get(key)
+        if slot is not None:
+            return slot, False
+        slot = len(self.slots)
+        self.slots.append(value)
+        self.keys[key] = slot
+        return slot, True
+
+    def _next(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise ExpressionError(f"Unexpected end of expression: {self.text!r}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        kind, text = self._next()
+        if (kind, text) != ("punct", value):
+            raise ExpressionError(f"Expected '{value}' but found '{text}' in {self.text!r}")
+
+    def expression(self) -> int:
+        """Parses one expression and returns the slot holding its value."""
+        kind, text = self._next()
+        if kind == "number":
+            value = get_backend().parse(text)
+            return self._slot(("number", str(value)), value)[0]
+        if kind == "reference":
+            number = int(text[1:])
+            if number < 1:
+                raise ExpressionError("Result references start at $1")
+            slot, new = self._slot(("reference", number))
+            if new:
+                self.references[number] = slot
+            return slot
+        if kind != "name":
+            raise ExpressionError(f"Unexpected '{text}' in {self.text!r}")
+        if self.position < len(self.tokens) and self.tokens[self.position] == ("punct", "("):
+            return self._call(text.lower())
+        if text == LAST_RESULT:
+            slot, new = self._slot(("reference", 0))
+            if new:
+                self.references[0] = slot
+            return slot
+        slot, new = self._slot(("variable", text))
+        if new:
+            self.variables[text] = slot
+        return slot
+
+    def _call(self, name: str) -> int:
+        if name not in operations:
+            raise ExpressionError(f"Unknown operation: {name}")
+        self._expect("(")
+        arguments = [self.expression()]
+        while self.tokens[self.position:self.position + 1] == [("punct", ",")]:
+            self.position += 1
+            arguments.append(self.expression())
+        self._expect(")")
+        if len(arguments) != operations.arity(name):
+            raise ExpressionError(f"{name} takes {operations.arity(name)} operands, got {len(arguments)}")
+        slot, new = self._slot(("call", name, tuple(arguments)))
+        if new:
+            self.steps.append(Step(slot, name, operations[name], tuple(arguments)))
+        return slot
+
+    def compile(self) -> Plan:
+        """Parses the whole text into a Plan."""
+        output = self.expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected '{self.tokens[self.position][1]}' after the end of {self.text!r}")
+        return Plan(self.text, self.slots, self.variables, self.references, self.steps, output)
+
+class PlanCache:
+    """
+    LRU cache of compiled plans keyed by numeric backend and expression text, since constants are parsed at compile time.
+
+    Plans hold the operation functions they call, so the cache is emptied whenever the
+    operations registry changes, e.g. when a plugin replaces an operation.
+    """
+
+    def __init__(self, max_plans: int = 1024):
+        """Creates an empty cache holding at most max_plans plans."""
+        self.max_plans = max_plans
+        self.hits = 0
+        self.misses = 0
+        self._plans: "OrderedDict[Tuple[str, str], Plan]" = OrderedDict()
+        self._operations_version = operations.version
+
+    def get(self, text: str) -> Plan:
+        """Returns the plan for an expression, compiling it only on a miss."""
+        if operations.version != self._operations_version:
+            self._plans.clear()
+            self._operations_version = operations.version
+        key = (get_backend().name, text)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+        self.misses += 1
+        plan = _Compiler(text).compile()
+        self._plans[key] = plan
+        if len(self._plans) > self.max_plans:
+            self._plans.popitem(last=False)
+        return plan
+
+    def clear(self) -> None:
+        """Drops every cached plan."""
+        self._plans.clear()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+plan_cache = PlanCache()
+
+def compile_expression(text: str) -> Plan:
+    """
+    Compiles an expression such as 'add(x, multiply($1, 2.5))' through the shared plan cache.
+
+    Any registered operation, plugins included, can be called by name. Arguments are
+    numbers, nested calls, named variables, $n for the n-th previous result, or _ for
+    the latest one.
+    """
+    return plan_cache.get(text.strip())
+
+def evaluate_expression(text: str, variables: Optional[Mapping[str, Decimal]] = None,
+                        results: Sequence[Decimal] = ()) -> Decimal:
+    """Compiles (or fetches from the cache) and evaluates an expression."""
+    return compile_expression(text).evaluate(variables, results)
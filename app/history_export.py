@@ -0,0 +1,171 @@
+import csv
+import io
+import os
+import sys
+import time
+from decimal import InvalidOperation
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, TextIO
+
+from app.calculation import Calculation
+from app.history_log import MAGIC, calculation_from_fields, read_records, write_records
+from app.metrics import operation_name
+
+# Columns of an exported CSV file; an imported file may stop after b
+CSV_FIELDS = ("operation", "a", "b", "c", "timestamp", "result")
+FORMATS = ("csv", "binary")
+# Calculations encoded, or appended to the history, at once
+DEFAULT_BATCH_SIZE = 10_000
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+def write_csv(calculations: Iterable[Calculation], stream: TextIO, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Writes calculations to a CSV stream with a header row, batch_size rows at a time.
+
+    Returns:
+        int: Number of calculations written.
+    """
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for batch in _batches(calculations, batch_size):
+        writer.writerows([(operation_name(calculation.operation), calculation.a, calculation.b, _text(calculation.c),
+                           repr(calculation.timestamp), _text(calculation.result)) for calculation in batch])
+        count += len(batch)
+    return count
+
+def read_csv(stream: TextIO) -> Iterator[Calculation]:
+    """
+    Decodes the calculations of a CSV stream written by write_csv(), one row at a time.
+
+    Missing c, timestamp and result cells, or columns, are read as None; a calculation
+    without a timestamp is stamped when it is read.
+
+    Raises:
+        ValueError: If the header is not a prefix of CSV_FIELDS, or a row is not a valid calculation.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    if len(header) < 3 or tuple(header) != CSV_FIELDS[:len(header)]:
+        raise ValueError(f"Expected a CSV header of {','.join(CSV_FIELDS)}, got {','.join(header)}")
+    padding = [""] * (len(CSV_FIELDS) - 3)
+    for line, row in enumerate(reader, start=2):
+        if not row:
+            continue
+        try:
+            name, a, b, c, timestamp, result = (row + padding)[:len(CSV_FIELDS)]
+            yield calculation_from_fields((name, a, b, c or None, float(timestamp) if timestamp else None, result or None))
+        except (InvalidOperation, ValueError) as e:
+            raise ValueError(f"Line {line} is not a valid calculation: {','.join(row)}") from e
+
+class TransferSummary(NamedTuple):
+    """The figures of an export or import run."""
+    action: str
+    count: int
+    size: Optional[int]  # Bytes of the file, None for stdin and stdout
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Calculations per second."""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        """Formats the figures of the run for printing."""
+        size = f" ({self.size:,} bytes)" if self.size is not None else ""
+        return f"{self.action} {self.count} calculations{size} in {self.elapsed:.3f}s: {self.throughput:,.0f} calculations/s"
+
+def _history():
+    from app.calculations import Calculations  # pylint: disable=import-outside-toplevel
+    return Calculations.history
+
+def export_history(path: str, fmt: str = "csv", calculations: Optional[Iterable[Calculation]] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> TransferSummary:
+    """
+    Streams the history to a file, in CSV or in the binary history log format.
+
+    Entries are read from the store one at a time and written batch_size at a time, so
+    memory use does not grow with the history; the history must not be modified while
+    it is exported. A binary export can be opened directly as a LogHistory.
+
+    Args:
+        path (str): File to write, '-' for stdout.
+        fmt (str): 'csv' or 'binary'.
+        calculations (Iterable): What to export, e.g. a select() query; the whole history by default.
+        batch_size (int): Calculations encoded per write.
+
+    Returns:
+        TransferSummary: Count, size and timings of the export.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown history format {fmt}, expected one of {', '.join(FORMATS)}")
+    if calculations is None:
+        calculations = iter(_history())
+    started = time.perf_counter()
+    stream = sys.stdout.buffer if path == "-" else open(path, "wb")  # pylint: disable=consider-using-with
+    text = None
+    try:
+        if fmt == "binary":
+            count = write_records(calculations, stream, batch_size)
+        else:
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            count = write_csv(calculations, text, batch_size)
+            text.flush()
+        stream.flush()
+    finally:
+        if text is not None:
+            text.detach()  # Otherwise closing the wrapper would close stdout too
+        if path != "-":
+            stream.close()
+    return TransferSummary("Exported", count, None if path == "-" else os.path.getsize(path),
+                           time.perf_counter() - started)
+
+def import_history(path: str, store=None, batch_size: int = DEFAULT_BATCH_SIZE) -> TransferSummary:
+    """
+    Appends the calculations of an exported file to a history store, batch_size at a time.
+
+    The format is recognized from the first bytes of the file: binary exports and history
+    logs start with the log's magic bytes, anything else is read as CSV. Calculations are
+    appended with the store's extend(), so a LogHistory writes each batch at once.
+
+    Args:
+        path (str): File to read, '-' for stdin.
+        store (HistoryStore): Store to append to; the current history by default.
+        batch_size (int): Calculations appended at once.
+
+    Returns:
+        TransferSummary: Count, size and timings of the import.
+
+    Raises:
+        ValueError: If the file is truncated or has an invalid record or row.
+    """
+    store = store if store is not None else _history()
+    started = time.perf_counter()
+    stream: BinaryIO = sys.stdin.buffer if path == "-" else open(path, "rb")  # pylint: disable=consider-using-with
+    text = None
+    try:
+        if stream.peek(len(MAGIC))[:len(MAGIC)] == MAGIC:
+            calculations = read_records(stream)
+        else:
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            calculations = read_csv(text)
+        count = 0
+        for batch in _batches(calculations, batch_size):
+            store.extend(batch)
+            count += len(batch)
+    finally:
+        if text is not None:
+            text.detach()  # Otherwise closing the wrapper would close stdin too
+        if path != "-":
+            stream.close()
+    return TransferSummary("Imported", count, None if path == "-" else os.path.getsize(path),
+                           time.perf_counter() - started)
@@ -0,0 +1,368 @@
+import mmap
+import os
+import struct
+import time
+from array import array
+from decimal import Decimal
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.backends import parse_stored
+from app.calculation import Calculation
+from app.history_query import HistoryIndexes
+
+MAGIC = b"CALCLOG1"
+# Record header: operation name length, a length, b length; followed by the three ASCII/UTF-8 strings
+RECORD_HEADER = struct.Struct("<BHH")
+# Set in the name length byte when a third operand follows b, as its own length and string
+THIRD_OPERAND, NAME_LENGTH = 0x80, 0x3F
+THIRD_HEADER = struct.Struct("<H")
+# Set in the name length byte when the timestamp and the result follow the operands; the
+# result string is empty for a calculation that was never performed
+TIMED = 0x40
+TIMED_HEADER = struct.Struct("<dH")
+
+_names: Dict[Callable, str] = {}  # operation -> registry name, filled on first use
+
+def _operation_name(operation: Callable) -> str:
+    """Returns the registry name of an operation, which unlike __name__ is unique for plugins."""
+    name = _names.get(operation)
+    if name is None:
+        from app.operations import operations  # pylint: disable=import-outside-toplevel
+        name = operations.name_of(operation)
+        _names[operation] = name
+    return name
+
+_registry = None  # app.operations.operations, imported on first use
+_resolved: Dict[str, Callable] = {}  # name -> operation, valid for registry version _resolved_version
+_resolved_version = -1
+
+def _resolve_operation(name: str) -> Callable:
+    """Returns the registered operation for a name read back from the log."""
+    global _registry, _resolved_version  # pylint: disable=global-statement
+    if _registry is None:
+        from app.operations import operations  # pylint: disable=import-outside-toplevel
+        _registry = operations
+    if _resolved_version == _registry.version:
+        func = _resolved.get(name)
+        if func is not None:
+            return func
+    else:  # Plugins were loaded, replaced or removed since
+        _resolved.clear()
+        _resolved_version = _registry.version
+    func = _registry.get(name)
+    if func is None:
+        def unavailable(*operands: Decimal) -> Decimal:
+            raise KeyError(f"Operation {name} is no longer registered")
+        unavailable.__name__ = name
+        return unavailable
+    _resolved[name] = func
+    return func
+
+def encode_record(calculation: Calculation) -> bytes:
+    """Packs a calculation into the on-disk record format."""
+    name = _operation_name(calculation.operation).encode()
+    if len(name) > NAME_LENGTH:
+        raise ValueError(f"Operation name too long for the history log: {name!r}")
+    a = str(calculation.a).encode()
+    b = str(calculation.b).encode()
+    result = str(calculation.result).encode() if calculation.result is not None else b""
+    timed = TIMED_HEADER.pack(calculation.timestamp, len(result)) + result
+    if calculation.c is None:
+        return RECORD_HEADER.pack(len(name) | TIMED, len(a), len(b)) + name + a + b + timed
+    c = str(calculation.c).encode()
+    return (RECORD_HEADER.pack(len(name) | THIRD_OPERAND | TIMED, len(a), len(b)) + name + a + b
+            + THIRD_HEADER.pack(len(c)) + c + timed)
+
+Fields = Tuple[str, str, str, Optional[str], Optional[float], Optional[str]]
+
+def _record_fields(buffer, offset: int) -> Fields:
+    """Unpacks the operation name, operand strings, timestamp and result string of the record at offset."""
+    name_len, a_len, b_len = RECORD_HEADER.unpack_from(buffer, offset)
+    start = offset + RECORD_HEADER.size
+    name = bytes(buffer[start:start + (name_len & NAME_LENGTH)]).decode()
+    start += name_len & NAME_LENGTH
+    a = bytes(buffer[start:start + a_len]).decode()
+    start += a_len
+    b = bytes(buffer[start:start + b_len]).decode()
+    start += b_len
+    c = None
+    if name_len & THIRD_OPERAND:
+        (c_len,) = THIRD_HEADER.unpack_from(buffer, start)
+        start += THIRD_HEADER.size
+        c = bytes(buffer[start:start + c_len]).decode()
+        start += c_len
+    if not name_len & TIMED:
+        return name, a, b, c, None, None  # Written before calculations were timestamped
+    timestamp, result_len = TIMED_HEADER.unpack_from(buffer, start)
+    start += TIMED_HEADER.size
+    return name, a, b, c, timestamp, bytes(buffer[start:start + result_len]).decode() or None
+
+def _record_size(buffer, offset: int, size: int) -> Optional[int]:
+    """Returns the length of the record at offset, or None when it does not fit before size."""
+    if offset + RECORD_HEADER.size > size:
+        return None
+    name_len, a_len, b_len = RECORD_HEADER.unpack_from(buffer, offset)
+    end = offset + RECORD_HEADER.size + (name_len & NAME_LENGTH) + a_len + b_len
+    for flag, header in ((THIRD_OPERAND, THIRD_HEADER), (TIMED, TIMED_HEADER)):
+        if name_len & flag:
+            if end + header.size > size:
+                return None
+            end += header.size + header.unpack_from(buffer, end)[-1]
+    return end - offset if end <= size else None
+
+def calculation_from_fields(fields: Fields) -> Calculation:
+    """Builds a Calculation from the fields of a record, with numbers in the active backend's type."""
+    name, a, b, c, timestamp, result = fields
+    texts = [a, b] + ([c] if c is not None else []) + ([result] if result is not None else [])
+    values = parse_stored(*texts)  # Together, so that a Fraction anywhere makes them all Fractions
+    calculation = Calculation(values[0], values[1], _resolve_operation(name), values[2] if c is not None else None,
+                              timestamp=timestamp)
+    if result is not None:
+        calculation.result = values[-1]
+    return calculation
+
+def decode_record(record: bytes, offset: int = 0) -> Calculation:
+    """Unpacks a record written by encode_record() into a Calculation, with operands in the active backend's type."""
+    return calculation_from_fields(_record_fields(record, offset))
+
+def write_records(calculations: Iterable[Calculation], stream: BinaryIO, chunk_size: int = 10_000) -> int:
+    """
+    Writes calculations to a stream in the log format, chunk_size records per write.
+
+    The output starts with the log's magic bytes, so it can be opened as a LogHistory.
+
+    Returns:
+        int: Number of calculations written.
+    """
+    stream.write(MAGIC)
+    count, iterator = 0, iter(calculations)
+    while chunk := [encode_record(calculation) for calculation in islice(iterator, chunk_size)]:
+        stream.write(b"".join(chunk))
+        count += len(chunk)
+    return count
+
+def read_records(stream: BinaryIO, block_size: int = 1 << 20) -> Iterator[Calculation]:
+    """
+    Decodes the calculations of a stream in the log format, reading block_size bytes at a time.
+
+    Raises:
+        ValueError: If the stream does not start like a log or ends inside a record.
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a calculator history log")
+    buffer = b""
+    while block := stream.read(block_size):
+        buffer += block
+        offset = 0
+        while (length := _record_size(buffer, offset, len(buffer))) is not None:
+            yield decode_record(buffer, offset)
+            offset += length
+        buffer = buffer[offset:]
+    if buffer:
+        raise ValueError(f"History log ends inside a record ({len(buffer)} bytes left)")
+
+class _SyncSchedule:
+    """Decides when a log's appended records are due for an fsync: every so many records or seconds."""
+
+    def __init__(self, every: int, interval: float):
+        """Starts counting from now."""
+        self.every = every
+        self.interval = interval
+        self.pending = 0
+        self.last = time.monotonic()
+
+    def appended(self, count: int) -> bool:
+        """Counts appended records and returns True when an fsync is due."""
+        self.pending += count
+        return self.pending >= self.every or time.monotonic() - self.last >= self.interval
+
+    def synced(self) -> None:
+        """Notes an fsync."""
+        self.pending = 0
+        self.last = time.monotonic()
+
+class LogHistory:
+    """
+    Durable history store backed by an append-only binary log.
+
+    Every append is written straight to the file, so entries survive a crash of the
+    process; fsync is batched every fsync_every records or fsync_interval seconds.
+    Several processes may append to the same log. Reads go through a memory map of the
+    file: opening the log only scans record headers into an offset array, and records
+    are decoded into Calculation objects when they are accessed.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 100, fsync_interval: float = 1.0):
+        """
+        Opens or creates a log.
+
+        Args:
+            path (str): Location of the log file.
+            fsync_every (int): Records appended between two fsync calls.
+            fsync_interval (float): Maximum seconds between two fsync calls.
+        """
+        self.path = path
+        self._syncs = _SyncSchedule(fsync_every, fsync_interval)
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._offsets = array("Q")  # Offset of every record, in log order
+        self._scanned = len(MAGIC)  # Where the next record starts
+        self._by_operation: Optional[Dict[str, array]] = None  # Operation -> record indexes, built on first find()
+        self._indexes = HistoryIndexes(self._lookup, lambda: range(len(self._offsets)), self._operation_rows)
+        self._open()
+
+    def _open(self) -> None:
+        """Opens the file and scans it from the start; also after the file was replaced by compact() or rotate()."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, MAGIC)
+        self._map = None
+        self._offsets = array("Q")
+        self._scanned = len(MAGIC)
+        self._by_operation = None
+        self._syncs.synced()
+        self._indexes.clear()
+        self._refresh()
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a calculation history log")
+        if self._scanned < len(self._map):
+            os.ftruncate(self._fd, self._scanned)  # Drop a record torn by a crash so new appends stay readable
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """Maps records appended since the last scan, by this or any other process."""
+        size = os.fstat(self._fd).st_size
+        if self._map is not None and size == len(self._map):
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        offset = self._scanned
+        while (length := _record_size(self._map, offset, size)) is not None:  # None: still being written, or torn by a crash
+            self._offsets.append(offset)
+            if self._by_operation is not None:
+                self._index(len(self._offsets) - 1)
+            self._indexes.add(len(self._offsets) - 1)
+            offset += length
+        self._scanned = offset
+
+    def _fields(self, index: int) -> Fields:
+        return _record_fields(self._map, self._offsets[index])
+
+    def _index(self, index: int) -> None:
+        key = _resolve_operation(self._fields(index)[0]).__name__
+        self._by_operation.setdefault(key, array("Q")).append(index)
+
+    def __getitem__(self, index: int) -> Calculation:
+        """Decodes one record into a Calculation, with operands in the active backend's number type."""
+        return calculation_from_fields(self._fields(index))
+
+    def append(self, calculation: Calculation) -> None:
+        """Writes a calculation to the end of the log."""
+        os.write(self._fd, encode_record(calculation))
+        if self._syncs.appended(1):
+            self.sync()
+
+    def extend(self, calculations: Iterable[Calculation]) -> None:
+        """Writes several calculations to the end of the log at once, e.g. a batch of an import."""
+        records = [encode_record(calculation) for calculation in calculations]
+        if records:
+            os.write(self._fd, b"".join(records))  # One write, so concurrent appenders cannot interleave with the batch
+            if self._syncs.appended(len(records)):
+                self.sync()
+
+    def sync(self) -> None:
+        """Forces appended records to stable storage."""
+        os.fsync(self._fd)
+        self._syncs.synced()
+
+    def latest(self) -> Optional[Calculation]:
+        """Returns the newest entry."""
+        self._refresh()
+        return self[len(self._offsets) - 1] if self._offsets else None
+
+    def _operation_rows(self, operation: str) -> array:
+        if self._by_operation is None:
+            self._by_operation = {}
+            for index in range(len(self._offsets)):
+                self._index(index)
+        return self._by_operation.get(operation, array("Q"))
+
+    def _lookup(self, index: int) -> Optional[Calculation]:
+        return self[index] if index < len(self._offsets) else None
+
+    def find(self, operation: str) -> List[Calculation]:
+        """Returns the entries for one operation; the index is built on first use."""
+        self._refresh()
+        return [self[index] for index in self._operation_rows(operation)]
+
+    def select(self, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               **ranges) -> Iterator[Calculation]:
+        """
+        Yields the entries that meet every criterion; see HistoryIndexes.select().
+
+        The sorted indexes are built by decoding every record once, on the first query of
+        each field, and then follow the records appended by any process.
+        """
+        self._refresh()
+        return self._indexes.select(operation, since, until, **ranges)
+
+    def clear(self) -> None:
+        """Replaces the log with an empty one."""
+        self.compact(keep_last=0)
+
+    def compact(self, keep_last: Optional[int] = None) -> None:
+        """
+        Rewrites the log, dropping torn records and optionally all but the newest entries.
+
+        The new log is written next to the old one and atomically renamed over it, so
+        readers never see a partial file; records other processes append to the old
+        file while it is being rewritten are lost, so compact when writers are idle.
+
+        Args:
+            keep_last (int): Number of newest entries to keep, None to keep all of them.
+        """
+        self._refresh()
+        first = 0 if keep_last is None else max(0, len(self._offsets) - keep_last)
+        temporary = f"{self.path}.compact"
+        with open(temporary, "wb") as out:
+            out.write(MAGIC)
+            if first < len(self._offsets):
+                out.write(self._map[self._offsets[first]:self._scanned])
+            out.flush()
+            os.fsync(out.fileno())
+        self.close()
+        os.replace(temporary, self.path)
+        self._open()
+
+    def rotate(self, backups: int = 5) -> None:
+        """Moves the current log to <path>.1 (shifting older ones up to <path>.<backups>) and starts a new one."""
+        self.close()
+        for number in range(backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{number}"):
+                os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def close(self) -> None:
+        """Syncs and closes the log file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._offsets)
+
+    def __iter__(self) -> Iterator[Calculation]:
+        self._refresh()
+        for index in range(len(self._offsets)):
+            yield self[index]
@@ -0,0 +1,198 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.calculation import Calculation
+
+# Fields with a sorted index, and how to read each from a calculation
+FIELDS: Dict[str, Callable[[Calculation], Any]] = {
+    "time": lambda calculation: calculation.timestamp,
+    "a": lambda calculation: calculation.a,
+    "b": lambda calculation: calculation.b,
+    "result": lambda calculation: calculation.result,
+}
+
+class Range(NamedTuple):
+    """Values from low to high, both included; None leaves that end open."""
+    low: Any = None
+    high: Any = None
+
+    def __contains__(self, value) -> bool:
+        return (self.low is None or self.low <= value) and (self.high is None or value <= self.high)
+
+def magnitude_at_least(limit) -> Tuple[Range, Range]:
+    """Returns the ranges of values whose absolute value is at least limit, e.g. for result=..."""
+    return Range(high=-limit), Range(low=limit)
+
+Ranges = Union[Range, Tuple[Any, Any], Sequence[Range]]
+
+def _ranges(criterion: Ranges) -> List[Range]:
+    if isinstance(criterion, Range):
+        return [criterion]
+    if len(criterion) == 2 and not any(isinstance(part, Range) for part in criterion):
+        return [Range(*criterion)]  # A plain (low, high) pair
+    return [Range(*part) for part in criterion]
+
+def _comparable(value) -> bool:
+    # NaN is not equal to itself and cannot be ordered
+    return value is not None and value == value  # pylint: disable=comparison-with-itself
+
+def _criteria(since: Optional[float], until: Optional[float], ranges: Dict[str, Ranges]) -> Dict[str, List[Range]]:
+    """Turns the arguments of select() into the Ranges each field must fall in."""
+    unknown = set(ranges) - (set(FIELDS) - {"time"})  # Time is selected with since and until
+    if unknown:
+        raise ValueError(f"Cannot select on {', '.join(sorted(unknown))}")
+    criteria = {field: _ranges(criterion) for field, criterion in ranges.items() if criterion is not None}
+    if since is not None or until is not None:
+        criteria["time"] = [Range(since, until)]
+    return criteria
+
+class SortedIndex:
+    """Entry ids sorted by the value of one field, kept as parallel key and id lists for bisection."""
+
+    def __init__(self, pairs: Iterable[Tuple[Any, int]] = ()):
+        """Builds the index from (key, entry id) pairs in any order."""
+        ordered = sorted(pairs)
+        self.keys: List[Any] = [key for key, _ in ordered]
+        self.ids: List[int] = [entry_id for _, entry_id in ordered]
+
+    def extend(self, pairs: List[Tuple[Any, int]]) -> None:
+        """Adds entries; appending keys no smaller than the largest one, e.g. timestamps, costs no re-sort."""
+        pairs.sort()
+        if not self.keys or pairs[0][0] >= self.keys[-1]:
+            self.keys.extend(key for key, _ in pairs)
+            self.ids.extend(entry_id for _, entry_id in pairs)
+        else:  # Two sorted runs, which the sort merges in linear time
+            self.__init__(chain(zip(self.keys, self.ids), pairs))
+
+    def span(self, bounds: Range) -> Tuple[int, int]:
+        """Returns the positions [start, stop) of the entries whose key lies in the range, by bisection."""
+        start = 0 if bounds.low is None else bisect_left(self.keys, bounds.low)
+        stop = len(self.keys) if bounds.high is None else bisect_right(self.keys, bounds.high)
+        return start, max(start, stop)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class HistoryIndexes:
+    """
+    Sorted indexes over the entries of a history store, for range queries.
+
+    The store numbers its entries with ids and tells the indexes about appends and
+    removals. An index on a field is built the first time a query uses the field, so
+    stores that are never queried pay nothing. Later appends are only queued, and are
+    merged into every built index by the next query. Removed entries stay in the indexes
+    until they make up half of them, and are skipped when looked up.
+
+    A query bisects every index it constrains to count the matching entries, walks the
+    narrowest candidate list lazily and checks the remaining criteria on each entry.
+    """
+
+    def __init__(self, lookup: Callable[[int], Optional[Calculation]], entry_ids: Callable[[], Iterable[int]],
+                 operation_ids: Callable[[str], Sequence[int]]):
+        """
+        Creates the indexes of a store.
+
+        Args:
+            lookup (Callable): Returns the calculation with an entry id, None once it was removed.
+            entry_ids (Callable): Returns the ids of all current entries, oldest first.
+            operation_ids (Callable): Returns the ids of the entries of one operation, from the store's own index,
+                without copying them.
+        """
+        self.lookup = lookup
+        self.entry_ids = entry_ids
+        self.operation_ids = operation_ids
+        self._indexes: Dict[str, SortedIndex] = {}
+        self._pending: List[int] = []
+        self._removed = 0
+
+    def add(self, entry_id: int) -> None:
+        """Queues a new entry for the built indexes."""
+        if self._indexes:
+            self._pending.append(entry_id)
+
+    def remove(self) -> None:
+        """Counts one removed entry; the indexes are dropped, to be rebuilt, once half of them is stale."""
+        if self._indexes:
+            self._removed += 1
+            if 2 * self._removed > len(next(iter(self._indexes.values()))):
+                self.clear()
+
+    def clear(self) -> None:
+        """Drops every index."""
+        self._indexes.clear()
+        self._pending.clear()
+        self._removed = 0
+
+    def _pairs(self, field: str, entry_ids: Iterable[int]) -> List[Tuple[Any, int]]:
+        read, pairs = FIELDS[field], []
+        for entry_id in entry_ids:
+            calculation = self.lookup(entry_id)
+            if calculation is not None:
+                key = read(calculation)
+                if _comparable(key):
+                    pairs.append((key, entry_id))
+        return pairs
+
+    def index(self, field: str) -> SortedIndex:
+        """Returns the up-to-date index on a field, building it on first use."""
+        if self._pending:
+            for name, index in self._indexes.items():
+                pairs = self._pairs(name, self._pending)
+                if pairs:
+                    index.extend(pairs)
+            self._pending.clear()
+        index = self._indexes.get(field)
+        if index is None:
+            index = self._indexes[field] = SortedIndex(self._pairs(field, self.entry_ids()))
+        return index
+
+    def select(self, operation: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               **ranges: Ranges) -> Iterator[Calculation]:
+        """
+        Yields the calculations that meet every criterion given.
+
+        Args:
+            operation (str): Operation name, as in find().
+            since (float): Earliest timestamp, in seconds since the epoch.
+            until (float): Latest timestamp.
+            **ranges: a, b or result, each a Range, a (low, high) pair or a sequence of
+                Ranges of which any may match, e.g. result=magnitude_at_least(10 ** 6).
+
+        Returns:
+            Iterator[Calculation]: Matching calculations, lazily, in the order of the
+                criterion that selects the fewest entries (time order for since/until).
+        """
+        criteria = _criteria(since, until, ranges)
+        candidates, smallest = None, None
+        if operation is not None:
+            candidates = self.operation_ids(operation)
+            smallest = len(candidates)
+        driving = None
+        for field, bounds in criteria.items():
+            index = self.index(field)
+            spans = [index.span(part) for part in bounds]
+            count = sum(stop - start for start, stop in spans)
+            if smallest is None or count < smallest:
+                driving, smallest = (index, spans, field), count
+        if driving is not None:
+            index, spans, field = driving
+            ids = index.ids  # A later merge replaces the list instead of shifting this one
+            candidates = (ids[position] for start, stop in spans for position in range(start, stop))
+            criteria = {name: bounds for name, bounds in criteria.items() if name != field}
+        elif candidates is not None:
+            candidates = list(candidates)  # The store's own index may change while the caller iterates
+        else:
+            candidates = self.entry_ids()
+        return self._matching(candidates, operation, criteria)
+
+    def _matching(self, candidates: Iterable[int], operation: Optional[str],
+                  criteria: Dict[str, List[Range]]) -> Iterator[Calculation]:
+        checks = [(FIELDS[field], bounds) for field, bounds in criteria.items()]
+        for entry_id in candidates:
+            calculation = self.lookup(entry_id)
+            if calculation is None or (operation is not None and calculation.operation.__name__ != operation):
+                continue
+            if all(_comparable(value := read(calculation)) and any(value in part for part in bounds)
+                   for read, bounds in checks):
+                yield calculation
@@ -0,0 +1,167 @@
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+DROP, BLOCK = "drop", "block"
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Queue handler for the hot path that never waits on disk I/O.
+
+    When the queue is full, 'drop' discards the record (and counts it) while 'block'
+    waits for the listener to make room. For an in-process queue the record is put on
+    the queue as it is, so message formatting also happens on the listener thread.
+    """
+
+    def __init__(self, log_queue, policy: str = DROP, prepare: bool = False):
+        """
+        Creates a handler that feeds a queue.
+
+        Args:
+            log_queue: queue.Queue or multiprocessing Queue to put records on.
+            policy (str): 'drop' or 'block', what to do when the queue is full.
+            prepare (bool): Merge args into the message before queueing, required
+                when the queue crosses a process boundary and records are pickled.
+        """
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.prepare_records = prepare
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return super().prepare(record) if self.prepare_records else record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == BLOCK:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _Listener(QueueListener):
+    """Queue listener that can be stopped while its bounded queue is full."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+class QueuedLogging:
+    """
+    Moves the root logger's handlers onto background listener threads.
+
+    The handlers configured from logging.conf (or basicConfig) keep working unchanged;
+    they are just called from a listener thread that drains a bounded queue instead of
+    from the thread that logs. Worker processes get a multiprocessing queue of their own,
+    drained by a second listener in the parent.
+    """
+
+    def __init__(self, queue_size: int = 10000, policy: str = DROP):
+        """
+        Configures queued logging without starting it.
+
+        Args:
+            queue_size (int): Records buffered before the policy applies.
+            policy (str): 'drop' or 'block' when the queue is full.
+        """
+        self.queue_size = queue_size
+        self.policy = policy
+        self.handler: Optional[BoundedQueueHandler] = None
+        self._handlers: List[logging.Handler] = []
+        self._listeners: List[QueueListener] = []
+        self._worker_queue = None
+
+    @classmethod
+    def from_environment(cls) -> Optional["QueuedLogging"]:
+        """Returns a configuration built from CALC_LOG_QUEUE*, or None when queued logging is off."""
+        if os.getenv("CALC_LOG_QUEUE", "").lower() not in ("1", "true", "yes", "on"):
+            return None
+        return cls(int(os.getenv("CALC_LOG_QUEUE_SIZE", "10000")), os.getenv("CALC_LOG_QUEUE_POLICY", DROP))
+
+    @property
+    def dropped(self) -> int:
+        """Records dropped in this process because the queue was full."""
+        return self.handler.dropped if self.handler is not None else 0
+
+    def start(self) -> "QueuedLogging":
+        """Replaces the root handlers with a queue handler and starts the listener thread."""
+        root = logging.getLogger()
+        self._handlers = list(root.handlers)
+        log_queue = queue.Queue(self.queue_size)
+        self.handler = BoundedQueueHandler(log_queue, self.policy)
+        for handler in self._handlers:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        listener = _Listener(log_queue, *self._handlers, respect_handler_level=True)
+        listener.start()
+        self._listeners.append(listener)
+        return self
+
+    def worker_queue(self, context):
+        """
+        Returns the queue that worker processes should log to, creating its listener on first use.
+
+        Args:
+            context: The multiprocessing context the workers are started from.
+        """
+        if self._worker_queue is None:
+            self._worker_queue = context.Queue(self.queue_size)
+            listener = _Listener(self._worker_queue, *self._handlers, respect_handler_level=True)
+            listener.start()
+            self._listeners.append(listener)
+        return self._worker_queue
+
+    def stop(self) -> None:
+        """Flushes every queued record through the real handlers and restores them on the root logger."""
+        for listener in reversed(self._listeners):
+            listener.stop()
+        self._listeners.clear()
+        root = logging.getLogger()
+        if self.handler is not None:
+            root.removeHandler(self.handler)
+            if self.handler.dropped:
+                logging.warning("Dropped %d log records because the log queue was full", self.handler.dropped)
+            self.handler = None
+        for handler in self._handlers:
+            root.addHandler(handler)
+            handler.flush()
+        self._handlers = []
+        self._worker_queue = None
+
+def install_worker_handler(log_queue, policy: str = DROP) -> None:
+    """Points the root logger of a worker process at the parent's worker queue."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)  # Handlers inherited through fork must not be written to from here
+    root.addHandler(BoundedQueueHandler(log_queue, policy, prepare=True))
+
+def writer_lock(log_queue):
+    """Returns the lock a multiprocessing queue's feeder thread holds while it sends a record, None if it has none."""
+    return getattr(log_queue, "_wlock", None)  # Not part of multiprocessing's API, and None on Windows
+
+# Queued logging started by this process, if any
+_active: Optional[QueuedLogging] = None
+
+def start_queued_logging(config: Optional[QueuedLogging] = None) -> Optional[QueuedLogging]:
+    """Starts queued logging from config, or from the environment; returns None when it stays off."""
+    global _active  # pylint: disable=global-statement
+    if _active is None:
+        config = config or QueuedLogging.from_environment()
+        if config is not None:
+            _active = config.start()
+    return _active
+
+def stop_queued_logging() -> None:
+    """Flushes and stops queued logging if it is running."""
+    global _active  # pylint: disable=global-statement
+    if _active is not None:
+        _active.stop()
+        _active = None
+
+def get_queued_logging() -> Optional[QueuedLogging]:
+    """Returns the queued logging running in this process, if any."""
+    return _active
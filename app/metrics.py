@@ -0,0 +1,248 @@
+import os
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Metric families: time spent inside an operation, and whole requests including parsing and bookkeeping
+OPERATION, REQUEST = "operation", "request"
+
+# Latency histograms use power-of-two buckets: a duration of d ns lands in bucket d.bit_length(),
+# whose upper bound is 2**bucket ns, so recording needs no search. Exports start at about 1us.
+BUCKETS = 64
+FIRST_EXPORTED_BUCKET, LAST_EXPORTED_BUCKET = 10, 34  # 1.024us to about 17s
+CALLS, TOTAL_NS, FIRST_BUCKET = range(3)
+
+class MetricsSnapshot(NamedTuple):
+    """Plain, picklable copy of the counters, used to ship them between processes."""
+    series: Dict[Tuple[str, str], List[int]]  # (family, name) -> [calls, total ns, bucket counts...]
+    errors: Dict[Tuple[str, str, str], int]  # (family, name, exception type) -> count
+
+class OperationStats(NamedTuple):
+    """Summary of one series, as shown by the 'stats' command."""
+    family: str
+    name: str
+    calls: int
+    errors: int
+    mean_ns: float
+    p50_ns: float
+    p99_ns: float
+
+def _quantile_ns(buckets: List[int], calls: int, quantile: float) -> float:
+    """Estimates a quantile as the upper bound of the bucket it falls in."""
+    rank, seen = quantile * calls, 0
+    for bucket, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            return float(2 ** bucket)
+    return float(2 ** BUCKETS)
+
+class MetricsRegistry:
+    """
+    Call counts, error counts by exception type and latency histograms per operation.
+
+    Recording is a histogram bucket lookup and a few integer increments under a lock,
+    so snapshot() and collect() never see a series half updated or lose an increment
+    to a concurrent swap. Worker processes do not share this object: they hand their
+    counters to the parent with collect(), which the parent folds in with merge().
+    """
+
+    def __init__(self, enabled: bool = True):
+        """Creates an empty registry; a disabled one ignores observations."""
+        self.enabled = enabled
+        self._series: Dict[Tuple[str, str], List[int]] = {}
+        self._errors: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, family: str, name: str, elapsed_ns: int, error: Optional[str] = None) -> None:
+        """
+        Records one call.
+
+        Args:
+            family (str): OPERATION or REQUEST.
+            name (str): Operation name.
+            elapsed_ns (int): Duration of the call in nanoseconds.
+            error (str): Exception type name if the call failed.
+        """
+        bucket = FIRST_BUCKET + elapsed_ns.bit_length()
+        with self._lock:
+            series = self._series.get((family, name))
+            if series is None:
+                series = self._series[(family, name)] = [0] * (FIRST_BUCKET + BUCKETS)
+            series[CALLS] += 1
+            series[TOTAL_NS] += elapsed_ns
+            series[bucket] += 1
+            if error is not None:
+                key = (family, name, error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Returns a copy of the current counters."""
+        with self._lock:
+            return MetricsSnapshot({key: list(series) for key, series in self._series.items()}, dict(self._errors))
+
+    def collect(self) -> Optional[MetricsSnapshot]:
+        """Returns the counters recorded since the last collect() and resets them, or None if there are none."""
+        with self._lock:
+            if not self._series:
+                return None
+            snapshot = MetricsSnapshot(self._series, self._errors)
+            self._series, self._errors = {}, {}
+            return snapshot
+
+    def merge(self, snapshot: MetricsSnapshot) -> None:
+        """Adds counters collected elsewhere, e.g. in a worker process."""
+        with self._lock:
+            for key, counts in snapshot.series.items():
+                series = self._series.get(key)
+                if series is None:
+                    self._series[key] = list(counts)
+                else:
+                    for i, count in enumerate(counts):
+                        series[i] += count
+            for key, count in snapshot.errors.items():
+                self._errors[key] = self._errors.get(key, 0) + count
+
+    def reset(self) -> None:
+        """Drops every counter."""
+        with self._lock:
+            self._series, self._errors = {}, {}
+
+    def stats(self) -> List[OperationStats]:
+        """Summarizes every series, sorted by family and name."""
+        snapshot = self.snapshot()
+        errors: Dict[Tuple[str, str], int] = {}
+        for (family, name, _), count in snapshot.errors.items():
+            errors[(family, name)] = errors.get((family, name), 0) + count
+        return [OperationStats(family, name, series[CALLS], errors.get((family, name), 0),
+                               series[TOTAL_NS] / series[CALLS],
+                               _quantile_ns(series[FIRST_BUCKET:], series[CALLS], 0.5),
+                               _quantile_ns(series[FIRST_BUCKET:], series[CALLS], 0.99))
+                for (family, name), series in sorted(snapshot.series.items())]
+
+    def report(self) -> str:
+        """Formats the counters as a table for the 'stats' command."""
+        stats = self.stats()
+        if not stats:
+            return "No calculations recorded yet"
+        lines = [f"{'family':<10} {'operation':<12} {'calls':>8} {'errors':>7} {'mean':>10} {'p50 <=':>10} {'p99 <=':>10}"]
+        for row in stats:
+            lines.append(f"{row.family:<10} {row.name:<12} {row.calls:>8} {row.errors:>7} {_format_ns(row.mean_ns):>10} "
+                         f"{_format_ns(row.p50_ns):>10} {_format_ns(row.p99_ns):>10}")
+        for (family, name, error), count in sorted(self.snapshot().errors.items()):
+            lines.append(f"  {family} {name}: {count} x {error}")
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        """Formats the counters in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for family in (OPERATION, REQUEST):
+            series = sorted((name, counts) for (fam, name), counts in snapshot.series.items() if fam == family)
+            if not series:
+                continue
+            metric = f"calc_{family}"
+            lines += [f"# HELP {metric}_duration_seconds Latency of each {family}.",
+                      f"# TYPE {metric}_duration_seconds histogram"]
+            for name, counts in series:
+                buckets = counts[FIRST_BUCKET:]
+                cumulative = sum(buckets[:FIRST_EXPORTED_BUCKET])
+                for bucket in range(FIRST_EXPORTED_BUCKET, LAST_EXPORTED_BUCKET + 1):
+                    cumulative += buckets[bucket]
+                    lines.append(f'{metric}_duration_seconds_bucket{{operation="{name}",le="{2 ** bucket / 1e9!r}"}} {cumulative}')
+                lines.append(f'{metric}_duration_seconds_bucket{{operation="{name}",le="+Inf"}} {counts[CALLS]}')
+                lines.append(f'{metric}_duration_seconds_sum{{operation="{name}"}} {counts[TOTAL_NS] / 1e9!r}')
+                lines.append(f'{metric}_duration_seconds_count{{operation="{name}"}} {counts[CALLS]}')
+            lines += [f"# HELP {metric}_errors_total Failed calls by exception type.",
+                      f"# TYPE {metric}_errors_total counter"]
+            for (fam, name, error), count in sorted(snapshot.errors.items()):
+                if fam == family:
+                    lines.append(f'{metric}_errors_total{{operation="{name}",error="{error}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+def _format_ns(ns: float) -> str:
+    for unit, size in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= size:
+            return f"{ns / size:.1f}{unit}"
+    return f"{ns:.0f}ns"
+
+# Counters of this process; CALC_METRICS=0 turns recording off
+metrics = MetricsRegistry(enabled=os.getenv("CALC_METRICS", "1").lower() not in ("0", "false", "no", "off"))
+
+_names: Dict[Callable, str] = {}  # operation -> registry name, filled on first use
+
+def operation_name(operation: Callable) -> str:
+    """Returns the registry name metrics are reported under for an operation function."""
+    name = _names.get(operation)
+    if name is None:
+        from app.operations import operations  # pylint: disable=import-outside-toplevel
+        name = _names[operation] = operations.name_of(operation)
+    return name
+
+class MetricsExporter:
+    """Background thread that rewrites a Prometheus text file at a fixed interval."""
+
+    def __init__(self, path: str, interval: float = 15.0, registry: MetricsRegistry = metrics):
+        """
+        Configures the exporter without starting it.
+
+        Args:
+            path (str): File to write, replaced atomically so scrapers never see a partial file.
+            interval (float): Seconds between writes.
+            registry (MetricsRegistry): Counters to export.
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_environment(cls) -> Optional["MetricsExporter"]:
+        """Returns an exporter for CALC_METRICS_FILE every CALC_METRICS_INTERVAL seconds, or None when unset."""
+        path = os.getenv("CALC_METRICS_FILE")
+        if not path:
+            return None
+        return cls(path, float(os.getenv("CALC_METRICS_INTERVAL", "15")))
+
+    def write(self) -> None:
+        """Writes the current counters to the file."""
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.registry.render_prometheus())
+        os.replace(temporary, self.path)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+    def start(self) -> "MetricsExporter":
+        """Starts writing periodically."""
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the thread and writes the final counters."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+# Exporter started by this process, if any
+_exporter: Optional[MetricsExporter] = None
+
+def start_metrics_export(exporter: Optional[MetricsExporter] = None) -> Optional[MetricsExporter]:
+    """Starts the exporter given, or the one configured by the environment; returns None when it stays off."""
+    global _exporter  # pylint: disable=global-statement
+    if _exporter is None:
+        exporter = exporter or MetricsExporter.from_environment()
+        if exporter is not None:
+            _exporter = exporter.start()
+    return _exporter
+
+def stop_metrics_export() -> None:
+    """Writes the file one last time and stops the exporter if it is running."""
+    global _exporter  # pylint: disable=global-statement
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
@@ -1,9 +1,10 @@
 import importlib
+import json
 import os
-import sys
 import logging
+from collections.abc import MutableMapping
 from decimal import Decimal
-from typing import Protocol, Dict, Callable
+from typing import Protocol, Dict, Callable, Iterator, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -58,34 +59,175 @@ def divide(a: Decimal, b: Decimal) -> Decimal:
     """Performs division"""
     return DivideOperation.execute(a, b)
 
+class LazyOperations(MutableMapping):
+    """
+    Operations registry that imports plugin modules only when they are first looked up.
+
+    Plugins listed by the manifest are registered by name with no function attached;
+    iterating over the registry (e.g. for the menu) lists them without importing anything.
+    """
+
+    def __init__(self, builtins: Dict[str, Callable[[Decimal, Decimal], Decimal]]):
+        """Creates a registry holding the built-in operations."""
+        self._entries: Dict[str, Optional[Callable]] = dict(builtins)
+        self._modules: Dict[str, str] = {}  # operation name -> module to import on first lookup
+        self._arities: Dict[str, int] = {}  # operation name -> number of operands, when known up front
+        self.version = 0  # Bumped whenever an operation is added, replaced or removed
+
+    def register_lazy(self, name: str, module_name: str, arity: int = 2) -> None:
+        """Lists an operation whose module is imported on first lookup."""
+        if self._entries.get(name) is None:
+            self._entries[name] = None
+            self._modules[name] = module_name
+            self._arities[name] = arity
+            self.version += 1
+
+    def arity(self, name: str) -> int:
+        """Returns how many operands an operation takes, without importing a lazy plugin."""
+        arity = self._arities.get(name)
+        if arity is None:
+            code = getattr(self[name], "__code__", None)
+            arity = self._arities[name] = code.co_argcount if code is not None else 2
+        return arity
+
+    def _load(self, name: str) -> Callable:
+        module_name = self._modules.pop(name)
+        try:
+            module = importlib.import_module(module_name)
+            func = module.operation
+        except (ImportError, AttributeError) as e:
+            del self._entries[name]
+            self.version += 1
+            logging.error("Failed to load plugin %s: %s", name, str(e))
+            raise KeyError(name) from e
+        self._entries[name] = func
+        logging.info("Loaded plugin: %s", name)
+        return func
+
+    def __getitem__(self, name: str) -> Callable[[Decimal, Decimal], Decimal]:
+        func = self._entries[name]
+        return func if func is not None else self._load(name)
+
+    def __setitem__(self, name: str, func: Callable[[Decimal, Decimal], Decimal]) -> None:
+        self._modules.pop(name, None)
+        self._arities.pop(name, None)
+        self._entries[name] = func
+        self.version += 1
+
+    def __delitem__(self, name: str) -> None:
+        self._modules.pop(name, None)
+        self._arities.pop(name, None)
+        del self._entries[name]
+        self.version += 1
+
+    def __contains__(self, name) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def name_of(self, func: Callable) -> str:
+        """Returns the registry name of an operation, which unlike __name__ is unique for plugins."""
+        return next((name for name, registered in self._entries.items() if registered is func), func.__name__)
+
+    def loaded(self) -> Dict[str, Callable[[Decimal, Decimal], Decimal]]:
+        """Returns the operations that have been imported so far, without importing any more."""
+        return {name: func for name, func in self._entries.items() if func is not None}
+
 # Dictionary to store all operations (built-in + plugins)
-operations: Dict[str, Callable[[Decimal, Decimal], Decimal]] = {
+operations: LazyOperations = LazyOperations({
     "add": add,
     "subtract": subtract,
     "multiply": multiply,
     "divide": divide,
-}
+})
 
-# Dynamically load plugins
+# Plugins are discovered through a manifest instead of being imported up front
 PLUGIN_DIR = os.path.join(os.path.dirname(__file__), "plugins")
-
-def load_plugins():
-    """Dynamically loads all operation plugins from the plugins directory."""
-    if not os.path.exists(PLUGIN_DIR):
-        os.makedirs(PLUGIN_DIR)  # Ensure the plugins directory exists
-
-    sys.path.insert(0, PLUGIN_DIR)  # Add plugins directory to Python path
-
-    for filename in os.listdir(PLUGIN_DIR):
-        if filename.endswith(".py") and filename != "__init__.py":
-            module_name = filename[:-3]  # Remove ".py" to get module name
-            try:
-                module = importlib.import_module(f"app.plugins.{module_name}")
-                if hasattr(module, "operation"):
-                    operations[module_name] = module.operation  # Register the plugin
-                    logging.info("Loaded plugin: %s", module_name)
-            except ImportError as e:
-                logging.error("Failed to load plugin %s: %s", module_name, str(e))
-
-# Load plugins at startup
+PLUGIN_PACKAGE = "app.plugins"
+MANIFEST_VERSION = 2
+
+def _manifest_path(plugin_dir: str) -> str:
+    return os.path.join(plugin_dir, "__pycache__", "operations-manifest.json")
+
+def _operation_arity(path: str) -> Optional[int]:
+    """
+    Checks, without importing it, whether a plugin module defines a top-level 'operation'.
+
+    Returns:
+        int: Number of operands of the operation (2 when it cannot be told from the source),
+            or None when the module defines no operation.
+    """
+    import ast  # pylint: disable=import-outside-toplevel  # Only needed when the manifest is rebuilt
+    try:
+        with open(path, encoding="utf-8") as source:
+            tree = ast.parse(source.read(), filename=path)
+    except (OSError, SyntaxError, ValueError) as e:
+        logging.error("Failed to read plugin %s: %s", path, str(e))
+        return None
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "operation":
+            return len(node.args.posonlyargs) + len(node.args.args)
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "operation" for target in node.targets):
+            return 2
+        if isinstance(node, ast.ImportFrom) and any((alias.asname or alias.name) == "operation" for alias in node.names):
+            return 2
+    return None
+
+def read_manifest(plugin_dir: str = PLUGIN_DIR) -> Dict[str, int]:
+    """
+    Returns the names of the operation plugins in a directory.
+
+    The answer is cached in a manifest that stays valid while the modification times of
+    the directory and of every plugin file are unchanged, so a warm start only calls stat.
+
+    Args:
+        plugin_dir (str): Directory holding one module per operation plugin.
+
+    Returns:
+        Dict[str, int]: Plugin module names that define an 'operation' function, with its number of operands.
+    """
+    files = {filename[:-3]: os.stat(os.path.join(plugin_dir, filename)).st_mtime_ns
+             for filename in sorted(os.listdir(plugin_dir))
+             if filename.endswith(".py") and filename != "__init__.py"}
+    manifest_path = _manifest_path(plugin_dir)
+    try:
+        with open(manifest_path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") == MANIFEST_VERSION and manifest.get("files") == files:
+            return manifest["plugins"]
+    except (OSError, ValueError):
+        pass  # No usable manifest yet; build one below
+
+    arities = {name: _operation_arity(os.path.join(plugin_dir, f"{name}.py")) for name in files}
+    plugins = {name: arity for name, arity in arities.items() if arity is not None}
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as handle:
+            json.dump({"version": MANIFEST_VERSION, "files": files, "plugins": plugins}, handle)
+    except OSError as e:
+        logging.debug("Could not write plugin manifest %s: %s", manifest_path, str(e))
+    return plugins
+
+def load_plugins(plugin_dir: str = PLUGIN_DIR, package: str = PLUGIN_PACKAGE, eager: bool = False) -> None:
+    """
+    Registers all operation plugins from the plugins directory.
+
+    Args:
+        plugin_dir (str): Directory to discover plugins in.
+        package (str): Importable package name of that directory.
+        eager (bool): Import every plugin now instead of on first lookup.
+    """
+    if not os.path.exists(plugin_dir):
+        os.makedirs(plugin_dir)  # Ensure the plugins directory exists
+
+    for module_name, arity in read_manifest(plugin_dir).items():
+        operations.register_lazy(module_name, f"{package}.{module_name}", arity)
+        if eager and module_name in operations:
+            operations.get(module_name)
+
+# Register plugins at startup; their modules are imported on first use
 load_plugins()
@@ -0,0 +1,221 @@
+import logging
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+# Result types the cache can store, by name; Fraction is added when first needed
+_RESULT_TYPES: Dict[str, Callable[[str], Any]] = {"Decimal": Decimal, "float": float, "int": int}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    operation TEXT NOT NULL,
+    version TEXT NOT NULL,
+    key TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    used REAL NOT NULL,
+    UNIQUE (operation, version, key)
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS operations (operation TEXT PRIMARY KEY);
+"""
+
+# Inserts between two checks of the size cap
+EVICTION_INTERVAL = 64
+# Seconds a result's last use may be out of date, so that most hits need no write
+TOUCH_INTERVAL = 60.0
+# Seconds before a lookup of an operation without stored results reads the list of
+# operations again, to find results other processes have stored since
+REFRESH_INTERVAL = 1.0
+
+def _result_type(name: str) -> Callable[[str], Any]:
+    if name == "Fraction" and name not in _RESULT_TYPES:
+        from fractions import Fraction  # pylint: disable=import-outside-toplevel
+        _RESULT_TYPES[name] = Fraction
+    return _RESULT_TYPES[name]
+
+def encode_key(key: Tuple) -> str:
+    """Turns a ResultCache key without its operation into text that is the same in every process."""
+    _, a, b, operand_type, context, *rest = key
+    return repr((a, b, operand_type.__name__, context, *rest))
+
+# Versions already worked out in this process, by operation function
+_versions: Dict[Callable, str] = {}
+
+def operation_version(func: Callable) -> str:
+    """
+    Returns a hash of the source file that defines an operation.
+
+    Editing a plugin, or app/operations.py for the built-in operations, changes the
+    version of its operations, so results computed by the old code are never reused.
+    """
+    version = _versions.get(func)
+    if version is None:
+        import hashlib  # pylint: disable=import-outside-toplevel
+        code = getattr(func, "__code__", None)
+        path = code.co_filename if code is not None else getattr(sys.modules.get(func.__module__), "__file__", None)
+        try:
+            with open(path, "rb") as source:
+                version = hashlib.sha256(source.read()).hexdigest()[:16]
+        except (OSError, TypeError):
+            version = f"unversioned:{func.__module__}.{func.__qualname__}"
+        _versions[func] = version
+    return version
+
+class _StoredOperations:
+    """What a process knows of the operations in a cache file, as last read from it."""
+
+    def __init__(self):
+        self.names: Set[str] = set()  # Operations with results in the file
+        self.pruned: Dict[str, str] = {}  # Operation -> version whose predecessors' results were dropped
+        self.read_at = float("-inf")
+
+    def may_have(self, operation: str) -> bool:
+        """Returns False for an operation without results, until REFRESH_INTERVAL has passed since the last read."""
+        return operation in self.names or time.monotonic() - self.read_at >= REFRESH_INTERVAL
+
+    def read(self, connection) -> None:
+        """Reads the operations that have results from the file."""
+        self.names = {row[0] for row in connection.execute("SELECT operation FROM operations")}
+        self.read_at = time.monotonic()
+
+class PersistentCache:
+    """
+    Result cache in a local SQLite file, shared by every process and run that uses the same file.
+
+    The file is opened in WAL mode, so readers never wait for a writer, and writers wait
+    up to a busy timeout for each other. Only results that took at least min_seconds
+    to compute are stored, and lookups are only made for operations that have stored
+    results, so cheap operations touch the disk at most once every REFRESH_INTERVAL,
+    to see whether another process has stored some since. Once the file holds more than
+    max_entries results, the least recently used ones are evicted; last use is recorded
+    to within a minute, so that most hits only read. Any database error turns the cache
+    into a miss instead of failing the calculation; a file that cannot be opened
+    disables the cache for the rest of the process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, min_seconds: float = 0.0001, timeout: float = 5.0):
+        """
+        Creates a cache that opens its file on first use.
+
+        Args:
+            path (str): SQLite database file, created when missing.
+            max_entries (int): Results kept before the least recently used ones are evicted.
+            min_seconds (float): Shortest computation time of a result worth storing.
+            timeout (float): Seconds to wait for another process's write to finish.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.min_seconds = min_seconds
+        self.timeout = timeout
+        self._connection = None
+        self._pid: Optional[int] = None
+        self._operations = _StoredOperations()
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self.disabled = False
+
+    def _connect(self):
+        if self._pid != os.getpid():  # SQLite connections must not cross a fork
+            import sqlite3  # pylint: disable=import-outside-toplevel  # Only when a cache file is configured
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commits may be lost on power failure
+            connection.executescript(SCHEMA)
+            self._operations.read(connection)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _run(self, action: Callable, default: Any = None) -> Any:
+        if self.disabled:
+            return default
+        import sqlite3  # pylint: disable=import-outside-toplevel
+        with self._lock:
+            try:
+                return action(self._connect())
+            except sqlite3.OperationalError as e:  # Typically a write that waited longer than the timeout
+                logging.warning("Persistent cache %s unavailable: %s", self.path, e)
+            except (sqlite3.DatabaseError, OSError) as e:
+                logging.error("Disabling persistent cache %s: %s", self.path, e)
+                self.disabled = True
+        return default
+
+    def get(self, func: Callable, key: Tuple) -> Optional[Any]:
+        """Returns the stored result for a ResultCache key, whose first item is the operation's name, or None."""
+        operation = key[0]
+        if self.disabled or (self._pid == os.getpid() and not self._operations.may_have(operation)):
+            return None
+
+        def lookup(connection):
+            if operation not in self._operations.names:
+                self._operations.read(connection)
+                if operation not in self._operations.names:
+                    return None
+            version, text = operation_version(func), encode_key(key)
+            row = connection.execute("SELECT type, value, used FROM results WHERE operation = ? AND version = ? AND key = ?",
+                                     (operation, version, text)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[2] > TOUCH_INTERVAL:
+                connection.execute("UPDATE results SET used = ? WHERE operation = ? AND version = ? AND key = ?",
+                                   (now, operation, version, text))
+            return _result_type(row[0])(row[1])
+
+        return self._run(lookup)
+
+    def put(self, func: Callable, key: Tuple, result: Any, seconds: float) -> None:
+        """Stores a result that took seconds to compute, if that is long enough to be worth it."""
+        if seconds < self.min_seconds or type(result).__name__ not in ("Decimal", "float", "int", "Fraction"):
+            return
+        operation = key[0]
+
+        def store(connection):
+            version = operation_version(func)
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if self._operations.pruned.get(operation) != version:
+                    connection.execute("DELETE FROM results WHERE operation = ? AND version <> ?", (operation, version))
+                    self._operations.pruned[operation] = version
+                connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                   (operation, version, encode_key(key), type(result).__name__, str(result), time.time()))
+                connection.execute("INSERT OR IGNORE INTO operations VALUES (?)", (operation,))
+                self._inserts += 1
+                if self._inserts % EVICTION_INTERVAL == 1:
+                    self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._operations.names.add(operation)
+
+        self._run(store)
+
+    def _evict(self, connection) -> None:
+        (count,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_entries:
+            excess = count - self.max_entries * 9 // 10  # Leave some room so eviction does not run on every insert
+            connection.execute("DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY used LIMIT ?)", (excess,))
+
+    def __len__(self) -> int:
+        return self._run(lambda connection: connection.execute("SELECT COUNT(*) FROM results").fetchone()[0], 0)
+
+    def clear(self) -> None:
+        """Deletes every stored result."""
+        def delete(connection):
+            connection.execute("DELETE FROM results")
+            connection.execute("DELETE FROM operations")
+            self._operations.names.clear()
+        self._run(delete)
+
+    def close(self) -> None:
+        """Closes the file; it is opened again on next use."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection, self._pid = None, None
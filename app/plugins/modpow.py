@@ -0,0 +1,27 @@
+import os
+from decimal import Decimal
+
+# Operands with more digits than this are rejected; shares the limit of the power plugin
+MAX_DIGITS = int(os.getenv("CALC_POWER_MAX_DIGITS", "1000000"))
+
+def _exact_int(value: Decimal, name: str) -> int:
+    if isinstance(value, Decimal):
+        integral = value.is_finite() and value == value.to_integral_value()
+        too_long = integral and value.adjusted() > MAX_DIGITS  # Checked before int() builds a huge number
+    elif isinstance(value, float):
+        integral, too_long = value.is_integer(), False  # Floats have at most 309 digits
+    else:
+        integral = value.denominator == 1  # Fraction
+        too_long = integral and abs(value.numerator).bit_length() > MAX_DIGITS * 10 // 3
+    if not integral:
+        raise ValueError(f"modpow needs integer operands, got {value} for {name}")
+    if too_long:
+        raise ValueError(f"The {name} of modpow has more than {MAX_DIGITS} digits (CALC_POWER_MAX_DIGITS)")
+    return int(value)
+
+def operation(a: Decimal, b: Decimal, m: Decimal) -> Decimal:
+    """Performs modular exponentiation (a ** b mod m) on exact integers; negative b uses the modular inverse."""
+    modulus = _exact_int(m, "modulus")
+    if modulus == 0:
+        raise ZeroDivisionError("Cannot divide by zero")
+    return type(a)(pow(_exact_int(a, "base"), _exact_int(b, "exponent"), modulus))  # In the operands' backend type
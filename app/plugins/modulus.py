@@ -2,4 +2,6 @@ from decimal import Decimal
 
 def operation(a: Decimal, b: Decimal) -> Decimal:
     """Performs modulus operation (remainder of division)."""
+    if b == 0:
+        raise ZeroDivisionError("Cannot divide by zero")  # Decimal would raise InvalidOperation, float and Fraction this
     return a % b
@@ -1,5 +1,82 @@
-from decimal import Decimal
+import math
+import os
+from decimal import ROUND_HALF_EVEN, Decimal, getcontext
+from typing import Optional
+
+# Largest result, in decimal digits of magnitude, that is computed at all; larger requests are rejected
+MAX_DIGITS = int(os.getenv("CALC_POWER_MAX_DIGITS", "1000000"))
+HALF = Decimal("0.5")
+
+def estimated_digits(a: Decimal, b: Decimal) -> float:
+    """
+    Estimates log10(|a ** b|), the number of digits before (or zeros after) the decimal point.
+
+    Only the adjusted exponent and a float of the leading digits of a are used, so this is
+    cheap for any size of operands and never overflows. Fractions are measured by the
+    logarithms of their numerator and denominator, which math.log10 takes at any size.
+    """
+    if not a:
+        return 0.0
+    if isinstance(a, Decimal):
+        if not a.is_finite() or not b.is_finite():
+            return 0.0
+        adjusted = a.adjusted()
+        return float(b) * (adjusted + math.log10(abs(float(a.scaleb(-adjusted)))))
+    return float(b) * (math.log10(abs(a.numerator)) - math.log10(a.denominator))
+
+def _square_root(a: Decimal) -> Optional[Decimal]:
+    """
+    Returns a ** 0.5 for a >= 0, formatted exactly as the general path would format it.
+
+    The general path pads exact roots to the full context precision (4 ** 0.5 is
+    2.000...0), so exact roots are padded here too. Decimal.sqrt() always rounds half
+    even, so an irrational root is taken here only under that rounding. None leaves the
+    root to the general path: an exact root longer than the precision, or an irrational
+    root under another rounding mode.
+    """
+    if not a:
+        return Decimal(0)
+    _, digits, exponent = a.as_tuple()
+    coefficient = int("".join(map(str, digits)))
+    if exponent % 2:
+        coefficient *= 10
+        exponent -= 1
+    root = math.isqrt(coefficient)
+    context = getcontext()
+    if root * root != coefficient:
+        return a.sqrt() if context.rounding == ROUND_HALF_EVEN else None
+    precision = context.prec
+    if root >= 10 ** precision:
+        return None
+    result = Decimal(root).scaleb(exponent // 2)
+    return result.quantize(Decimal(1).scaleb(result.adjusted() - precision + 1))
+
+def _within_limit_bound(a: Decimal, b: Decimal) -> bool:
+    """Cheap check that |log10(|a ** b|)| <= (|adjusted(a)| + 1) * |b| cannot exceed MAX_DIGITS."""
+    if not isinstance(a, Decimal) or not isinstance(b, Decimal) or not a.is_finite() or not b.is_finite() or b.adjusted() > 15:
+        return False
+    return (abs(a.adjusted()) + 1) * 10 ** (b.adjusted() + 1) <= MAX_DIGITS
 
 def operation(a: Decimal, b: Decimal) -> Decimal:
-    """Performs exponentiation (power)."""
-    return a ** b
+    """
+    Performs exponentiation (power).
+
+    Floats need no digit limit, as they overflow with OverflowError long before it. A
+    negative base with a non-integral exponent has no real result in any backend.
+    """
+    if not isinstance(a, float):
+        digits = 0.0 if _within_limit_bound(a, b) else estimated_digits(a, b)
+        if abs(digits) > MAX_DIGITS:
+            raise ValueError(f"The result of {a} power {b} would have about {abs(digits):.0f} digits, "
+                             f"over the limit of {MAX_DIGITS} (CALC_POWER_MAX_DIGITS)")
+    if isinstance(a, Decimal):
+        if b == HALF and a.is_finite() and a >= 0:
+            root = _square_root(a)  # Far cheaper than the exp(b * ln(a)) of the general path
+            if root is not None:
+                return root
+        # Integral exponents are computed by repeated squaring at the context's precision
+        return a ** b
+    result = a ** b  # Fractions stay exact for integral exponents and fall back to float otherwise
+    if isinstance(result, complex):
+        raise ValueError(f"The result of {a} power {b} is not a real number")
+    return result
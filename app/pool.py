@@ -0,0 +1,542 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.backends import get_backend, set_backend
+from app.budgets import GRACE_SECONDS, Budget, OperationTimeout, TaskWatch, budgets_from_environment, enforced
+from app.cache import CacheStats, ResultCache, set_cache, settings_from_environment
+from app.calculations import Calculations
+from app.channel import ChannelHistory, RecordRing
+from app.decimal_context import ContextSettings, active_settings, apply_settings
+from app.evaluation import Outcome, budget_exceeded, evaluate
+from app.history_log import decode_record
+from app.log_queue import get_queued_logging, install_worker_handler, writer_lock
+from app.metrics import REQUEST, metrics
+from app.operations import operations
+
+# Shared memory for the calculations workers send back to the parent's history
+DEFAULT_HISTORY_RING_BYTES = 1 << 20
+
+# Seconds between two checks of the running tasks for overruns of their time budget
+WATCH_INTERVAL = 0.05
+
+# History store of this process when it is a pool worker that forwards its calculations
+_channel: Optional[ChannelHistory] = None
+# Table of the budgeted tasks running in the workers, when the pool has time budgets
+_watch: Optional[TaskWatch] = None
+
+def default_start_method() -> str:
+    """Returns the start method used when none is configured."""
+    return "spawn" if sys.platform == "win32" else "fork"
+
+class PoolOptions(NamedTuple):
+    """
+    How a pool's workers run, besides how many there are and how they are started.
+
+    Attributes:
+        max_tasks_per_worker (int): Tasks a worker runs before it is replaced, None for unlimited.
+        cache_settings (dict): ResultCache arguments for a cache in every worker, None for no cache.
+        context_settings (ContextSettings): Decimal context for the workers, None for the one
+            active in the thread that starts the pool.
+        history_ring_bytes (int): Size of the shared ring that carries the workers' calculations
+            into the parent's history, None or 0 to leave them in the workers.
+    """
+    max_tasks_per_worker: Optional[int] = None
+    cache_settings: Optional[dict] = None
+    context_settings: Optional[ContextSettings] = None
+    history_ring_bytes: Optional[int] = DEFAULT_HISTORY_RING_BYTES
+
+class WorkerSettings(NamedTuple):
+    """
+    What a freshly started worker is given by its pool.
+
+    Attributes:
+        cache_settings (dict): ResultCache arguments, or None to run without a result cache.
+        cache_counters: Shared array the worker's cache counts hits, misses and evictions into.
+        log_queue: Queue drained by the parent's log listener, None to keep the inherited handlers.
+        log_policy (str): 'drop' or 'block' when the log queue is full.
+        context_settings (ContextSettings): Decimal precision and rounding, None to keep the inherited context.
+        history_ring (RecordRing): Ring to forward calculations to the parent's history, None to keep them here.
+        task_watch (TaskWatch): Table to note budgeted tasks in, None when the pool has no time budgets.
+    """
+    cache_settings: Optional[dict] = None
+    cache_counters: Any = None
+    log_queue: Any = None
+    log_policy: str = "drop"
+    context_settings: Optional[ContextSettings] = None
+    history_ring: Optional[RecordRing] = None
+    task_watch: Optional[TaskWatch] = None
+
+def initialize_worker(settings: WorkerSettings = WorkerSettings()) -> None:
+    """
+    Prepares a freshly started worker process.
+
+    The operations registry is imported together with this module, so every worker
+    starts with the built-in operations and the plugin manifest already loaded.
+    SIGINT is ignored so that Ctrl+C is handled once, by the parent, which then shuts
+    the pool down instead of every worker printing its own traceback.
+    """
+    global _channel, _watch  # pylint: disable=global-statement
+    _watch = settings.task_watch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if settings.log_queue is not None:
+        install_worker_handler(settings.log_queue, settings.log_policy)
+    if not operations:
+        logging.error("No operations found. Ensure plugins are properly loaded.")
+    cache_settings = settings.cache_settings
+    set_cache(ResultCache.from_settings(cache_settings, settings.cache_counters) if cache_settings is not None else None)
+    metrics.reset()  # A forked worker starts with a copy of the parent's counters
+    if settings.context_settings is not None:
+        apply_settings(settings.context_settings)  # A spawned worker would otherwise start with Python's defaults
+    if settings.history_ring is not None:
+        # Replaces, without copying, the history a forked worker inherits from the parent
+        _channel = Calculations.history = ChannelHistory(settings.history_ring)
+
+def run_task(func: Callable, args: tuple, backend: str, budget: Optional[Budget] = None, task: int = 0) -> tuple:
+    """
+    Runs a task in a worker under the caller's numeric backend, within its budget if it has one.
+
+    Returns:
+        tuple: The task's value, the metrics recorded since the last task, and the history
+        records the ring had no room for (None in the usual case that there are none).
+    """
+    if backend != get_backend().name:
+        set_backend(backend)
+    if budget is None:
+        value = func(*args)
+    else:
+        if task:
+            _watch.begin(task)
+        try:
+            with enforced(budget):
+                value = func(*args)
+        finally:
+            if task:
+                _watch.end(task)
+    return value, metrics.collect(), _channel.take_overflow() if _channel is not None else None
+
+class PoolResult:
+    """Handle to a task on the pool; get() returns the task's value once the worker's metrics and history are merged."""
+
+    def __init__(self, callback: Optional[Callable] = None, error_callback: Optional[Callable] = None,
+                 on_settled: Optional[Callable[[], None]] = None):
+        """Creates a handle that runs the callbacks when the task finishes, or is given up on."""
+        self._callback = callback
+        self._error_callback = error_callback
+        self._on_settled = on_settled
+        self._lock = threading.Lock()
+        self._settled = False
+        self._done = threading.Event()
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+
+    def settle(self, value: Any = None, error: Optional[BaseException] = None) -> bool:
+        """Sets the task's value or exception and runs its callback; only the first call counts."""
+        with self._lock:
+            if self._settled:
+                return False  # A worker that was given up on may still answer late
+            self._settled = True
+        self._value, self._error = value, error
+        try:
+            if error is None and self._callback is not None:
+                self._callback(value)
+            elif error is not None and self._error_callback is not None:
+                self._error_callback(error)
+        finally:
+            self._done.set()
+            if self._on_settled is not None:
+                self._on_settled()
+        return True
+
+    def ready(self) -> bool:
+        """Returns True once the task has finished."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Waits for the task to finish."""
+        self._done.wait(timeout)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Returns the task's value, or raises its exception."""
+        if not self._done.wait(timeout):
+            raise multiprocessing.TimeoutError
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+@contextmanager
+def _holding(locks: Sequence) -> Iterator[None]:
+    """Holds every lock while the body of the with statement runs, skipping any that stays taken for GRACE_SECONDS."""
+    held = []
+    try:
+        for lock in locks:
+            if lock.acquire(timeout=GRACE_SECONDS):
+                held.append(lock)
+            else:
+                logging.warning("Killing a pool worker without a lock the workers share, which stayed taken")
+        yield
+    finally:
+        for lock in reversed(held):
+            lock.release()
+
+def _wait_for_exit(pid: int) -> None:
+    """Waits, for up to GRACE_SECONDS, until a worker process of this one has exited."""
+    deadline = time.monotonic() + GRACE_SECONDS
+    while any(process.pid == pid for process in multiprocessing.active_children()) and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+class TaskWatchdog:
+    """
+    The budgets of a pool's tasks, and a thread that gives up on the ones overrunning their time budget.
+
+    It also counts the tasks in flight: the task of a killed worker never leaves the
+    multiprocessing pool's books, so the pool's close() waits for this count instead.
+
+    A worker killed while holding a lock it shares with the other processes, such as
+    the history ring's, would leave that lock taken forever, and the replacement worker,
+    the other workers and the parent would all wait on it. The watchdog therefore takes
+    those locks itself before it kills a worker, and releases them only once the worker
+    has exited.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, Budget]], on_give_up: Callable[[], Any]):
+        """
+        Sets up the watchdog without starting its thread.
+
+        Args:
+            budgets (dict): Budget by operation name; the one under '*' applies to every other task.
+            on_give_up (callable): Called after a worker was killed, before its task is settled.
+        """
+        self.budgets = budgets or {}
+        self.timeouts = 0  # Tasks given up on, whose workers were killed
+        self._on_give_up = on_give_up
+        self._task_ids = count(1)
+        self._watch: Optional[TaskWatch] = None
+        self._watched: Dict[int, Tuple[PoolResult, float, Optional[str]]] = {}  # task -> (handle, seconds, operation)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._in_flight = 0
+        self._in_flight_changed = threading.Condition()
+        self.locks: List = []  # Locks shared with the workers, held while one of them is killed
+
+    def budget(self, operation: Optional[str]) -> Optional[Budget]:
+        """Returns the budget of an operation, the '*' budget, or None."""
+        return self.budgets.get(operation, self.budgets.get("*")) if self.budgets else None
+
+    def table(self, context) -> Optional[TaskWatch]:
+        """Returns the table workers note their budgeted tasks in, None when no budget has a time limit."""
+        if self._watch is None and any(budget.seconds for budget in self.budgets.values()):
+            self._watch = TaskWatch(context)
+        return self._watch
+
+    def track(self, handle: PoolResult, budget: Optional[Budget], operation: Optional[str]) -> int:
+        """
+        Counts a task in flight, and watches it if it has a time limit.
+
+        Args:
+            handle (PoolResult): The task's handle, settled here if its worker is killed.
+            budget (Budget): The task's budget, if any.
+            operation (str): The operation of a calculation of submit(), None for other tasks.
+
+        Returns:
+            int: The number the worker notes the task under, 0 for a task that is not watched.
+        """
+        with self._in_flight_changed:
+            self._in_flight += 1
+        if budget is None or not budget.seconds or self._watch is None:
+            return 0
+        task = next(self._task_ids)
+        self._watched[task] = (handle, budget.seconds, operation)
+        return task
+
+    def untrack(self, task: int) -> None:
+        """Takes back track() for a task that could not be scheduled."""
+        self._watched.pop(task, None)
+        self.settled()
+
+    def settled(self) -> None:
+        """Counts a task as no longer in flight."""
+        with self._in_flight_changed:
+            self._in_flight -= 1
+            self._in_flight_changed.notify_all()
+
+    def wait_idle(self) -> None:
+        """Waits until no task is in flight."""
+        with self._in_flight_changed:
+            self._in_flight_changed.wait_for(lambda: self._in_flight == 0)
+
+    def start(self) -> None:
+        """Starts the thread, if there are time limits and it is not running yet."""
+        if self._watch is not None and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="pool-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the thread and forgets the watched tasks."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        self._watched.clear()
+
+    def _run(self) -> None:
+        """Gives up on the tasks that overran their time budget by the grace period, killing their workers."""
+        while not self._stopping.wait(WATCH_INTERVAL):
+            now = time.monotonic()
+            for task, entry in list(self._watched.items()):
+                handle, seconds, _ = entry
+                if handle.ready():
+                    del self._watched[task]
+                    continue
+                running = self._watch.running(task)
+                if running is not None and now - running[0] > seconds + GRACE_SECONDS:
+                    del self._watched[task]
+                    self._give_up(task, entry, running)
+
+    def _give_up(self, task: int, entry: Tuple[PoolResult, float, Optional[str]], running: Tuple[float, int]) -> None:
+        handle, seconds, operation = entry
+        started, pid = running
+        with _holding(self.locks):
+            if self._watch.running(task) != running:
+                return  # The task finished meanwhile, and its worker may have moved on to another one
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))  # The pool starts a replacement worker
+            except ProcessLookupError:
+                pass
+            _wait_for_exit(pid)  # A worker that is still running could yet take a lock, and die holding it
+        error = OperationTimeout(f"it took longer than {seconds:g}s")
+        logging.error("Killed pool worker %d: task overran its %gs budget", pid, seconds)
+        self.timeouts += 1
+        self._on_give_up()
+        if operation is not None:
+            metrics.observe(REQUEST, operation, int((time.monotonic() - started) * 1e9), type(error).__name__)
+            handle.settle(budget_exceeded(operation, error))
+        else:
+            handle.settle(error=error)
+
+class CalculationPool:
+    """
+    A long-lived pool of worker processes that is reused across calculations.
+
+    Tasks may have a time and memory budget, per operation. A calculation that runs out
+    of time is cancelled inside its worker with OperationTimeout; one that does not stop
+    within GRACE_SECONDS more, e.g. because it is stuck in a single huge C computation,
+    is given up on: its worker is killed and replaced, and the task ends with a timeout
+    while the other workers' tasks go on.
+    """
+
+    def __init__(self, processes: Optional[int] = None, start_method: Optional[str] = None,
+                 options: Optional[PoolOptions] = None, budgets: Optional[Dict[str, Budget]] = None):
+        """
+        Configures the pool without starting any processes.
+
+        Args:
+            processes (int): Number of worker processes, defaults to the CPU count.
+            start_method (str): Multiprocessing start method ('fork', 'spawn' or 'forkserver').
+            options (PoolOptions): Task limit, result cache, decimal context and history ring of the workers.
+            budgets (dict): Budget by operation name; the one under '*' applies to every
+                other task, including batch chunks and reduction blocks as a whole.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.start_method = start_method or default_start_method()
+        self.options = options or PoolOptions()
+        self._history_ring: Optional[RecordRing] = None
+        self._drain_lock = threading.Lock()  # The ring has one reader; callbacks and close() may race
+        self._cache_counters = None
+        self._pool = None
+        self._watchdog = TaskWatchdog(budgets, self.collect_history)
+
+    @classmethod
+    def from_environment(cls) -> "CalculationPool":
+        """
+        Builds a pool from the CALC_POOL_* variables and the CALC_CACHE_* cache settings.
+
+        CALC_POOL_HISTORY_BYTES=0 keeps history in the workers; CALC_POOL_TIMEOUTS and
+        CALC_POOL_MEMORY_MB set budgets in seconds and megabytes, e.g. 'power=2,*=30'.
+        """
+        size = os.getenv("CALC_POOL_SIZE")
+        max_tasks = os.getenv("CALC_POOL_MAX_TASKS")
+        ring_bytes = os.getenv("CALC_POOL_HISTORY_BYTES")
+        return cls(
+            processes=int(size) if size else None,
+            start_method=os.getenv("CALC_POOL_START_METHOD") or None,
+            options=PoolOptions(
+                max_tasks_per_worker=int(max_tasks) if max_tasks else None,
+                cache_settings=settings_from_environment(),
+                history_ring_bytes=int(ring_bytes) if ring_bytes else DEFAULT_HISTORY_RING_BYTES,
+            ),
+            budgets=budgets_from_environment(),
+        )
+
+    @property
+    def running(self) -> bool:
+        """Returns True while worker processes are available."""
+        return self._pool is not None
+
+    @property
+    def budgets(self) -> Dict[str, Budget]:
+        """Budget by operation name, '*' for every other task."""
+        return self._watchdog.budgets
+
+    @property
+    def timeouts(self) -> int:
+        """Number of tasks given up on, whose workers were killed and replaced."""
+        return self._watchdog.timeouts
+
+    def start(self) -> "CalculationPool":
+        """Starts the worker processes if they are not running yet."""
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method)
+            options = self.options
+            if options.cache_settings is not None and self._cache_counters is None:
+                self._cache_counters = context.Array("q", 3)  # Shared by the caches of all workers
+            queued_logging = get_queued_logging()
+            log_queue = queued_logging.worker_queue(context) if queued_logging is not None else None
+            if options.history_ring_bytes and self._history_ring is None:
+                self._history_ring = RecordRing(options.history_ring_bytes, context)
+            settings = WorkerSettings(
+                cache_settings=options.cache_settings,
+                cache_counters=self._cache_counters,
+                log_queue=log_queue,
+                log_policy=queued_logging.policy if queued_logging is not None else "drop",
+                context_settings=options.context_settings or active_settings(),
+                history_ring=self._history_ring,
+                task_watch=self._watchdog.table(context),
+            )
+            shared_locks = (self._history_ring.lock if self._history_ring is not None else None,
+                            self._cache_counters.get_lock() if self._cache_counters is not None else None,
+                            writer_lock(log_queue))
+            self._watchdog.locks = [lock for lock in shared_locks if lock is not None]
+            self._pool = context.Pool(
+                processes=self.processes,
+                initializer=initialize_worker,
+                initargs=(settings,),
+                maxtasksperchild=options.max_tasks_per_worker,
+            )
+            self._watchdog.start()
+            logging.info("Started calculation pool: %d %s workers", self.processes, self.start_method)
+        return self
+
+    def submit(self, *tokens: str, callback: Optional[Callable[[Outcome], None]] = None,
+               error_callback: Optional[Callable] = None) -> PoolResult:
+        """
+        Schedules a calculation, given as operands followed by the operation, and returns a handle to its Outcome.
+
+        A calculation that runs out of its budget ends with an unsuccessful Outcome, like any other error.
+        """
+        return self.dispatch(evaluate, tokens, callback=callback, error_callback=error_callback)
+
+    def dispatch(self, func: Callable, args: tuple, callback: Optional[Callable] = None,
+                 error_callback: Optional[Callable] = None) -> PoolResult:
+        """
+        Schedules an arbitrary module-level function on the pool, e.g. a whole chunk of records.
+
+        The task runs under this process's numeric backend as it is at submission time.
+        The metrics the worker recorded come back with the value and are merged into
+        this process's counters, and the calculations it added to its history are moved
+        into this process's history, before the callback runs or get() returns.
+
+        A calculation of evaluate() gets the budget of its operation, any other task the
+        '*' budget. When its worker has to be killed, the task fails with OperationTimeout,
+        or for a calculation returns an unsuccessful Outcome.
+        """
+        operation = args[-1] if func is evaluate and args else None
+        budget = self._watchdog.budget(operation)
+        handle = PoolResult(callback, error_callback, self._watchdog.settled)
+
+        def merge_and_settle(returned):
+            value, worker_metrics, overflow = returned
+            if worker_metrics is not None:
+                metrics.merge(worker_metrics)
+            self.collect_history(overflow)
+            handle.settle(value)
+
+        def collect_and_fail(error):
+            self.collect_history()  # Calculations recorded before the task failed
+            if operation is not None and isinstance(error, (OperationTimeout, MemoryError)):
+                handle.settle(budget_exceeded(operation, error))  # Raised outside the calculation itself
+            else:
+                handle.settle(error=error)
+
+        self.start()
+        task = self._watchdog.track(handle, budget, operation)
+        try:
+            self._pool.apply_async(run_task, (func, args, get_backend().name, budget, task),
+                                   callback=merge_and_settle, error_callback=collect_and_fail)
+        except BaseException:
+            self._watchdog.untrack(task)  # Otherwise close() would wait for the task forever
+            raise
+        return handle
+
+    def run(self, *tokens: str) -> Outcome:
+        """Evaluates a calculation, e.g. run('5', '3', 'add'), on the pool and waits for its Outcome."""
+        return self.submit(*tokens).get()
+
+    def collect_history(self, overflow: Optional[List[bytes]] = None) -> int:
+        """
+        Moves the calculations the workers have sent so far into Calculations.history.
+
+        Everything waiting in the ring is drained and decoded in one batch. Called for
+        every finished task, so it rarely finds more than a few records.
+
+        Args:
+            overflow (list): Records a task result carried because the ring was full.
+
+        Returns:
+            int: Number of calculations added.
+        """
+        if self._history_ring is None:
+            return 0
+        with self._drain_lock:
+            records = self._history_ring.drain()
+            if overflow:
+                records += overflow
+            for record in records:
+                Calculations.add_calculation(decode_record(record))
+        return len(records)
+
+    def cache_stats(self) -> Optional[CacheStats]:
+        """Returns the combined cache counters of all workers, or None when caching is off."""
+        if self._cache_counters is None:
+            return None
+        return CacheStats(*self._cache_counters[:])
+
+    def close(self) -> None:
+        """Lets in-flight calculations finish, then stops the workers."""
+        if self._pool is not None:
+            self._pool.close()
+            if self.timeouts:
+                # The task of a killed worker never leaves the pool's books, so join() alone would wait forever
+                self._watchdog.wait_idle()
+                self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._watchdog.stop()
+            self.collect_history()
+            logging.info("Calculation pool shut down.")
+
+    def terminate(self) -> None:
+        """Stops the workers immediately, abandoning in-flight calculations."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._watchdog.stop()
+            logging.info("Calculation pool terminated.")
+
+    def __enter__(self) -> "CalculationPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is KeyboardInterrupt:
+            self.terminate()
+        else:
+            self.close()
@@ -0,0 +1,247 @@
+import math
+import time
+from collections import deque
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, Context, InvalidOperation, localcontext
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional, Sequence
+
+from app.backends import get_backend
+
+# Context in which Decimal sums and sums of squares are exact: no sum of realistic
+# inputs comes near a billion digits, so nothing is ever rounded
+EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+# Extra digits Decimal products carry until the single rounding at the end
+PRODUCT_GUARD_DIGITS = 10
+# Bytes of input sent to a worker at once, cut at a line boundary
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+def _float_mode() -> bool:
+    return get_backend().name == "float"
+
+def _zero():
+    return get_backend().parse("0")
+
+class Reduction:
+    """
+    An operation that folds any number of operands into one result, e.g. a sum.
+
+    Inputs are reduced in chunks, possibly in different processes: partial() turns the
+    values of one chunk into a small partial state, combine() merges the states of two
+    adjacent chunks and finish() turns the state of the whole input into the result.
+    Every partial state starts with the number of values it covers.
+    """
+    minimum = 1  # Fewest operands the reduction is defined for
+
+    def partial(self, values: Sequence) -> Any:
+        """Reduces the values of one chunk to a partial state."""
+        raise NotImplementedError("Subclasses must implement the partial method.")
+
+    def combine(self, first: Any, second: Any) -> Any:
+        """Merges the partial states of two chunks."""
+        raise NotImplementedError("Subclasses must implement the combine method.")
+
+    def finish(self, state: Any) -> Any:
+        """Turns the partial state of the whole input into the result."""
+        raise NotImplementedError("Subclasses must implement the finish method.")
+
+class SumReduction(Reduction):
+    """
+    Sum of the operands.
+
+    Decimal and Fraction sums are exact until the final rounding to the active context.
+    Float sums are compensated: each chunk keeps its correctly rounded sum together with
+    the rounding error of that sum, and all of them are summed again with math.fsum().
+    """
+
+    def partial(self, values: Sequence) -> tuple:
+        if _float_mode():
+            total = math.fsum(values)
+            return len(values), [total, math.fsum([*values, -total])]
+        with localcontext(EXACT):
+            return len(values), sum(values, _zero())
+
+    def combine(self, first: tuple, second: tuple) -> tuple:
+        if _float_mode():
+            return first[0] + second[0], first[1] + second[1]
+        with localcontext(EXACT):
+            return first[0] + second[0], first[1] + second[1]
+
+    def finish(self, state: tuple):
+        if _float_mode():
+            return math.fsum(state[1])
+        return +state[1]  # Unary plus rounds a Decimal to the context; Fractions stay exact
+
+class MeanReduction(SumReduction):
+    """Arithmetic mean of the operands: their exact or compensated sum divided by their count."""
+
+    def finish(self, state: tuple):
+        count, total = state
+        if not count:
+            raise ValueError("mean needs at least one number")
+        if _float_mode():
+            return math.fsum(total) / count
+        return total / count  # The one rounding of a Decimal mean happens here
+
+class VarianceReduction(Reduction):
+    """
+    Sample variance of the operands.
+
+    Decimal and Fraction chunks keep the count, the exact sum and the exact sum of squares,
+    which combine by addition; the variance (n*q - s*s) / (n*(n-1)) is then rounded once.
+    Float chunks keep the count, the mean and the sum of squared deviations from it,
+    combined with the pairwise update of Chan, Golub and LeVeque, which avoids the
+    cancellation of the sum of squares formula in floating point.
+    """
+    minimum = 2
+
+    def partial(self, values: Sequence) -> tuple:
+        count = len(values)
+        if _float_mode():
+            mean = math.fsum(values) / count if count else 0.0
+            return count, mean, math.fsum([(value - mean) ** 2 for value in values])
+        with localcontext(EXACT):
+            return count, sum(values, _zero()), sum([value * value for value in values], _zero())
+
+    def combine(self, first: tuple, second: tuple) -> tuple:
+        count = first[0] + second[0]
+        if not first[0] or not second[0]:
+            return first if second[0] == 0 else second
+        if _float_mode():
+            delta = second[1] - first[1]
+            mean = first[1] + delta * second[0] / count
+            return count, mean, first[2] + second[2] + delta * delta * first[0] * second[0] / count
+        with localcontext(EXACT):
+            return count, first[1] + second[1], first[2] + second[2]
+
+    def finish(self, state: tuple):
+        count = state[0]
+        if count < 2:
+            raise ValueError("variance needs at least two numbers")
+        if _float_mode():
+            return state[2] / (count - 1)
+        with localcontext(EXACT):
+            spread = count * state[2] - state[1] * state[1]
+        return spread / (count * (count - 1))
+
+class ProductReduction(Reduction):
+    """
+    Product of the operands.
+
+    Exact Decimal products would grow by the digits of every factor, so chunks multiply
+    with a few guard digits beyond the active precision and round once at the end.
+    Fraction products are exact; float products are plain floating point.
+    """
+
+    def partial(self, values: Sequence) -> tuple:
+        if _float_mode():
+            return len(values), math.prod(values)
+        with localcontext() as context:
+            context.prec += PRODUCT_GUARD_DIGITS
+            return len(values), math.prod(values, start=get_backend().parse("1"))
+
+    def combine(self, first: tuple, second: tuple) -> tuple:
+        with localcontext() as context:
+            context.prec += PRODUCT_GUARD_DIGITS
+            return first[0] + second[0], first[1] * second[1]
+
+    def finish(self, state: tuple):
+        return state[1] if _float_mode() else +state[1]
+
+# Reductions, looked up by name like the operations registry
+reductions: Dict[str, Reduction] = {
+    "sum": SumReduction(),
+    "mean": MeanReduction(),
+    "variance": VarianceReduction(),
+    "product": ProductReduction(),
+}
+
+def reduce_values(name: str, values: Sequence):
+    """Reduces values that are already parsed, in this process."""
+    reduction = reductions[name]
+    return reduction.finish(reduction.partial(values))
+
+def reduce_block(name: str, block: bytes) -> Any:
+    """Parses the whitespace-separated numbers of a block with the active backend and reduces them; runs inside pool workers."""
+    parse, tokens = get_backend().parse, block.decode().split()
+    try:
+        values = [parse(token) for token in tokens]
+    except InvalidOperation:
+        for token in tokens:  # Only reached on bad input, so finding the culprit may take a second pass
+            try:
+                parse(token)
+            except InvalidOperation:
+                raise InvalidOperation(f"{token} is not a valid number") from None
+        raise
+    return reductions[name].partial(values)
+
+def read_blocks(stream: BinaryIO, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[bytes]:
+    """Yields blocks of about block_size bytes that end at a line boundary, so no number is split."""
+    rest = b""
+    while block := stream.read(block_size):
+        block = rest + block
+        cut = block.rfind(b"\n") + 1
+        if cut:
+            yield block[:cut]
+        rest = block[cut:]
+    if rest:
+        yield rest
+
+class ReductionSummary(NamedTuple):
+    """The result of a streaming reduction with the figures of the run."""
+    result: Any
+    count: int
+    blocks: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Numbers reduced per second."""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        """Formats the figures of the run for printing."""
+        return f"Reduced {self.count} numbers in {self.blocks} blocks in {self.elapsed:.3f}s: {self.throughput:,.0f} numbers/s"
+
+def reduce_stream(name: str, stream: BinaryIO, pool=None, block_size: int = DEFAULT_BLOCK_SIZE,
+                  max_in_flight: Optional[int] = None) -> ReductionSummary:
+    """
+    Reduces the numbers of a binary stream, whitespace separated, in blocks spread over the pool.
+
+    At most max_in_flight blocks are queued on the pool at any time, so memory stays
+    bounded no matter how large the input is. Partial states are combined in input order.
+
+    Args:
+        name (str): Name of a registered reduction, e.g. 'sum'.
+        stream (BinaryIO): Input, e.g. an open file or sys.stdin.buffer.
+        pool (CalculationPool): Pool to reduce blocks on; None reduces in this process.
+        block_size (int): Bytes of input sent to a worker at once.
+        max_in_flight (int): Blocks queued at once, defaults to twice the pool size.
+
+    Returns:
+        ReductionSummary: The result, the count of numbers, and timings.
+
+    Raises:
+        decimal.InvalidOperation: If a token is not a valid number.
+        ValueError: If the input has too few numbers for the reduction.
+    """
+    reduction = reductions[name]
+    if max_in_flight is None:
+        max_in_flight = 2 * pool.processes if pool is not None else 1
+    in_flight: deque = deque()
+    state, blocks = None, 0
+
+    def combine_oldest(state):
+        handle = in_flight.popleft()
+        partial = handle.get() if pool is not None else handle
+        return partial if state is None else reduction.combine(state, partial)
+
+    started = time.perf_counter()
+    for block in read_blocks(stream, block_size):
+        blocks += 1
+        in_flight.append(pool.dispatch(reduce_block, (name, block)) if pool is not None else reduce_block(name, block))
+        if len(in_flight) >= max_in_flight:
+            state = combine_oldest(state)
+    while in_flight:
+        state = combine_oldest(state)
+    if state is None:
+        state = reduction.partial([])
+    return ReductionSummary(reduction.finish(state), state[0], blocks, time.perf_counter() - started)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.commands import CommandHandler
+from app.evaluation import Outcome, evaluate
+
+USAGE = "Invalid input. Use format: <number1> <number2> <operation>"
+# Evaluates the requests of servers without a pool one at a time, as the history and the
+# result cache of this process are not safe to change from several threads at once
+_EVALUATOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calculation")
+
+class Session:
+    """Per-connection state, only ever touched from the event loop."""
+
+    def __init__(self, peer):
+        """Creates the state for a newly connected client."""
+        self.peer = peer
+        self.requests = 0
+        self.errors = 0
+        self.last_outcome: Optional[Outcome] = None  # Only the latest, so a long session does not grow
+
+class CalculationServer:
+    """
+    Serves the '<a> <b> <op>' line protocol to many concurrent clients.
+
+    Each request line gets exactly one response line, in request order. Requests on a
+    connection are pipelined: a client may send many lines without waiting, and up to
+    max_pipeline of them are evaluated concurrently while the responses are written
+    back in order. Calculations never run on the event loop; they go to the worker
+    pool, or one at a time to a thread of their own when no pool is given.
+    """
+
+    def __init__(self, pool=None, max_pipeline: int = 64):
+        """
+        Creates a server.
+
+        Args:
+            pool (CalculationPool): Pool to evaluate calculations on, None to evaluate them in this process.
+            max_pipeline (int): Requests per connection in flight before reading pauses.
+        """
+        self.pool = pool
+        self.max_pipeline = max_pipeline
+        self.commands = CommandHandler()  # Names the operations and reductions for the menu
+        self.sessions: List[Session] = []
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Starts listening on a TCP port; port 0 picks a free one."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logging.info("Calculation server listening on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """Starts listening on a Unix domain socket."""
+        server = await asyncio.start_unix_server(self.handle_connection, path)
+        logging.info("Calculation server listening on %s", path)
+        return server
+
+    def _calculate(self, *tokens: str) -> "asyncio.Future[Outcome]":
+        loop = asyncio.get_running_loop()
+        if self.pool is None:
+            return loop.run_in_executor(_EVALUATOR, evaluate, *tokens)
+        future = loop.create_future()
+
+        def resolve(outcome):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(outcome))
+
+        def fail(error):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(error))
+
+        self.pool.submit(*tokens, callback=resolve, error_callback=fail)
+        return future
+
+    def respond(self, session: Session, line: str) -> "asyncio.Future":
+        """Starts handling one request line and returns a future for its response text."""
+        loop = asyncio.get_running_loop()
+        parts = line.lower().split()
+        if parts == ["menu"]:
+            future = loop.create_future()
+            future.set_result(self.commands.menu())
+            return future
+        if len(parts) < 3:
+            future = loop.create_future()
+            future.set_result(USAGE)
+            return future
+
+        session.requests += 1
+        calculation = self._calculate(*parts)
+
+        async def message() -> str:
+            outcome = await calculation
+            session.last_outcome = outcome
+            session.errors += not outcome.ok
+            return outcome.message
+        return asyncio.ensure_future(message())
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads request lines and writes their responses in order until the client leaves."""
+        session = Session(writer.get_extra_info("peername"))
+        self.sessions.append(session)
+        pending: asyncio.Queue = asyncio.Queue(self.max_pipeline)
+
+        async def write_responses():
+            while (response := await pending.get()) is not None:
+                try:
+                    text = await response
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logging.exception("Request failed: %s", e)
+                    text = f"An unexpected error occurred: {e}"
+                writer.write(text.encode() + b"\n")
+                await writer.drain()
+
+        writer_task = asyncio.create_task(write_responses())
+
+        async def enqueue(response) -> None:
+            # Only the writer notices a client that went away, so waiting for room in a full
+            # queue also ends when the writer does, with the writer's exception
+            put = asyncio.ensure_future(pending.put(response))
+            await asyncio.wait((put, writer_task), return_when=asyncio.FIRST_COMPLETED)
+            if not put.done():
+                put.cancel()
+                if response is not None:
+                    response.cancel()
+                writer_task.result()
+                raise ConnectionResetError("The connection closed before the responses were written")
+
+        try:
+            while line := await reader.readline():
+                text = line.decode(errors="replace").strip()
+                if not text:
+                    continue
+                if text.lower() in ("exit", "quit"):
+                    break
+                await enqueue(self.respond(session, text))
+            await enqueue(None)
+            await writer_task
+        except ConnectionError:
+            pass  # The client went away; nothing left to answer
+        finally:
+            writer_task.cancel()
+            while not pending.empty():
+                response = pending.get_nowait()
+                if response is not None:
+                    response.cancel()
+            self.sessions.remove(session)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+async def serve(server: CalculationServer, host: str = "127.0.0.1", port: int = 8765,
+                unix_path: Optional[str] = None) -> None:
+    """Runs a server until it is cancelled."""
+    listener = await (server.start_unix(unix_path) if unix_path else server.start_tcp(host, port))
+    async with listener:
+        await listener.serve_forever()
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+# Set in the child process by profile_startup() so that main.py reports its startup phases
+PHASES_ENV = "CALC_STARTUP_PHASES"
+PHASE_PREFIX = "startup phase:"
+# Budget for a one-shot 'python main.py 5 3 add', in milliseconds of wall time
+DEFAULT_BUDGET_MS = 120.0
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+_phases: List[Tuple[str, float]] = []
+_last_mark = time.perf_counter()
+
+def mark_phase(name: str) -> None:
+    """Records how long the phase that just finished took, since the previous mark."""
+    global _last_mark  # pylint: disable=global-statement
+    now = time.perf_counter()
+    _phases.append((name, (now - _last_mark) * 1000))
+    _last_mark = now
+
+def report_phases() -> None:
+    """Prints the recorded phases to stderr when running under profile_startup()."""
+    if os.getenv(PHASES_ENV):
+        for name, elapsed_ms in _phases:
+            print(f"{PHASE_PREFIX} {name} {elapsed_ms:.3f}", file=sys.stderr)
+
+class StartupBenchmark(NamedTuple):
+    """Wall-clock timings of repeated one-shot CLI runs, in milliseconds."""
+    timings: List[float]
+    budget_ms: float
+
+    @property
+    def median_ms(self) -> float:
+        """Median wall time of one run."""
+        ordered = sorted(self.timings)
+        return ordered[len(ordered) // 2]
+
+    @property
+    def within_budget(self) -> bool:
+        """True when the median run fits in the budget."""
+        return self.median_ms <= self.budget_ms
+
+    def report(self) -> str:
+        """Formats the benchmark for printing."""
+        verdict = "within" if self.within_budget else "OVER"
+        return (f"Startup: median {self.median_ms:.1f}ms, best {min(self.timings):.1f}ms over {len(self.timings)} runs "
+                f"({verdict} budget of {self.budget_ms:.0f}ms)")
+
+def budget_from_environment() -> float:
+    """Returns CALC_STARTUP_BUDGET_MS, or the default budget."""
+    return float(os.getenv("CALC_STARTUP_BUDGET_MS", str(DEFAULT_BUDGET_MS)))
+
+def benchmark_startup(argv: Sequence[str] = ("5", "3", "add"), runs: int = 10) -> StartupBenchmark:
+    """Times complete 'python main.py <argv>' processes, from exec to exit."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_SCRIPT, *argv], capture_output=True, check=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    return StartupBenchmark(timings, budget_from_environment())
+
+def parse_importtime(lines: Sequence[str]) -> Dict[str, float]:
+    """
+    Turns 'python -X importtime' output into milliseconds of self time per module.
+
+    Modules of this project (main and app.*) are listed individually; everything else is
+    grouped under its top-level package so the breakdown stays readable.
+
+    Args:
+        lines (Sequence[str]): stderr lines of a process run with -X importtime.
+
+    Returns:
+        Dict[str, float]: Self import time in milliseconds per module or package.
+    """
+    totals: Dict[str, float] = {}
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        key = name if name == "main" or name.startswith("app") else name.split(".")[0]
+        totals[key] = totals.get(key, 0.0) + int(self_us) / 1000
+    return totals
+
+def profile_startup(argv: Sequence[str], top: int = 15) -> str:
+    """
+    Runs 'python main.py <argv>' with import profiling and reports where startup time goes.
+
+    Args:
+        argv (Sequence[str]): Arguments for the profiled run, e.g. ['5', '3', 'add'].
+        top (int): Number of modules to list.
+
+    Returns:
+        str: A report with the slowest imports, main.py's own startup phases and the wall time.
+    """
+    import subprocess  # pylint: disable=import-outside-toplevel
+    env = dict(os.environ, **{PHASES_ENV: "1"})
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", MAIN_SCRIPT, *argv],
+                               capture_output=True, text=True, env=env, check=False)
+    wall_ms = (time.perf_counter() - started) * 1000
+    stderr = completed.stderr.splitlines()
+
+    imports = parse_importtime(stderr)
+    lines = [f"Import time by module (self, top {top} of {len(imports)}, total {sum(imports.values()):.1f}ms):"]
+    for name, elapsed_ms in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"  {elapsed_ms:8.2f}ms  {name}")
+    lines.append("main.py startup phases:")
+    for line in stderr:
+        if line.startswith(PHASE_PREFIX):
+            name, elapsed_ms = line[len(PHASE_PREFIX):].split()
+            lines.append(f"  {float(elapsed_ms):8.2f}ms  {name}")
+    lines.append(f"Wall time including interpreter start: {wall_ms:.1f}ms (profiling adds overhead)")
+    return "\n".join(lines)
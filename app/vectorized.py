@@ -0,0 +1,129 @@
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, NamedTuple, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it only the exact Decimal path is available
+    np = None
+
+from app.operations import operations
+
+INT64_LIMIT = 2.0 ** 63
+
+class BatchResult(NamedTuple):
+    """Element-wise results of a batch evaluation."""
+    values: Any  # ndarray of float64/int64, or of Decimal objects on the exact path
+    errors: Any  # boolean ndarray (list on the exact path without NumPy), True where the element failed
+
+def _divide(a, b, valid):
+    out = np.full(a.shape, np.nan)
+    return np.divide(a, b, out=out, where=valid, casting="unsafe")
+
+def _modulus(a, b, valid):
+    # Decimal's remainder takes the sign of the dividend, which is C fmod, not Python's %
+    out = np.zeros(a.shape, dtype=a.dtype) if a.dtype.kind == "i" else np.full(a.shape, np.nan)
+    return np.fmod(a, b, out=out, where=valid)
+
+def _power(a, b, _valid):
+    if a.dtype.kind == "i" and np.any(b < 0):
+        a = a.astype(np.float64)  # Integers to negative powers are only defined in float
+    return np.power(a, b)
+
+# Vectorized kernels: (a, b, valid mask) -> values; invalid elements are left as NaN or 0
+KERNELS: Dict[str, Callable] = {
+    "add": lambda a, b, _valid: np.add(a, b),
+    "subtract": lambda a, b, _valid: np.subtract(a, b),
+    "multiply": lambda a, b, _valid: np.multiply(a, b),
+    "divide": _divide,
+    "modulus": _modulus,
+    "power": _power,
+}
+
+# Divisor-style operations whose zero operands are masked instead of raising
+ZERO_MASKED = {"divide", "modulus"}
+
+def _as_decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+def evaluate_exact(operation: str, a: Sequence, b: Sequence) -> BatchResult:
+    """
+    Evaluates an operation element-wise with the registered Decimal implementation.
+
+    Any registered two-operand operation works here, plugins included. Elements that
+    raise ZeroDivisionError, InvalidOperation or ValueError are masked out with a None value.
+
+    Args:
+        operation (str): Name of a registered operation.
+        a (Sequence): First operands (Decimals, ints, floats or numeric strings).
+        b (Sequence): Second operands, same length as a.
+
+    Returns:
+        BatchResult: Decimal values and the error mask.
+
+    Raises:
+        ValueError: If the arrays differ in length or the operation does not take two operands.
+    """
+    func = operations[operation]
+    arity = operations.arity(operation)
+    if arity != 2:
+        raise ValueError(f"{operation} takes {arity} operands, a batch gives it two")
+    if len(a) != len(b):
+        raise ValueError("Operand arrays must have the same length")
+    values, errors = [], []
+    for x, y in zip(a, b):
+        try:
+            values.append(func(_as_decimal(x), _as_decimal(y)))
+            errors.append(False)
+        except (ZeroDivisionError, InvalidOperation, ValueError):
+            values.append(None)
+            errors.append(True)
+    if np is None:
+        return BatchResult(values, errors)
+    packed = np.empty(len(values), dtype=object)
+    packed[:] = values
+    return BatchResult(packed, np.array(errors, dtype=bool))
+
+def evaluate_vectorized(operation: str, a, b) -> BatchResult:
+    """
+    Evaluates an operation over whole arrays with a single NumPy kernel call.
+
+    Integer inputs run as int64 and everything else as float64. Division and modulus by
+    zero are masked rather than raised. When an int64 result would overflow, the batch is
+    re-evaluated on the exact Decimal path instead of wrapping around.
+
+    Args:
+        operation (str): One of the operations in KERNELS.
+        a (array_like): First operands.
+        b (array_like): Second operands, broadcastable against a.
+
+    Returns:
+        BatchResult: float64/int64 values (object Decimals after a fallback) and the error mask.
+    """
+    if np is None:
+        raise ImportError("NumPy is required for vectorized evaluation; use exact=True instead")
+    if operation not in KERNELS:
+        raise KeyError(f"No vectorized kernel for operation: {operation}")
+
+    a = np.asarray(a)
+    b = np.asarray(b)
+    dtype = np.int64 if a.dtype.kind in "iub" and b.dtype.kind in "iub" else np.float64
+    a, b = np.broadcast_arrays(a.astype(dtype, copy=False), b.astype(dtype, copy=False))
+
+    if operation in ZERO_MASKED:
+        errors = b == 0
+        valid = ~errors
+    else:
+        errors = np.zeros(a.shape, dtype=bool)
+        valid = None
+
+    if dtype is np.int64 and operation in ("add", "subtract", "multiply", "power"):
+        with np.errstate(over="ignore", invalid="ignore"):
+            estimate = KERNELS[operation](a.astype(np.float64), b.astype(np.float64), valid)
+        if np.any(np.abs(estimate) >= INT64_LIMIT):
+            return evaluate_exact(operation, a.tolist(), b.tolist())
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        values = KERNELS[operation](a, b, valid)
+    if values.dtype.kind == "f":
+        errors |= ~np.isfinite(values)  # e.g. 0 ** -1 or a fractional power of a negative number
+    return BatchResult(values, errors)
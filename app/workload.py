@@ -0,0 +1,286 @@
+import contextlib
+import os
+import random
+import socket
+import threading
+import time
+from array import array
+from collections import deque
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from app.calculations import Calculations, IndexedHistory
+from app.operations import operations
+
+# Operations and relative weights of the default mix
+DEFAULT_MIX = {"add": 30.0, "subtract": 20.0, "multiply": 20.0, "divide": 20.0, "modulus": 5.0, "power": 5.0}
+# Records generated per call to the random generator's bulk methods
+CHUNK = 10_000
+REPLAY_MODES = ("cli", "pool", "batch", "server")
+
+class WorkloadSpec(NamedTuple):
+    """What a generated workload looks like; the same spec and seed always give the same records."""
+    mix: Dict[str, float] = DEFAULT_MIX  # Operation -> relative weight
+    digits: int = 6  # Operands have up to this many digits before the decimal point
+    decimals: int = 2  # and up to this many after it
+    error_rate: float = 0.0  # Fraction of records that fail: division by zero or an invalid number
+    seed: int = 0
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parses an operation mix such as 'add=3,divide=1'.
+
+    Raises:
+        ValueError: If an operation is not registered or a weight is not a positive number.
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in operations:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] <= 0:
+            raise ValueError(f"Weight of {name} must be positive")
+    return mix
+
+class _Generator:
+    """Draws records for one spec from a seeded random generator."""
+
+    def __init__(self, spec: WorkloadSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.names = list(spec.mix)
+        self.arities = [operations.arity(name) for name in self.names]  # From the manifest; plugins stay unimported
+        self.cumulative = list(accumulate(spec.mix.values()))
+
+    def number(self, nonzero: bool = False) -> str:
+        places = self.rng.randrange(self.spec.decimals + 1)
+        value = self.rng.randrange(1 if nonzero else 0, 10 ** (self.spec.digits + places))
+        if not places:
+            return str(value)
+        text = str(value).rjust(places + 1, "0")
+        return f"{text[:-places]}.{text[-places:]}"
+
+    def integer(self, low: int = 0) -> str:
+        return str(self.rng.randrange(low, 10 ** self.spec.digits))
+
+    def record(self, index: int) -> str:
+        name, arity = self.names[index], self.arities[index]
+        if arity == 3:
+            return f"{self.integer()} {self.integer()} {self.integer(low=1)} {name}"  # modpow takes integers
+        if name == "power":
+            return f"{self.number()} {self.rng.randrange(10)} {name}"  # Small integral exponents, as in real use
+        return f"{self.number()} {self.number(nonzero=name in ('divide', 'modulus'))} {name}"
+
+    def error(self) -> str:
+        if self.rng.random() < 0.5:
+            return f"{self.number()} 0 divide"
+        return f"{self.number()} {self.number()}x add"
+
+    def chunk(self, size: int) -> List[str]:
+        picks = self.rng.choices(range(len(self.names)), cum_weights=self.cumulative, k=size)
+        error_rate, rng = self.spec.error_rate, self.rng
+        return [self.error() if error_rate and rng.random() < error_rate else self.record(index) for index in picks]
+
+def generate_workload(spec: WorkloadSpec, count: int) -> Iterator[str]:
+    """Yields count '<a> <b> <operation>' records ('<a> <b> <m> modpow' for three operands)."""
+    generator = _Generator(spec)
+    for start in range(0, count, CHUNK):
+        yield from generator.chunk(min(CHUNK, count - start))
+
+def write_workload(output: TextIO, spec: WorkloadSpec, count: int) -> int:
+    """Writes a generated workload, one record per line, in chunks; returns the number of records."""
+    generator = _Generator(spec)
+    for start in range(0, count, CHUNK):
+        output.write("\n".join(generator.chunk(min(CHUNK, count - start))))
+        output.write("\n")
+    return count
+
+class ReplayOptions(NamedTuple):
+    """How a replay is paced and sized."""
+    rate: Optional[float] = None  # Target records per second, None to go as fast as possible
+    max_in_flight: int = 64  # Records submitted to the pool and not yet answered, in 'pool' mode
+    chunk_size: int = 1000  # Records per chunk in 'batch' mode
+    # Calculations the history keeps during the replay, which is swapped for a bounded
+    # one so that long replays run in constant memory
+    history_capacity: int = 10_000
+
+class ReplayReport(NamedTuple):
+    """Achieved throughput and latency of one replay."""
+    mode: str
+    records: int
+    errors: int
+    elapsed: float
+    latencies: Sequence[float]  # Seconds from each request's scheduled start to its response; per chunk for batch
+    target_rate: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        """Records completed per second."""
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, percentile: float) -> float:
+        """Returns the given percentile (0-100) of the latencies in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def report(self) -> str:
+        """Formats the report for printing."""
+        target = f" (target {self.target_rate:,.0f}/s)" if self.target_rate else ""
+        unit = "chunk latency" if self.mode == "batch" else "latency"
+        return (f"{self.mode}: {self.records} records ({self.errors} errors) in {self.elapsed:.3f}s: "
+                f"{self.throughput:,.0f} records/s{target}, {unit} p50={self.latency(50) * 1000:.2f}ms "
+                f"p99={self.latency(99) * 1000:.2f}ms max={self.latency(100) * 1000:.2f}ms")
+
+def read_workload(stream: TextIO) -> Iterator[str]:
+    """Yields the non-blank records of a workload file."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+def _paced(records: Iterable[str], rate: Optional[float]) -> Iterator[Tuple[str, float]]:
+    """
+    Yields each record with the time it is scheduled to start, waiting until then.
+
+    The schedule is fixed up front (open loop): when the system under test falls behind,
+    requests are not sent later but count the wait towards their latency.
+    """
+    started = time.perf_counter()
+    for index, record in enumerate(records):
+        if rate:
+            scheduled = started + index / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield record, scheduled
+        else:
+            yield record, time.perf_counter()
+
+@contextlib.contextmanager
+def _bounded_history(capacity: int) -> Iterator[None]:
+    saved, Calculations.history = Calculations.history, IndexedHistory(capacity)
+    try:
+        yield
+    finally:
+        Calculations.history = saved
+
+def _replay_cli(records: Iterable[str], rate: Optional[float]) -> Tuple[int, int, array]:
+    from app.evaluation import evaluate  # pylint: disable=import-outside-toplevel
+    latencies, errors = array("d"), 0
+    for record, scheduled in _paced(records, rate):
+        outcome = evaluate(*record.split())
+        latencies.append(time.perf_counter() - scheduled)
+        errors += not outcome.ok
+    return len(latencies), errors, latencies
+
+def _replay_pool(records: Iterable[str], rate: Optional[float], pool, max_in_flight: int) -> Tuple[int, int, array]:
+    latencies, errors = array("d"), [0]
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def done(scheduled):
+        def record_outcome(outcome):
+            latencies.append(time.perf_counter() - scheduled)
+            errors[0] += not outcome.ok
+            slots.release()
+        return record_outcome
+
+    submitted = 0
+    for record, scheduled in _paced(records, rate):
+        slots.acquire()  # pylint: disable=consider-using-with
+        pool.submit(*record.split(), callback=done(scheduled))
+        submitted += 1
+    for _ in range(max_in_flight):
+        slots.acquire()  # pylint: disable=consider-using-with  # Waits for the last outcomes
+    return submitted, errors[0], latencies
+
+def _replay_batch(records: Iterable[str], rate: Optional[float], pool, chunk_size: int) -> Tuple[int, int, List[float]]:
+    from app.batch import run_batch  # pylint: disable=import-outside-toplevel
+    numbered = ((line_no, record) for line_no, (record, _) in enumerate(_paced(records, rate), start=1))
+    with open(os.devnull, "w", encoding="utf-8") as output:
+        summary = run_batch(numbered, output, pool=pool, chunk_size=chunk_size)
+    return summary.records, summary.errors, summary.chunk_latencies
+
+def _replay_server(records: Iterable[str], rate: Optional[float], address: Tuple[str, int]) -> Tuple[int, int, array]:
+    latencies, errors, scheduled_times = array("d"), [0], deque()
+    connection = socket.create_connection(address)
+
+    def receive():
+        with connection.makefile("rb") as responses:
+            for response in responses:
+                latencies.append(time.perf_counter() - scheduled_times.popleft())
+                errors[0] += not response.startswith(b"The result of")
+
+    receiver = threading.Thread(target=receive, name="replay-receiver")
+    receiver.start()
+    pending: List[bytes] = []
+    try:
+        for record, scheduled in _paced(records, rate):
+            scheduled_times.append(scheduled)
+            pending.append(record.encode() + b"\n")
+            if rate or len(pending) >= 256:  # Unpaced replays send in batches of lines
+                connection.sendall(b"".join(pending))
+                pending.clear()
+        connection.sendall(b"".join(pending) + b"exit\n")  # The server answers everything, then hangs up
+        receiver.join()
+    finally:
+        connection.close()
+    return len(latencies), errors[0], latencies
+
+@contextlib.contextmanager
+def background_server(pool=None) -> Iterator[Tuple[str, int]]:
+    """Runs a CalculationServer on a free local port in a background thread; yields its address."""
+    import asyncio  # pylint: disable=import-outside-toplevel
+    from app.server import CalculationServer  # pylint: disable=import-outside-toplevel
+    loop = asyncio.new_event_loop()
+    listener = loop.run_until_complete(CalculationServer(pool).start_tcp("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, name="replay-server", daemon=True)
+    thread.start()
+    try:
+        yield listener.sockets[0].getsockname()[:2]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        loop.close()
+
+def replay(records: Iterable[str], mode: str = "cli", pool=None, address: Optional[Tuple[str, int]] = None,
+           options: ReplayOptions = ReplayOptions()) -> ReplayReport:
+    """
+    Feeds records through one of the calculator's entry points and measures it.
+
+    Args:
+        records (Iterable[str]): '<a> <b> <operation>' records, e.g. from read_workload().
+        mode (str): 'cli' evaluates in this process like a one-shot command line, 'pool'
+            submits each record to the worker pool like the REPL, 'batch' streams chunks
+            through run_batch(), and 'server' sends lines to a calculation server.
+        pool (CalculationPool): Pool for the 'pool' and 'batch' modes, and for the server
+            that 'server' mode starts when no address is given.
+        address (tuple): (host, port) of a running server for 'server' mode.
+        options (ReplayOptions): Target rate, pool and batch sizes, and history capacity.
+
+    Returns:
+        ReplayReport: Record and error counts, achieved throughput and latencies.
+    """
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Unknown replay mode: {mode} (choose from {', '.join(REPLAY_MODES)})")
+    if mode in ("pool", "batch") and pool is None:
+        raise ValueError(f"Replay mode {mode} needs a pool")
+    rate = options.rate
+    with _bounded_history(options.history_capacity), contextlib.ExitStack() as stack:
+        if mode == "server" and address is None:
+            address = stack.enter_context(background_server(pool))
+        started = time.perf_counter()
+        if mode == "cli":
+            count, errors, latencies = _replay_cli(records, rate)
+        elif mode == "pool":
+            count, errors, latencies = _replay_pool(records, rate, pool, options.max_in_flight)
+        elif mode == "batch":
+            count, errors, latencies = _replay_batch(records, rate, pool, options.chunk_size)
+        else:
+            count, errors, latencies = _replay_server(records, rate, address)
+        return ReplayReport(mode, count, errors, time.perf_counter() - started, latencies, rate)
@@ -1,35 +1,68 @@
 """Interactive Calculator Using the Command Pattern with Multiprocessing and Logging"""
 
+# app.startup notes the time it is imported, so it comes before everything whose import it times
+from app.startup import mark_phase, report_phases
+
+# pylint: disable=wrong-import-order
 import os
 import sys
-import multiprocessing
 import logging
-from decimal import Decimal, InvalidOperation
-from dotenv import load_dotenv
-from app.calculation import Calculation
+from typing import Optional
+# pylint: enable=wrong-import-order
 from app.operations import operations  # Import dynamically loaded operations
+from app.backends import backend_from_environment, get_backend, set_backend
+from app.decimal_context import ContextSettings, apply_settings
+from app.evaluation import evaluate
+from app.log_queue import start_queued_logging, stop_queued_logging
+from app.metrics import metrics, start_metrics_export, stop_metrics_export
+from app.reductions import reductions
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Access environment variables
-ENVIRONMENT = os.getenv("ENVIRONMENT", "production")  # Default to "production"
-DATABASE_USERNAME = os.getenv("DATABASE_USERNAME", "default_user")
+# Only what a single command-line calculation needs is imported above. The worker pool
+# (multiprocessing), batch mode, argparse and python-dotenv are imported when first used.
 
 # Configure Logging
 LOGGING_CONFIG = "logging.conf"
 
-if os.path.exists(LOGGING_CONFIG):
-    logging.config.fileConfig(LOGGING_CONFIG)
-else:
-    logging.basicConfig(
-        level=logging.DEBUG if ENVIRONMENT == "development" else logging.INFO,
-        format="%(asctime)s [%(levelname)s] - %(message)s",
-        handlers=[logging.StreamHandler()]  # Log to console
-    )
+def find_dotenv_file() -> Optional[str]:
+    """Looks for a .env file in the working directory, then next to main.py and its parents."""
+    if os.path.exists(".env"):
+        return os.path.abspath(".env")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.exists(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+def load_environment():
+    """Loads environment variables from a .env file; python-dotenv is only imported if one exists."""
+    dotenv_path = find_dotenv_file()
+    if dotenv_path is not None:
+        from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+        load_dotenv(dotenv_path)
+
+def configure_logging():
+    """Configures logging from logging.conf, or logs to the console when it is missing."""
+    # Access environment variables
+    environment = os.getenv("ENVIRONMENT", "production")  # Default to "production"
+    database_username = os.getenv("DATABASE_USERNAME", "default_user")
+
+    os.makedirs("logs", exist_ok=True)  # The rotating file handler in logging.conf writes to logs/
+    if os.path.exists(LOGGING_CONFIG):
+        from logging.config import fileConfig  # pylint: disable=import-outside-toplevel
+        fileConfig(LOGGING_CONFIG)
+    else:
+        logging.basicConfig(
+            level=logging.DEBUG if environment == "development" else logging.INFO,
+            format="%(asctime)s [%(levelname)s] - %(message)s",
+            handlers=[logging.StreamHandler()]  # Log to console
+        )
 
-logging.info(f"Running in {ENVIRONMENT} mode")
-logging.info(f"Database Username: {DATABASE_USERNAME}")
+    logging.info("Running in %s mode", environment)
+    logging.info("Database Username: %s", database_username)
 
 def load_commands():
     """Dynamically loads available commands, including plugins."""
@@ -37,75 +70,359 @@ def load_commands():
         logging.error("No operations found. Ensure plugins are properly loaded.")
     return operations  # Return the entire operations dictionary
 
-def calculate_and_print(a, b, operation):
-    """Performs calculation in a separate process and logs the result."""
-    commands = load_commands()
+def calculate_and_print(*tokens):
+    """Performs a calculation, given as operands followed by the operation, in the current process and prints the result."""
+    print(evaluate(*tokens).message)
 
-    if operation not in commands:
-        logging.error(f"Unknown operation: {operation}")
-        print(f"Unknown operation: {operation}")
-        return
+# Worker pool shared by every calculation of this process, started on first use
+_pool = None
 
-    try:
-        a = Decimal(a)
-        b = Decimal(b)
-        calc = Calculation(a, b, commands[operation])
-        result = calc.perform()
-        logging.info(f"Calculated: {a} {operation} {b} = {result}")
-        print(f"The result of {a} {operation} {b} is equal to {result}")
-    except ZeroDivisionError:
-        logging.error("Error: Cannot divide by zero")
-        print("An error occurred: Cannot divide by zero")
-    except InvalidOperation:
-        logging.error(f"Invalid number input: {a} or {b} is not a valid number.")
-        print(f"Invalid number input: {a} or {b} is not a valid number.")
-    except Exception as e:
-        logging.exception(f"Unexpected error: {str(e)}")
-        print(f"An unexpected error occurred: {str(e)}")
-
-def execute_command(a, b, operation):
-    """Executes a mathematical operation using multiprocessing."""
-    process = multiprocessing.Process(target=calculate_and_print, args=(a, b, operation))
-    process.start()
-    process.join()  # Ensure the process completes before proceeding
+def get_pool():
+    """Returns the shared calculation pool, starting it on first use."""
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        from app.pool import CalculationPool  # pylint: disable=import-outside-toplevel
+        _pool = CalculationPool.from_environment().start()
+    return _pool
+
+def shutdown_pool(force: bool = False):
+    """Stops the shared calculation pool; force abandons in-flight calculations."""
+    global _pool  # pylint: disable=global-statement
+    if _pool is not None:
+        if force:
+            _pool.terminate()
+        else:
+            _pool.close()
+        _pool = None
+
+def execute_command(*tokens):
+    """Executes a mathematical operation, given as operands followed by the operation, on the shared worker pool and prints the result."""
+    print(get_pool().run(*tokens).message)
 
 def interactive_mode():
     """Runs the calculator in interactive REPL mode."""
     print("Welcome to the Interactive Calculator (type 'exit' to quit, 'menu' for available commands)")
 
     commands = load_commands()
+    try:
+        repl_loop(commands)
+    except KeyboardInterrupt:
+        print("\nExiting calculator. Goodbye!")
+        shutdown_pool(force=True)
+    finally:
+        shutdown_pool()
+
+def evaluate_and_print(expression, results):
+    """Evaluates an expression such as 'add(2, multiply($1, 3))' in-process and remembers its value."""
+    from app.expressions import ExpressionError, evaluate_expression  # pylint: disable=import-outside-toplevel
+    try:
+        result = evaluate_expression(expression, results=results)
+    except ExpressionError as e:
+        print(f"Invalid expression: {e}")
+    except (ValueError, ArithmeticError) as e:
+        print(f"An error occurred: {e}")
+    else:
+        results.append(result)
+        print(f"${len(results)} = {result}")
+
+def select_backend(name):
+    """Switches the numeric backend for the rest of the session, or shows the current one when no name is given."""
+    if name:
+        try:
+            set_backend(name)
+        except ValueError as e:
+            print(e)
+            return
+    print(f"Calculating with the {get_backend().name} backend")
+
+def repl_loop(commands):
+    """Reads and executes calculations until the user types 'exit'."""
+    results = []  # Values of earlier 'eval' expressions, referenced as $1, $2, ... and _
     while True:
         user_input = input("\nEnter calculation (e.g., '5 3 add'): ").strip().lower()
         if user_input == "exit":
             print("Exiting calculator. Goodbye!")
             break
         elif user_input == "menu":
-            print("\nAvailable commands:", ", ".join(commands.keys()))  # Shows dynamically loaded plugins
+            print("\nAvailable commands:", ", ".join([*commands.keys(), *reductions]))  # Shows dynamically loaded plugins
+            continue
+        elif user_input == "stats":
+            print(metrics.report())  # Includes calculations run on the pool workers, and OperationTimeout counts
+            if _pool is not None and _pool.timeouts:
+                print(f"Pool workers killed and replaced after overrunning their time budget: {_pool.timeouts}")
+            continue
+        elif user_input == "cache":
+            stats = get_pool().cache_stats()
+            if stats is None:
+                print("Result cache is disabled (set CALC_CACHE=1 to enable it)")
+            else:
+                print(f"Cache hits: {stats.hits}, misses: {stats.misses}, evictions: {stats.evictions}, hit rate: {stats.hit_rate:.1%}")
+            continue
+        elif user_input == "backend" or user_input.startswith("backend "):
+            select_backend(user_input[8:].strip())  # Pool workers follow: every task carries the backend name
+            continue
+        elif user_input.startswith("eval "):
+            evaluate_and_print(user_input[5:], results)
             continue
 
         parts = user_input.split()
-        if len(parts) != 3:
+        if len(parts) < 3:
             print("Invalid input. Use format: <number1> <number2> <operation>")
             continue
 
-        a, b, operation = parts
-        execute_command(a, b, operation)
+        execute_command(*parts)  # Three-operand operations such as modpow take '<a> <b> <m> modpow'
+
+def batch_mode(argv):
+    """Evaluates '<number1> <number2> <operation>' records from a file or stdin and prints a summary."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    from app.batch import run_batch_file  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py batch", description=batch_mode.__doc__)
+    parser.add_argument("input", nargs="?", default="-", help="file with one record per line, '-' for stdin")
+    parser.add_argument("--output", "-o", help="write result rows to this file instead of stdout")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="records sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                summary = run_batch_file(args.input, output, pool=get_pool(), chunk_size=args.chunk_size)
+        else:
+            summary = run_batch_file(args.input, sys.stdout, pool=get_pool(), chunk_size=args.chunk_size)
+    except KeyboardInterrupt:
+        shutdown_pool(force=True)
+        sys.exit(130)
+    finally:
+        shutdown_pool()
+    print(summary.report(), file=sys.stderr)
+
+def serve_mode(argv):
+    """Serves the '<number1> <number2> <operation>' line protocol over TCP or a Unix socket."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    import asyncio  # pylint: disable=import-outside-toplevel
+    from app.server import CalculationServer, serve  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py serve", description=serve_mode.__doc__)
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(CalculationServer(get_pool()), args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        logging.info("Calculation server interrupted. Exiting gracefully.")
+        shutdown_pool(force=True)
+    finally:
+        shutdown_pool()
+
+def bench_mode(argv):
+    """Runs the benchmark suite, optionally saving a JSON baseline or comparing against one."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    from app import bench  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py bench", description=bench_mode.__doc__)
+    parser.add_argument("--filter", default="*", help="glob of benchmark names to run, e.g. 'operation.*'")
+    parser.add_argument("--save", metavar="FILE", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=bench.DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression, as a fraction of the baseline")
+    parser.add_argument("--repeat", type=int, default=7, help="timed rounds per benchmark")
+    parser.add_argument("--scale", type=int, default=bench.DEFAULT_SCALE, help="entries in the history benchmarks")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)  # Per-call INFO records would swamp the output and the timings
+    results = bench.run_benchmarks(args.filter, args.repeat, scale=args.scale)
+    comparisons = bench.compare(results, bench.load_baseline(args.compare)) if args.compare else []
+    print(bench.report(results, comparisons, args.threshold))
+    if args.save:
+        bench.save_baseline(results, args.save)
+    regressions = [comparison.name for comparison in comparisons if comparison.regressed(args.threshold)]
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+def reduce_mode(argv):
+    """Streams numbers from a file or stdin through a reduction such as sum, in blocks spread over the worker pool."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    from decimal import InvalidOperation  # pylint: disable=import-outside-toplevel
+    from app.reductions import DEFAULT_BLOCK_SIZE, reduce_stream  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py reduce", description=reduce_mode.__doc__)
+    parser.add_argument("reduction", choices=list(reductions), help="reduction to compute")
+    parser.add_argument("input", nargs="?", default="-", help="file of whitespace-separated numbers, '-' for stdin")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="bytes of input sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.input == "-":
+            summary = reduce_stream(args.reduction, sys.stdin.buffer, pool=get_pool(), block_size=args.block_size)
+        else:
+            with open(args.input, "rb") as stream:
+                summary = reduce_stream(args.reduction, stream, pool=get_pool(), block_size=args.block_size)
+    except KeyboardInterrupt:
+        shutdown_pool(force=True)
+        sys.exit(130)
+    except (InvalidOperation, ValueError) as e:
+        shutdown_pool(force=True)
+        print(f"Cannot compute {args.reduction}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        shutdown_pool()
+    print(summary.result)
+    print(summary.report(), file=sys.stderr)
+
+def workload_mode(argv):
+    """Generates a synthetic workload file, or replays one through an entry point at a target rate."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    from app import workload  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py workload", description=workload_mode.__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="write a seeded, reproducible workload")
+    generate.add_argument("output", help="file to write, '-' for stdout")
+    generate.add_argument("--count", type=int, default=100_000, help="records to generate")
+    generate.add_argument("--seed", type=int, default=0, help="seed; the same seed gives the same file")
+    generate.add_argument("--mix", type=workload.parse_mix, default=workload.DEFAULT_MIX,
+                          help="operations and relative weights, e.g. 'add=3,divide=1'")
+    generate.add_argument("--digits", type=int, default=6, help="digits before the decimal point")
+    generate.add_argument("--decimals", type=int, default=2, help="digits after the decimal point")
+    generate.add_argument("--error-rate", type=float, default=0.0, help="fraction of records that fail")
+    play = commands.add_parser("replay", help="replay a workload and report throughput and latency")
+    play.add_argument("input", help="workload file, '-' for stdin")
+    play.add_argument("--mode", choices=workload.REPLAY_MODES, default="cli", help="entry point to drive")
+    play.add_argument("--rate", type=float, help="target records per second (default: as fast as possible)")
+    play.add_argument("--host", default="127.0.0.1", help="server to replay against in server mode")
+    play.add_argument("--port", type=int, help="server port; without one, a server is started in this process")
+    play.add_argument("--chunk-size", type=int, default=1000, help="records per chunk in batch mode")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        spec = workload.WorkloadSpec(args.mix, args.digits, args.decimals, args.error_rate, args.seed)
+        if args.output == "-":
+            workload.write_workload(sys.stdout, spec, args.count)
+        else:
+            with open(args.output, "w", encoding="utf-8") as output:
+                workload.write_workload(output, spec, args.count)
+        return
+
+    logging.getLogger().setLevel(logging.CRITICAL)  # Generated errors are expected; logging them would skew the timings
+    address = (args.host, args.port) if args.port else None
+    needs_pool = args.mode in ("pool", "batch") or (args.mode == "server" and address is None)
+    try:
+        with (sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")) as stream:
+            report = workload.replay(workload.read_workload(stream), args.mode,
+                                     pool=get_pool() if needs_pool else None, address=address,
+                                     options=workload.ReplayOptions(args.rate, chunk_size=args.chunk_size))
+    except KeyboardInterrupt:
+        shutdown_pool(force=True)
+        sys.exit(130)
+    finally:
+        shutdown_pool()
+    print(report.report())
+
+def _durable_history(path):
+    """Opens the history log at path, or returns the configured history if it is a log; None if the history is in memory only."""
+    from app.history_log import LogHistory  # pylint: disable=import-outside-toplevel
+    if path:
+        return LogHistory(path)
+    from app.calculations import Calculations  # pylint: disable=import-outside-toplevel
+    return Calculations.history if isinstance(Calculations.history, LogHistory) else None
+
+def history_mode(argv):
+    """Exports the history log to a CSV or binary file, or imports one into it, streaming in batches."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    from app.history_export import DEFAULT_BATCH_SIZE, FORMATS, export_history, import_history  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(prog="main.py history", description=history_mode.__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write every calculation of the history to a file")
+    export.add_argument("output", help="file to write, '-' for stdout")
+    export.add_argument("--format", choices=FORMATS, default="csv", help="csv, or the compact binary log format")
+    load = commands.add_parser("import", help="append the calculations of an exported file or log to the history")
+    load.add_argument("input", help="file to read, '-' for stdin; the format is recognized from its first bytes")
+    for command in (export, load):
+        command.add_argument("--log", help="history log to use, by default the one CALC_HISTORY_LOG names")
+        command.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="calculations handled at once")
+    args = parser.parse_args(argv)
+
+    try:
+        store = _durable_history(args.log)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open the history log: {e}", file=sys.stderr)
+        sys.exit(1)
+    if store is None:
+        # An in-memory history would start empty and lose what is imported at exit
+        print(f"Cannot {args.command} the history: it is kept in memory only; pass --log PATH or set CALC_HISTORY_LOG",
+              file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.command == "export":
+            summary = export_history(args.output, args.format, calculations=iter(store), batch_size=args.batch_size)
+        else:
+            summary = import_history(args.input, store=store, batch_size=args.batch_size)
+    except (OSError, ValueError) as e:
+        print(f"Cannot {args.command} the history: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()  # Syncs the log
+    print(summary.report(), file=sys.stderr)
+
+def profile_startup_mode(argv):
+    """Profiles the startup of 'python main.py <argv>' and benchmarks it against the budget."""
+    from app.startup import benchmark_startup, profile_startup  # pylint: disable=import-outside-toplevel
+    argv = argv or ["5", "3", "add"]
+    print(profile_startup(argv))
+    print(benchmark_startup(argv).report())
 
 def main():
-    """Runs either interactive mode or command-line mode based on user input."""
-    if len(sys.argv) == 1:
+    """Runs either interactive mode, batch mode or command-line mode based on user input."""
+    mark_phase("imports")
+    if len(sys.argv) > 2 and sys.argv[1] == "--backend":
+        os.environ["CALC_BACKEND"] = sys.argv[2]  # Takes precedence over a .env file, which never overrides
+        del sys.argv[1:3]
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        profile_startup_mode(sys.argv[2:])
+        return
+    load_environment()
+    apply_settings(ContextSettings.from_environment())  # Inherited by server threads and pool workers
+    set_backend(backend_from_environment())
+    mark_phase("environment")
+    configure_logging()
+    start_queued_logging()  # Only when CALC_LOG_QUEUE is set; records are written by a listener thread
+    start_metrics_export()  # Only when CALC_METRICS_FILE is set
+    mark_phase("logging")
+    try:
+        run_mode()
+    finally:
+        stop_metrics_export()
+        stop_queued_logging()  # Flushes queued records before the process exits
+
+def run_mode():
+    """Dispatches to the mode selected by the command-line arguments."""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_mode(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve_mode(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench_mode(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "reduce":
+        reduce_mode(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "workload":
+        workload_mode(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "history":
+        history_mode(sys.argv[2:])
+    elif len(sys.argv) == 1:
         interactive_mode()
-    elif len(sys.argv) == 4:
-        _, a, b, operation = sys.argv
-        execute_command(a, b, operation)
+    elif len(sys.argv) in (4, 5):
+        # A single calculation runs in this process: starting a worker pool would cost
+        # far more than the calculation itself
+        calculate_and_print(*sys.argv[1:])
+        mark_phase("calculation")
+        report_phases()
     else:
-        print("Usage: python main.py OR python main.py <number1> <number2> <operation>")
+        print("Usage: python main.py [--backend decimal|float|fraction] [<number1> <number2> <operation>] OR python main.py batch [file] "
+              "OR python main.py serve [--port PORT | --unix PATH] "
+              "OR python main.py bench [--save FILE] [--compare FILE] "
+              "OR python main.py reduce sum|mean|variance|product [file] "
+              "OR python main.py workload generate|replay ... "
+              "OR python main.py history export|import FILE [--log PATH] "
+              "OR python main.py --profile-startup [arguments]")
         sys.exit(1)
 
 if __name__ == '__main__':
-    if sys.platform == "win32":
-        multiprocessing.set_start_method("spawn", force=True)  # Ensure compatibility on Windows
-    else:
-        multiprocessing.set_start_method("fork", force=True)  # Use 'fork' for Unix-like systems
-
-    main()
+    main()  # The pool picks 'spawn' on Windows and 'fork' elsewhere unless CALC_POOL_START_METHOD is set
@@ -0,0 +1,104 @@
+"""Test the decimal, float and fraction numeric backends"""
+
+# Standard library imports
+from decimal import Decimal
+from fractions import Fraction
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.backends import get_backend, load_backend, parse_stored, set_backend
+from app.batch import evaluate_record
+from app.cache import ResultCache
+from app.calculation import Calculation
+from app.evaluation import evaluate
+from app.expressions import evaluate_expression
+from app.history_log import LogHistory
+from app.operations import operations
+from app.pool import CalculationPool
+
+BACKENDS = ["decimal", "float", "fraction"]
+
+@pytest.fixture(name="use_backend")
+def fixture_use_backend():
+    """Fixture that switches this process's backend and switches it back after the test."""
+    saved = get_backend().name
+    yield set_backend
+    set_backend(saved)
+
+@pytest.mark.parametrize("backend, message, value", [
+    ("decimal", "The result of 1 divide 4 is equal to 0.25", Decimal("0.25")),
+    ("float", "The result of 1.0 divide 4.0 is equal to 0.25", 0.25),
+    ("fraction", "The result of 1 divide 4 is equal to 1/4", Fraction(1, 4)),
+])
+def test_results_have_the_backend_type(use_backend, backend, message, value):
+    """Test that operands are parsed, and results computed, in the selected backend's type."""
+    use_backend(backend)
+    outcome = evaluate("1", "4", "divide")
+    assert outcome.message == message
+    assert outcome.result == value and type(outcome.result) is type(value)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("operation", ["divide", "modulus"])
+def test_division_by_zero_is_reported_the_same_way(use_backend, backend, operation):
+    """Test that every backend raises ZeroDivisionError for a zero divisor, modulus included."""
+    use_backend(backend)
+    parse = get_backend().parse
+    with pytest.raises(ZeroDivisionError, match="Cannot divide by zero"):
+        operations[operation](parse("5"), parse("0"))
+    assert evaluate("5", "0", operation).message == "An error occurred: Cannot divide by zero"
+    assert evaluate_record(1, f"5 0 {operation}") == "1\terror\tCannot divide by zero"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_invalid_numbers_are_reported_the_same_way(use_backend, backend):
+    """Test that unparseable operands give the same message whatever the backend."""
+    use_backend(backend)
+    assert evaluate("5", "x", "add").message == "Invalid number input: 5 or x is not a valid number."
+
+def test_plugins_compute_in_every_backend(use_backend):
+    """Test the power and modpow plugins outside Decimal."""
+    use_backend("fraction")
+    assert evaluate("2/3", "3", "power").result == Fraction(8, 27)
+    assert evaluate("4", "13", "497", "modpow").result == Fraction(445)
+    assert "modpow needs integer operands" in evaluate("1/2", "3", "7", "modpow").message
+    assert "over the limit" in evaluate("10", "10000000", "power").message
+    use_backend("float")
+    assert evaluate("2", "0.5", "power").result == pytest.approx(2 ** 0.5)
+    assert evaluate("4", "13", "497", "modpow").result == 445.0
+    assert "is not a real number" in evaluate("-8", "0.5", "power").message
+
+def test_unknown_backend():
+    """Test that only the three backends can be selected."""
+    with pytest.raises(ValueError, match="Unknown backend: int"):
+        load_backend("int")
+    assert load_backend(" Float ").name == "float"
+
+def test_cache_and_plans_are_not_shared_between_backends(use_backend):
+    """Test that results cached, or constants compiled, under one backend are not reused by another."""
+    cache = ResultCache()
+    assert cache.perform("divide", Calculation(Decimal(2), Decimal(1), operations["divide"])) == Decimal(2)
+    result = cache.perform("divide", Calculation(Fraction(2), Fraction(1), operations["divide"]))
+    assert isinstance(result, Fraction) and len(cache) == 2
+
+    assert evaluate_expression("divide(1, 3)") == Decimal(1) / Decimal(3)
+    use_backend("fraction")
+    assert evaluate_expression("divide(1, 3)") == Fraction(1, 3)
+
+def test_history_log_reads_back_fractions(tmp_path):
+    """Test that fractions written to the log are read back as fractions under any backend."""
+    log = LogHistory(str(tmp_path / "history.log"))
+    log.append(Calculation(Fraction(1, 3), Fraction(2), operations["multiply"]))
+    log.close()
+    reopened = LogHistory(str(tmp_path / "history.log"))
+    assert (reopened[0].a, reopened[0].b) == (Fraction(1, 3), Fraction(2))
+    assert reopened[0].perform() == Fraction(2, 3)
+    reopened.close()
+    assert parse_stored("0.1", "2") == (Decimal("0.1"), Decimal(2))
+
+def test_pool_workers_follow_the_backend(use_backend):
+    """Test that tasks run under the backend selected when they are submitted, even after a switch."""
+    with CalculationPool(processes=1) as pool:
+        assert pool.run("1", "3", "divide").result == Decimal(1) / Decimal(3)
+        use_backend("fraction")
+        assert pool.run("1", "3", "divide").result == Fraction(1, 3)
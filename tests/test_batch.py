@@ -0,0 +1,75 @@
+"""Test streaming batch evaluation"""
+
+# Standard library imports
+import io
+import time
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.batch import chunked, evaluate_record, read_records, run_batch
+from app.budgets import Budget
+from app.operations import operations
+from app.pool import CalculationPool
+
+def hang(_x, _y):
+    """Never returns, and swallows the timeout, so only killing its worker stops it."""
+    while True:
+        try:
+            time.sleep(0.01)
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass
+
+@pytest.mark.parametrize("text, expected_row", [
+    ("5 3 add", "1\tok\t8"),
+    ("2 3 power", "1\tok\t8"),  # Plugin test
+    ("1 0 divide", "1\terror\tCannot divide by zero"),
+    ("a 3 add", "1\terror\tInvalid number input: a or 3 is not a valid number."),
+    ("9 3 unknown", "1\terror\tUnknown operation: unknown"),
+    ("1 2", "1\terror\tMalformed record: expected <number1> <number2> <operation>"),
+])
+def test_evaluate_record(text, expected_row):
+    """Test that every record becomes a row, including the ones that fail."""
+    assert evaluate_record(1, text) == expected_row
+
+def test_read_records_skips_blank_lines():
+    """Test that blank lines are skipped but line numbers are preserved."""
+    records = list(read_records(io.StringIO("5 3 add\n\n  \n1 1 add\n")))
+    assert records == [(1, "5 3 add"), (4, "1 1 add")]
+
+def test_chunked():
+    """Test that records are grouped into bounded chunks."""
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+def test_run_batch_in_process():
+    """Test that a batch without a pool writes rows in order and counts errors."""
+    output = io.StringIO()
+    summary = run_batch(read_records(io.StringIO("5 3 add\n1 0 divide\n4 5 multiply\n")), output, chunk_size=2)
+    assert output.getvalue().splitlines() == ["1\tok\t8", "2\terror\tCannot divide by zero", "3\tok\t20"]
+    assert (summary.records, summary.errors) == (3, 1)
+    assert "3 records (1 errors)" in summary.report()
+
+def test_run_batch_on_pool_preserves_order():
+    """Test that chunks evaluated in parallel are written back in input order."""
+    lines = "".join(f"{i} 1 add\n" for i in range(50))
+    output = io.StringIO()
+    with CalculationPool(processes=2) as pool:
+        summary = run_batch(read_records(io.StringIO(lines)), output, pool=pool, chunk_size=7, max_in_flight=3)
+    assert output.getvalue().splitlines() == [f"{i + 1}\tok\t{i + 1}" for i in range(50)]
+    assert summary.records == 50
+    assert len(summary.chunk_latencies) == 8
+
+def test_failed_chunk_becomes_error_rows():
+    """Test that a chunk whose worker is killed is written as one error row per record, and the batch goes on."""
+    operations["hang"] = hang
+    lines = "1 1 add\n2 2 add\n3 3 hang\n4 4 add\n5 5 add\n"
+    output = io.StringIO()
+    try:
+        with CalculationPool(processes=2, start_method="fork", budgets={"*": Budget(0.2)}) as pool:
+            summary = run_batch(read_records(io.StringIO(lines)), output, pool=pool, chunk_size=2)
+    finally:
+        del operations["hang"]
+    assert output.getvalue().splitlines() == ["1\tok\t2", "2\tok\t4", "3\terror\tOperationTimeout: it took longer than 0.2s",
+                                              "4\terror\tOperationTimeout: it took longer than 0.2s", "5\tok\t10"]
+    assert (summary.records, summary.errors) == (5, 2)
@@ -0,0 +1,62 @@
+"""Test the benchmark suite and its baselines"""
+
+# Standard library imports
+import os
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.bench import (BENCHMARKS, BenchmarkResult, Comparison, compare, load_baseline, measure, report,
+                       run_benchmarks, save_baseline)
+from app.calculations import Calculations
+
+def test_suite_covers_operations_history_and_dispatch():
+    """Test that the suite has benchmarks for every area it is meant to cover."""
+    for name in ("operation.add", "operation.modulus", "operation.power", "history.add_calculation",
+                 "history.find_by_operation", "dispatch.command_handler", "end_to_end.execute_command"):
+        assert name in BENCHMARKS
+
+def test_run_restores_the_history():
+    """Test that the history benchmarks leave the calculator's history as they found it."""
+    history = Calculations.history
+    results = run_benchmarks("history.*", repeat=1, min_time=0.001, scale=100)
+    assert [result.name for result in results] == ["history.add_calculation", "history.find_by_operation"]
+    assert Calculations.history is history
+
+def test_measure_reports_time_per_call():
+    """Test that measure() reports a positive median no lower than the best round."""
+    result = measure("noop", lambda: None, repeat=3, min_time=0.001)
+    assert 0 < result.best_ns <= result.median_ns
+    assert result.calls >= 1
+
+def test_baseline_round_trip_and_regressions(tmp_path):
+    """Test that a saved baseline is read back and slowdowns past the threshold are flagged."""
+    path = str(tmp_path / "baseline.json")
+    save_baseline([BenchmarkResult("fast", 100.0, 90.0, 1000), BenchmarkResult("slow", 200.0, 180.0, 500)], path)
+    baseline = load_baseline(path)
+    assert baseline["fast"] == BenchmarkResult("fast", 100.0, 90.0, 1000)
+
+    current = [BenchmarkResult("fast", 105.0, 95.0, 1000), BenchmarkResult("slow", 300.0, 250.0, 500),
+               BenchmarkResult("new", 50.0, 40.0, 10)]
+    comparisons = compare(current, baseline)
+    assert comparisons == [Comparison("fast", 100.0, 105.0), Comparison("slow", 200.0, 300.0)]
+    assert [comparison.regressed(0.10) for comparison in comparisons] == [False, True]
+    assert "+50.0%  REGRESSION" in report(current, comparisons, 0.10)
+
+def test_unknown_baseline_version_is_rejected(tmp_path):
+    """Test that a baseline from an incompatible format is not silently compared."""
+    path = tmp_path / "baseline.json"
+    path.write_text('{"version": 99, "results": {}}', encoding="utf-8")
+    with pytest.raises(ValueError, match="Unsupported baseline version"):
+        load_baseline(str(path))
+
+@pytest.mark.benchmark
+def test_benchmark_suite(tmp_path):
+    """Benchmark: runs the whole suite and fails on regressions against CALC_BENCH_BASELINE, if set."""
+    results = run_benchmarks()
+    save_baseline(results, str(tmp_path / "latest.json"))
+    baseline_path = os.getenv("CALC_BENCH_BASELINE")
+    comparisons = compare(results, load_baseline(baseline_path)) if baseline_path else []
+    print(f"\n{report(results, comparisons)}")
+    assert not [comparison.name for comparison in comparisons if comparison.regressed()]
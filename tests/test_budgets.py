@@ -0,0 +1,131 @@
+"""Test per-operation time and memory budgets on the calculation pool"""
+
+# Standard library imports
+import resource
+import signal
+import time
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.budgets import Budget, OperationTimeout, budgets_from_environment, enforced, parse_limits
+from app.calculation import Calculation
+from app.calculations import Calculations
+from app.history_log import encode_record
+from app.metrics import metrics
+from app.operations import operations
+from app.pool import CalculationPool
+
+def spin(x, y):
+    """Loops forever in Python code, which a soft timeout interrupts."""
+    while True:
+        x += y
+
+def stuck(_x, _y):
+    """Loops forever and swallows every exception, so only killing its worker stops it."""
+    while True:
+        try:
+            time.sleep(0.01)
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass
+
+def hoard(_x, _y):
+    """Writes to the history ring, whose lock it holds much of the time, until its worker is killed."""
+    ring, record = Calculations.history.ring, encode_record(Calculation(Decimal(1), Decimal(2), operations["add"]))
+    while True:
+        try:
+            ring.write(record)
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass
+
+def hog(x, y):
+    """Allocates far more memory than its budget."""
+    return len(bytearray(1 << 30)) + x + y
+
+def nap(x, y):
+    """Takes a while, within any budget."""
+    time.sleep(0.6)
+    return x + y
+
+@pytest.fixture(name="pool")
+def fixture_pool():
+    """Fixture that registers the test operations and yields a forked pool with budgets for them."""
+    for func in (spin, stuck, hoard, hog, nap):
+        operations[func.__name__] = func
+    budgets = {"spin": Budget(0.2), "stuck": Budget(0.2), "hoard": Budget(0.2), "hog": Budget(memory_bytes=64 << 20),
+               "*": Budget(5.0)}
+    try:
+        with CalculationPool(processes=2, start_method="fork", budgets=budgets) as pool:
+            yield pool
+    finally:
+        for func in (spin, stuck, hoard, hog, nap):
+            del operations[func.__name__]
+
+def test_soft_timeout_keeps_the_worker(pool):
+    """Test that a calculation looping in Python is cancelled inside its worker."""
+    started = time.monotonic()
+    outcome = pool.run("1", "2", "spin")
+    assert not outcome.ok and outcome.message == "spin was stopped: it took longer than 0.2s"
+    assert time.monotonic() - started < 1.0
+    assert pool.timeouts == 0
+    assert pool.run("1", "2", "add").result == 3
+
+def test_runaway_worker_is_replaced_without_disturbing_others(pool):
+    """Test that a calculation ignoring the timeout has its worker killed, while another one completes."""
+    metrics.reset()
+    other = pool.submit("1", "2", "nap")
+    started = time.monotonic()
+    outcome = pool.run("1", "2", "stuck")
+    assert not outcome.ok and outcome.message == "stuck was stopped: it took longer than 0.2s"
+    assert time.monotonic() - started < 3.0
+    assert other.get(5).result == 3
+    assert pool.timeouts == 1
+    assert pool.run("2", "2", "add").result == 4  # Served by the replacement worker
+    assert metrics.snapshot().errors[("request", "stuck", "OperationTimeout")] == 1
+
+@pytest.mark.parametrize("attempt", range(3))
+def test_killed_worker_leaves_the_shared_locks_free(pool, attempt):
+    """Test that a worker killed while it keeps taking the history ring's lock does not leave the lock taken."""
+    outcome = pool.submit(str(attempt), "2", "hoard").get(10)
+    assert not outcome.ok and outcome.message == "hoard was stopped: it took longer than 0.2s"
+    assert pool.submit("1", "2", "add").get(10).result == 3
+    assert pool.collect_history() >= 0  # Takes the ring's lock in this process
+
+def test_memory_budget(pool):
+    """Test that a calculation allocating beyond its budget fails with a message, and its worker goes on."""
+    outcome = pool.run("1", "2", "hog")
+    assert not outcome.ok and outcome.message == "hog was stopped: it needed more memory than its budget"
+    assert pool.run("1", "2", "add").ok
+
+def test_budget_expiring_as_the_calculation_ends(monkeypatch):
+    """Test that a timer firing after the body returned, before it is disarmed, still restores the handler and limits."""
+    set_timer = signal.setitimer
+
+    def late_timer(which, seconds, *interval):
+        if seconds == 0:
+            signal.getsignal(signal.SIGALRM)(signal.SIGALRM, None)  # The budget runs out just before disarming
+        return set_timer(which, seconds, *interval)
+
+    handler, memory = signal.getsignal(signal.SIGALRM), resource.getrlimit(resource.RLIMIT_AS)
+    monkeypatch.setattr(signal, "setitimer", late_timer)
+    with enforced(Budget(5.0, memory_bytes=1 << 30)):
+        pass
+    assert signal.getsignal(signal.SIGALRM) == handler
+    assert resource.getrlimit(resource.RLIMIT_AS) == memory
+
+def test_default_budget_applies_to_other_tasks():
+    """Test that the '*' budget covers tasks that are not single calculations, which fail with OperationTimeout."""
+    with CalculationPool(processes=1, start_method="fork", budgets={"*": Budget(0.2)}) as pool:
+        with pytest.raises(OperationTimeout):
+            pool.dispatch(time.sleep, (5,)).get(5)
+
+def test_budget_settings(monkeypatch):
+    """Test that budgets are read per operation, with '*' filling in for the other limit."""
+    assert parse_limits("power=2, *=0.5") == {"power": 2.0, "*": 0.5}
+    with pytest.raises(ValueError, match="positive limit"):
+        parse_limits("power=0")
+    monkeypatch.setenv("CALC_POOL_TIMEOUTS", "power=2,*=30")
+    monkeypatch.setenv("CALC_POOL_MEMORY_MB", "*=256")
+    assert budgets_from_environment() == {"power": Budget(2.0, 256 << 20), "*": Budget(30.0, 256 << 20)}
@@ -0,0 +1,89 @@
+"""Test the memoizing result cache"""
+
+# Standard library imports
+from decimal import Decimal, localcontext
+
+# Application-specific imports
+from app.cache import ResultCache, get_cache, set_cache, settings_from_environment
+from app.calculation import Calculation
+from app.operations import operations
+from app.pool import CalculationPool, PoolOptions, evaluate
+
+def _calc(a, b, name):
+    return Calculation(Decimal(a), Decimal(b), operations[name])
+
+def test_repeated_operands_hit_the_cache():
+    """Test that repeated operand pairs are answered from the cache."""
+    cache = ResultCache()
+    assert cache.perform("power", _calc("2", "10", "power")) == Decimal(1024)
+    assert cache.perform("power", _calc("2", "10", "power")) == Decimal(1024)
+    assert cache.stats() == (1, 1, 0)
+    assert cache.stats().hit_rate == 0.5
+
+def test_equal_operands_with_different_exponents_do_not_collide():
+    """Test that 1.0 and 1 are cached separately because their results print differently."""
+    cache = ResultCache()
+    assert str(cache.perform("add", _calc("1.0", "1", "add"))) == "2.0"
+    assert str(cache.perform("add", _calc("1", "1", "add"))) == "2"
+
+def test_decimal_context_is_part_of_the_key():
+    """Test that a result computed under one precision is not reused under another."""
+    cache = ResultCache()
+    with localcontext() as ctx:
+        ctx.prec = 5
+        short = cache.perform("divide", _calc("1", "3", "divide"))
+    assert short == Decimal("0.33333")
+    assert cache.perform("divide", _calc("1", "3", "divide")) == Decimal(1) / Decimal(3)
+
+def test_lru_eviction_by_entries_and_bytes():
+    """Test that the least recently used entries are evicted when a limit is reached."""
+    cache = ResultCache(max_entries=2)
+    for a in ("1", "2", "1", "3"):
+        cache.perform("add", _calc(a, "1", "add"))
+    assert len(cache) == 2
+    assert cache.stats().evictions == 1
+    cache.perform("add", _calc("1", "1", "add"))  # Most recently used, so it survived
+    assert cache.stats().hits == 2
+
+    tiny = ResultCache(max_bytes=1)
+    tiny.perform("add", _calc("1", "1", "add"))
+    assert len(tiny) == 0 and tiny.bytes == 0
+
+def test_per_operation_enable_and_disable():
+    """Test that caching can be restricted to selected operations."""
+    cache = ResultCache(enabled_operations=["power"])
+    cache.perform("add", _calc("1", "1", "add"))
+    assert cache.stats() == (0, 0, 0)
+    cache.enable("add")
+    cache.disable("power")
+    assert cache.is_enabled("add") and not cache.is_enabled("power")
+
+def test_evaluate_uses_the_process_cache():
+    """Test that evaluate consults the installed cache."""
+    previous = get_cache()
+    set_cache(ResultCache())
+    try:
+        evaluate("3", "4", "multiply")
+        assert evaluate("3", "4", "multiply").result == Decimal(12)
+        assert get_cache().stats().hits == 1
+    finally:
+        set_cache(previous)
+
+def test_pool_workers_share_cache_counters():
+    """Test that caches inside pool workers report through shared counters."""
+    with CalculationPool(processes=2, options=PoolOptions(cache_settings={"enabled_operations": ["power"]})) as pool:
+        for _ in range(4):
+            pool.run("9", "20", "power")
+        stats = pool.cache_stats()
+    assert stats.hits + stats.misses == 4
+    assert 1 <= stats.misses <= 2  # At most one miss per worker
+
+def test_settings_from_environment(monkeypatch):
+    """Test that caching is opt-in and configured through environment variables."""
+    monkeypatch.delenv("CALC_CACHE", raising=False)
+    assert settings_from_environment() is None
+    monkeypatch.setenv("CALC_CACHE", "1")
+    monkeypatch.setenv("CALC_CACHE_SIZE", "10")
+    monkeypatch.setenv("CALC_CACHE_OPS", "power, divide")
+    assert settings_from_environment() == {"max_entries": 10, "enabled_operations": ["power", "divide"]}
+    assert CalculationPool(processes=1).cache_stats() is None
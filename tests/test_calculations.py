@@ -75,3 +75,42 @@ def test_plugin_loading():
     expected_operations = {"add", "subtract", "multiply", "divide", "modulus", "power"}
     for op in expected_operations:
         assert op in operations, f"Operation '{op}' was not loaded"
+
+@pytest.fixture(name="bounded_history")
+def fixture_bounded_history():
+    """Fixture that bounds the history to three entries and restores an unbounded one afterwards."""
+    Calculations.clear_history()
+    yield
+    Calculations.configure(capacity=None)
+    Calculations.clear_history()
+
+def test_fifo_eviction_keeps_index_consistent(bounded_history):
+    """Test that the oldest entries are evicted from both the history and the index."""
+    _ = bounded_history
+    Calculations.configure(capacity=3, policy="fifo")
+    calcs = [Calculation(Decimal(i), Decimal(1), operations["add" if i % 2 else "subtract"]) for i in range(5)]
+    for calc in calcs:
+        Calculations.add_calculation(calc)
+    assert Calculations.get_history() == calcs[2:]
+    assert Calculations.find_by_operation("add") == [calcs[3]]
+    assert Calculations.find_by_operation("subtract") == [calcs[2], calcs[4]]
+    assert Calculations.get_latest() == calcs[4]
+
+def test_lru_eviction_spares_recently_found_entries(bounded_history):
+    """Test that looking an entry up protects it from LRU eviction."""
+    _ = bounded_history
+    Calculations.configure(capacity=3, policy="lru")
+    first = Calculation(Decimal(1), Decimal(1), operations["multiply"])
+    Calculations.add_calculation(first)
+    Calculations.add_calculation(Calculation(Decimal(2), Decimal(1), operations["add"]))
+    Calculations.add_calculation(Calculation(Decimal(3), Decimal(1), operations["add"]))
+    assert Calculations.find_by_operation("multiply") == [first]
+    Calculations.add_calculation(Calculation(Decimal(4), Decimal(1), operations["add"]))
+    assert first in Calculations.get_history()
+    assert [calc.a for calc in Calculations.find_by_operation("add")] == [Decimal(3), Decimal(4)]
+
+def test_configure_rejects_unknown_policy(bounded_history):
+    """Test that an unsupported eviction policy is rejected."""
+    _ = bounded_history
+    with pytest.raises(ValueError, match="Unknown eviction policy"):
+        Calculations.configure(capacity=3, policy="random")
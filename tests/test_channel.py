@@ -0,0 +1,59 @@
+"""Test the shared-memory channel that brings worker history back to the parent"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculations import Calculations, IndexedHistory
+from app.channel import RecordRing
+from app.pool import CalculationPool, PoolOptions
+
+@pytest.fixture(name="parent_history")
+def fixture_parent_history():
+    """Fixture that gives each test an empty parent history and restores the original afterwards."""
+    saved = Calculations.history
+    Calculations.history = IndexedHistory()
+    yield Calculations.history
+    Calculations.history = saved
+
+def test_ring_wraps_around_and_refuses_when_full():
+    """Test that records come out in order across the end of the buffer, and that a full ring refuses writes."""
+    ring = RecordRing(capacity=64)
+    assert ring.write(b"x" * 20) and ring.write(b"y" * 20)
+    assert not ring.write(b"z" * 20)  # 48 bytes used, 24 more needed
+    assert ring.drain() == [b"x" * 20, b"y" * 20]
+    assert not ring.drain()
+    for i in range(10):
+        record = bytes([i]) * (i + 1)
+        assert ring.write(record)
+        assert ring.drain() == [record]
+    assert not ring.write(b"w" * 61)
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_pool_calculations_reach_the_parent_history(parent_history, start_method):
+    """Test that calculations run on the workers are in this process's history once run() returns."""
+    with CalculationPool(processes=2, start_method=start_method) as pool:
+        pool.run("5", "3", "add")
+        assert [repr(calculation) for calculation in parent_history] == ["Calculation(5, 3, add)"]
+        for i in range(20):
+            pool.submit(str(i), "2", "multiply")
+        pool.run("4", "13", "497", "modpow")
+    assert len(parent_history) == 22
+    assert sorted(calculation.a for calculation in parent_history.find("multiply")) == [Decimal(i) for i in range(20)]
+    assert parent_history.latest().perform() == Decimal(445)
+
+def test_full_ring_falls_back_to_the_task_result(parent_history):
+    """Test that records too large for the ring still arrive, carried by the task result."""
+    with CalculationPool(processes=1, options=PoolOptions(history_ring_bytes=16)) as pool:
+        for i in range(5):
+            pool.run(str(i), "1", "subtract")
+    assert [calculation.a for calculation in parent_history] == [Decimal(i) for i in range(5)]
+
+def test_forwarding_can_be_turned_off(parent_history):
+    """Test that with no ring the workers keep their calculations to themselves, as before."""
+    with CalculationPool(processes=1, options=PoolOptions(history_ring_bytes=0)) as pool:
+        pool.run("5", "3", "add")
+    assert len(parent_history) == 0
@@ -0,0 +1,84 @@
+"""Test the columnar calculation history store"""
+
+# Standard library imports
+import gc
+import random
+import tracemalloc
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculation import Calculation
+from app.calculations import Calculations, IndexedHistory
+from app.columnar import ColumnarHistory, DecimalColumn
+from app.operations import operations
+
+@pytest.mark.parametrize("value", [
+    "0", "5", "-12.50", "1E+5", "3.14159265358979323846264338327950288", "-0", "NaN", "-Infinity", "123456789012345678901234567890",
+])
+def test_decimal_column_round_trip(value):
+    """Test that packing keeps the exact value, sign and exponent of a Decimal."""
+    column = DecimalColumn()
+    column.append(Decimal(value))
+    assert str(column[0]) == str(Decimal(value))
+
+def test_calculation_has_no_instance_dict():
+    """Test that Calculation uses __slots__ instead of a per-instance __dict__."""
+    assert not hasattr(Calculation(Decimal(1), Decimal(2), operations["add"]), "__dict__")
+
+def test_columnar_history_matches_indexed_history():
+    """Test that both stores give the same answers for the Calculations API."""
+    columnar, indexed = ColumnarHistory(), IndexedHistory()
+    for i in range(20):
+        calc = Calculation(Decimal(i) / 4, Decimal(-i), operations[["add", "divide", "power"][i % 3]])
+        columnar.append(calc)
+        indexed.append(calc)
+
+    assert len(columnar) == len(indexed) == 20
+    assert [repr(calc) for calc in columnar] == [repr(calc) for calc in indexed]
+    assert repr(columnar.latest()) == repr(indexed.latest())
+    for name in ("add", "divide", "operation", "missing"):
+        assert [repr(calc) for calc in columnar.find(name)] == [repr(calc) for calc in indexed.find(name)]
+    columnar.clear()
+    assert columnar.latest() is None and not columnar.find("add")
+
+def test_calculations_use_columnar_store():
+    """Test that Calculations can switch to the columnar store and keep its entries."""
+    Calculations.clear_history()
+    Calculations.add_calculation(Calculation(Decimal("10"), Decimal("5"), operations["add"]))
+    try:
+        Calculations.use_store(ColumnarHistory())
+        Calculations.add_calculation(Calculation(Decimal("20"), Decimal("3"), operations["subtract"]))
+        assert [calc.perform() for calc in Calculations.get_history()] == [Decimal(15), Decimal(17)]
+        assert Calculations.get_latest().a == Decimal("20")
+    finally:
+        Calculations.use_store(IndexedHistory())
+        Calculations.clear_history()
+
+def _measure(store, calculations):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for calc in calculations():
+        store.append(calc)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used
+
+@pytest.mark.benchmark
+def test_memory_benchmark_one_million_entries():
+    """Benchmark: bytes per entry of the object store versus the columnar store at 1M entries."""
+    count = 1_000_000
+    names = ["add", "subtract", "multiply", "divide", "modulus", "power"]
+
+    def calculations():
+        rng = random.Random(42)
+        for _ in range(count):
+            yield Calculation(Decimal(rng.randint(0, 99999)) / 100, Decimal(rng.randint(1, 99)), operations[rng.choice(names)])
+
+    indexed = _measure(IndexedHistory(), calculations)
+    columnar = _measure(ColumnarHistory(), calculations)
+    print(f"\nIndexedHistory: {indexed / count:.1f} B/entry, ColumnarHistory: {columnar / count:.1f} B/entry")
+    assert columnar * 4 < indexed
@@ -0,0 +1,101 @@
+"""Test the command handler and its compiled dispatch table"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.application import App
+from app.commands import Command, CommandHandler, Signature, signature_of
+from app.operations import operations
+
+class EchoCommand(Command):
+    """Command that returns its arguments."""
+    def execute(self, first, *rest):  # pylint: disable=arguments-differ
+        return (first,) + rest
+
+class GreetCommand(Command):
+    """Command without arguments."""
+    def execute(self):
+        return "hello"
+
+class FailingCommand(Command):
+    """Command that raises."""
+    def execute(self):
+        raise RuntimeError("broken")
+
+def test_operations_are_commands(capsys):
+    """Test that 'add 5 3' style lines run registered operations, plugins included."""
+    handler = CommandHandler()
+    assert handler.execute_command("add 5 3").result == Decimal(8)
+    assert handler.execute_command("modpow 4 13 497").result == Decimal(445)
+    assert capsys.readouterr().out.splitlines() == ["The result of 5 add 3 is equal to 8",
+                                                    "The result of modpow(4, 13, 497) is equal to 445"]
+
+def test_arguments_are_checked_against_the_signature(capsys):
+    """Test that lines with the wrong number of arguments are refused before the command runs."""
+    handler = CommandHandler()
+    handler.register_command("greet", GreetCommand())
+    handler.register_command("echo", EchoCommand())
+    assert handler.execute_command("greet") == "hello"
+    assert handler.execute_command("echo a") == ("a",)
+    assert handler.execute_command("echo a b c d") == ("a", "b", "c", "d")
+    assert handler.execute_command("greet extra") is None
+    assert handler.execute_command("echo") is None
+    assert handler.execute_command("add 1") is None
+    assert handler.execute_command("") is None
+    assert capsys.readouterr().out.splitlines() == ["greet takes 0 arguments, got 1", "echo takes at least 1 arguments, got 0",
+                                                    "add takes 2 arguments, got 1", "No such command: "]
+
+def test_table_follows_the_registries(capsys):
+    """Test that the table is rebuilt when a command is registered or the operations change."""
+    handler = CommandHandler()
+    handler.execute_command("add 1 1")
+    assert "greet" not in handler.compile()
+    handler.register_command("greet", GreetCommand())
+    assert handler.execute_command("greet") == "hello"
+
+    operations["double"] = lambda x, y: x * 2 * y
+    try:
+        assert handler.execute_command("double 3 1").result == Decimal(6)
+    finally:
+        del operations["double"]
+    assert handler.execute_command("double 3 1") is None
+    assert capsys.readouterr().out.splitlines()[-1] == "No such command: double"
+
+def test_commands_only_handler(capsys):
+    """Test that a handler can be built without the operations."""
+    handler = CommandHandler(operations=None)
+    assert handler.execute_command("add 5 3") is None
+    assert capsys.readouterr().out == "No such command: add\n"
+
+def test_signature_of():
+    """Test that execute() signatures are read once into minimum and maximum argument counts."""
+    assert signature_of(GreetCommand().execute) == Signature(0, 0)
+    assert signature_of(EchoCommand().execute) == Signature(1, None)
+    assert signature_of(lambda x, y=1: None) == Signature(1, 2)
+
+def test_menu_lists_every_command():
+    """Test that the menu names the operations, then the reductions, then the registered commands."""
+    handler = CommandHandler()
+    handler.register_command("greet", GreetCommand())
+    names = handler.names()
+    assert names[:4] == ["add", "subtract", "multiply", "divide"]
+    assert {"modpow", "sum", "variance"} <= set(names) and names[-1] == "greet"
+    assert handler.menu() == "Available commands: " + ", ".join(names)
+
+def test_repl_goes_on_after_a_failing_command(monkeypatch, capsys):
+    """Test that the App REPL reports a command that raises, serves the menu and reads on until 'exit'."""
+    monkeypatch.setattr(App, "configure_logging", lambda self: None)  # Keeps the root logger as pytest set it up
+    app = App()
+    app.command_handler.register_command("fail", FailingCommand())
+    lines = iter(["fail", "menu", "add 2 3", "exit"])
+    monkeypatch.setattr("builtins.input", lambda _: next(lines))
+    with pytest.raises(SystemExit):
+        app.start()
+    output = capsys.readouterr().out.splitlines()
+    assert output[0] == "An unexpected error occurred: broken"
+    assert output[1].startswith("Available commands: add, subtract") and "fail" in output[1]
+    assert output[2] == "The result of 2 add 3 is equal to 5"
@@ -0,0 +1,65 @@
+"""Test the configurable decimal context and its propagation to threads and workers"""
+
+# Standard library imports
+import decimal
+import threading
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.decimal_context import ContextSettings, active_settings, apply_settings, parse_rounding
+from app.evaluation import evaluate
+from app.pool import CalculationPool, PoolOptions
+
+@pytest.fixture(name="restore_context")
+def fixture_restore_context():
+    """Fixture that restores this thread's context and the template for new threads."""
+    saved = active_settings()
+    template = (decimal.DefaultContext.prec, decimal.DefaultContext.rounding)
+    yield
+    decimal.DefaultContext.prec, decimal.DefaultContext.rounding = template
+    apply_settings(saved)
+
+@pytest.mark.parametrize("name", ["ROUND_HALF_UP", "half_up", "Half-Up", " round_half_up "])
+def test_parse_rounding(name):
+    """Test that rounding modes are accepted with or without the ROUND_ prefix, in any case."""
+    assert parse_rounding(name) == decimal.ROUND_HALF_UP
+
+def test_settings_from_environment(monkeypatch):
+    """Test reading CALC_PRECISION and CALC_ROUNDING, and rejecting bad values."""
+    monkeypatch.delenv("CALC_PRECISION", raising=False)
+    monkeypatch.delenv("CALC_ROUNDING", raising=False)
+    assert ContextSettings.from_environment() == ContextSettings(28, decimal.ROUND_HALF_EVEN)
+    monkeypatch.setenv("CALC_PRECISION", "5")
+    monkeypatch.setenv("CALC_ROUNDING", "down")
+    assert ContextSettings.from_environment() == ContextSettings(5, decimal.ROUND_DOWN)
+    monkeypatch.setenv("CALC_ROUNDING", "sideways")
+    with pytest.raises(ValueError, match="Unknown rounding mode: sideways"):
+        ContextSettings.from_environment()
+    monkeypatch.setenv("CALC_PRECISION", "0")
+    with pytest.raises(ValueError, match="at least 1"):
+        ContextSettings.from_environment()
+
+@pytest.mark.usefixtures("restore_context")
+def test_applied_settings_reach_new_threads():
+    """Test that calculations use the applied context in this thread and in threads started later."""
+    apply_settings(ContextSettings(5, decimal.ROUND_DOWN))
+    assert evaluate("2", "3", "divide").result == Decimal("0.66666")
+    results = []
+    thread = threading.Thread(target=lambda: results.append(evaluate("2", "3", "divide").result))
+    thread.start()
+    thread.join()
+    assert results == [Decimal("0.66666")]
+
+@pytest.mark.usefixtures("restore_context")
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_pool_workers_use_the_parent_settings(start_method):
+    """Test that workers compute under the parent's context whatever the start method."""
+    apply_settings(ContextSettings(6, decimal.ROUND_UP))
+    with CalculationPool(processes=1, start_method=start_method) as pool:
+        assert pool.run("1", "3", "divide").result == Decimal("0.333334")
+    with CalculationPool(processes=1, start_method=start_method,
+                         options=PoolOptions(context_settings=ContextSettings(3, decimal.ROUND_HALF_EVEN))) as pool:
+        assert pool.run("1", "3", "divide").result == Decimal("0.333")
@@ -0,0 +1,92 @@
+"""Test the expression compiler and its plan cache"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.expressions import ExpressionError, PlanCache, compile_expression, evaluate_expression
+from app.operations import operations
+
+@pytest.mark.parametrize("text, value", [
+    ("add(2, 3)", Decimal(5)),
+    ("multiply(add(1, 2), subtract(10, 4))", Decimal(18)),
+    ("divide(1.5, -0.5)", Decimal(-3)),
+    ("power(2, modulus(10, 4))", Decimal(4)),  # Plugin operations
+    ("  ADD( 1e2 ,1 )  ", Decimal(101)),
+])
+def test_nested_expressions(text, value):
+    """Test that nested calls, including plugin operations, evaluate like chained calculations."""
+    assert evaluate_expression(text) == value
+
+def test_previous_results_and_variables():
+    """Test that $n, _ and named variables are bound when the plan runs."""
+    results = [Decimal(10), Decimal(4)]
+    assert evaluate_expression("subtract($1, _)", results=results) == Decimal(6)
+    assert evaluate_expression("multiply(rate, $2)", {"rate": Decimal("2.5")}, results) == Decimal(10)
+
+def test_repeated_subexpressions_are_evaluated_once():
+    """Test that identical subexpressions share one step of the plan."""
+    plan = compile_expression("add(multiply(x, 3), multiply(x, 3))")
+    assert [step.name for step in plan.steps] == ["multiply", "add"]
+
+    calls = []
+    steps = [step._replace(function=lambda *args, f=step.function: calls.append(args) or f(*args)) for step in plan.steps]
+    plan = plan._replace(steps=steps)
+    assert plan.evaluate({"x": 2}) == Decimal(12)
+    assert len(calls) == 2
+
+def test_cached_plan_is_reused_without_parsing(monkeypatch):
+    """Test that a cached plan runs with new operands without going through the parser."""
+    cache = PlanCache()
+    plan = cache.get("power(x, 2)")
+    monkeypatch.setattr("app.expressions._Compiler", None)  # Any parse would now fail
+    assert cache.get("power(x, 2)") is plan
+    assert [plan.evaluate({"x": x}) for x in range(4)] == [0, 1, 4, 9]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_plan_cache_follows_the_registry():
+    """Test that plans compiled before an operation is replaced are not reused."""
+    cache = PlanCache()
+    original = operations["add"]
+    assert cache.get("add(2, 3)").evaluate() == Decimal(5)
+    operations["add"] = lambda x, y: x + y + 1
+    try:
+        assert cache.get("add(2, 3)").evaluate() == Decimal(6)
+    finally:
+        operations["add"] = original
+    assert cache.get("add(2, 3)").evaluate() == Decimal(5)
+    assert cache.misses == 3
+
+def test_plan_cache_evicts_least_recently_used():
+    """Test that the plan cache stays within its size."""
+    cache = PlanCache(max_plans=2)
+    first = cache.get("add(1, 1)")
+    cache.get("add(1, 2)")
+    cache.get("add(1, 1)")
+    cache.get("add(1, 3)")
+    assert len(cache) == 2
+    assert cache.get("add(1, 1)") is first
+    assert cache.misses == 3
+
+@pytest.mark.parametrize("text, message", [
+    ("add(1, 2", "Unexpected end"),
+    ("add(1, 2))", "after the end"),
+    ("root(4, 2)", "Unknown operation: root"),
+    ("add(1; 2)", "Unexpected character"),
+    ("add($0, 1)", "start at \\$1"),
+    ("add($3, 1)", "No previous result for \\$3"),
+    ("add(x, 1)", "No value for variable 'x'"),
+])
+def test_invalid_expressions(text, message):
+    """Test that syntax and binding errors are reported as ExpressionError."""
+    with pytest.raises(ExpressionError, match=message):
+        evaluate_expression(text, results=[Decimal(1)])
+
+def test_operation_errors_propagate():
+    """Test that errors raised by an operation reach the caller unchanged."""
+    with pytest.raises(ZeroDivisionError, match="Cannot divide by zero"):
+        evaluate_expression("divide(1, subtract(2, 2))")
+    assert "divide" in operations
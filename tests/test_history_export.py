@@ -0,0 +1,132 @@
+"""Test streaming export and bulk import of the calculation history"""
+
+# Standard library imports
+import io
+import os
+import subprocess
+import sys
+import tracemalloc
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculation import Calculation
+from app.calculations import IndexedHistory
+from app.columnar import ColumnarHistory
+from app.history_export import export_history, import_history, read_csv, write_csv
+from app.history_log import LogHistory, read_records, write_records
+from app.operations import operations
+from app.startup import MAIN_SCRIPT
+
+def _history(count):
+    history = IndexedHistory()
+    for i in range(count):
+        if i % 5 == 0:
+            calculation = Calculation(Decimal(i), Decimal(3), operations["modpow"], Decimal(7), timestamp=1000.0 + i)
+        else:
+            calculation = Calculation(Decimal(i), Decimal("0.5"), operations["modulus" if i % 3 else "divide"],
+                                      timestamp=1000.0 + i)
+        if i % 4:
+            calculation.perform()
+        history.append(calculation)
+    return history
+
+def _fields(calculations):
+    return [(calc.operation.__name__, calc.a, calc.b, calc.c, calc.timestamp, calc.result) for calc in calculations]
+
+@pytest.mark.parametrize("fmt", ["csv", "binary"])
+def test_round_trip(tmp_path, fmt):
+    """Test that every field survives an export and an import, including missing results and third operands."""
+    history, path = _history(50), str(tmp_path / f"history.{fmt}")
+    exported = export_history(path, fmt, calculations=iter(history), batch_size=7)
+    assert exported.count == 50 and exported.size > 0
+    imported = ColumnarHistory()
+    assert import_history(path, store=imported, batch_size=8).count == 50
+    assert _fields(imported) == _fields(history)
+
+def test_binary_export_is_a_history_log(tmp_path):
+    """Test that a binary export opens as a LogHistory, and that a log imports in batches."""
+    path = str(tmp_path / "history.bin")
+    export_history(path, "binary", calculations=iter(_history(20)))
+    log = LogHistory(path)
+    assert len(log) == 20 and log[19].timestamp == 1019.0
+    target = LogHistory(str(tmp_path / "target.log"))
+    import_history(path, store=target, batch_size=6)
+    assert _fields(target) == _fields(log)
+    log.close()
+    target.close()
+
+def test_export_of_a_query(tmp_path):
+    """Test that a select() query can be exported like the whole history."""
+    path = str(tmp_path / "recent.csv")
+    assert export_history(path, calculations=_history(30).select(since=1025.0)).count == 5
+    imported = IndexedHistory()
+    import_history(path, store=imported)
+    assert [calc.a for calc in imported] == [Decimal(i) for i in range(25, 30)]
+
+class _Discard(io.RawIOBase):
+    """A binary stream that drops what is written to it."""
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return len(b)
+
+def _peak(write, count):
+    history = _history(count)
+    tracemalloc.start()
+    write(iter(history))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+@pytest.mark.parametrize("write", [
+    lambda calculations: write_records(calculations, io.BufferedWriter(_Discard()), chunk_size=100),
+    lambda calculations: write_csv(calculations, io.TextIOWrapper(io.BufferedWriter(_Discard()), newline=""), batch_size=100),
+], ids=["binary", "csv"])
+def test_export_memory_does_not_grow_with_the_history(write):
+    """Test that exporting ten times as many calculations takes about the same memory."""
+    assert _peak(write, 20_000) < 2 * _peak(write, 2_000)
+
+def test_invalid_input(tmp_path):
+    """Test that bad headers, bad rows and truncated binary files are reported."""
+    with pytest.raises(ValueError, match="Expected a CSV header"):
+        list(read_csv(io.StringIO("x,y,z\n")))
+    with pytest.raises(ValueError, match="Line 3 is not a valid calculation: add,one,2"):
+        list(read_csv(io.StringIO("operation,a,b\nadd,1,2\nadd,one,2\n")))
+    assert [calc.result for calc in read_csv(io.StringIO("operation,a,b\nadd,1,2\n"))] == [None]
+    path = tmp_path / "history.bin"
+    export_history(str(path), "binary", calculations=iter(_history(3)))
+    path.write_bytes(path.read_bytes()[:-2])
+    with pytest.raises(ValueError, match="ends inside a record"):
+        with open(path, "rb") as stream:
+            list(read_records(stream))
+    with pytest.raises(ValueError, match="Unknown history format"):
+        export_history(str(path), "xml")
+
+def _history_command(*args, log_env=None):
+    environment = {key: value for key, value in os.environ.items() if key != "CALC_HISTORY_LOG"}
+    if log_env:
+        environment["CALC_HISTORY_LOG"] = log_env
+    return subprocess.run([sys.executable, MAIN_SCRIPT, "history", *args], capture_output=True, text=True,
+                          env=environment, check=False)
+
+def test_import_then_export_across_runs(tmp_path):
+    """Test that what one run of 'main.py history import' stores, a later run exports."""
+    source, log, output = str(tmp_path / "in.csv"), str(tmp_path / "history.log"), str(tmp_path / "out.csv")
+    export_history(source, calculations=iter(_history(12)))
+    imported = _history_command("import", source, "--log", log)
+    assert imported.returncode == 0, imported.stderr
+    exported = _history_command("export", output, log_env=log)
+    assert exported.returncode == 0, exported.stderr
+    assert "Exported 12 calculations" in exported.stderr
+    with open(output, encoding="utf-8") as stream:
+        assert _fields(read_csv(stream)) == _fields(_history(12))
+
+def test_history_command_needs_a_log(tmp_path):
+    """Test that importing into a history kept in memory only is refused."""
+    completed = _history_command("import", str(tmp_path / "in.csv"))
+    assert completed.returncode == 1
+    assert "pass --log PATH or set CALC_HISTORY_LOG" in completed.stderr
@@ -0,0 +1,92 @@
+"""Test the durable append-only history log"""
+
+# Standard library imports
+import os
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculation import Calculation
+from app.calculations import Calculations, IndexedHistory
+from app.history_log import LogHistory
+from app.operations import operations
+from app.pool import CalculationPool
+
+@pytest.fixture(name="log_path")
+def fixture_log_path(tmp_path):
+    """Fixture that returns the location of a fresh log file."""
+    return str(tmp_path / "history.log")
+
+def _fill(log, count):
+    for i in range(count):
+        log.append(Calculation(Decimal(i), Decimal("0.5"), operations["modulus" if i % 2 else "add"]))
+
+def test_log_survives_reopen(log_path):
+    """Test that entries written to the log are served again after a restart."""
+    log = LogHistory(log_path)
+    _fill(log, 10)
+    log.close()
+
+    reopened = LogHistory(log_path)
+    assert len(reopened) == 10
+    assert reopened.latest().a == Decimal(9)
+    assert [calc.a for calc in reopened.find("add")] == [Decimal(i) for i in range(0, 10, 2)]
+    assert reopened[3].perform() == Decimal(3) % Decimal("0.5")  # Plugin operations resolve by registry name
+    reopened.close()
+
+def test_torn_record_is_dropped_on_open(log_path):
+    """Test that a record cut short by a crash does not hide later appends."""
+    log = LogHistory(log_path)
+    _fill(log, 3)
+    log.close()
+    with open(log_path, "ab") as handle:
+        handle.write(b"\x03\x05")  # A header that was only partially written
+
+    log = LogHistory(log_path)
+    log.append(Calculation(Decimal(7), Decimal(8), operations["multiply"]))
+    assert len(log) == 4
+    assert log.latest().perform() == Decimal(56)
+    log.close()
+
+def test_compact_and_clear(log_path):
+    """Test that compaction keeps only the newest entries and clear empties the log."""
+    log = LogHistory(log_path)
+    _fill(log, 10)
+    log.compact(keep_last=3)
+    assert [calc.a for calc in log] == [Decimal(7), Decimal(8), Decimal(9)]
+    assert [calc.a for calc in log.find("add")] == [Decimal(8)]
+    log.clear()
+    assert len(log) == 0 and log.latest() is None
+    log.close()
+
+def test_rotate(log_path):
+    """Test that rotation moves the current log aside and starts an empty one."""
+    log = LogHistory(log_path)
+    _fill(log, 2)
+    log.rotate()
+    assert len(log) == 0
+    assert len(LogHistory(f"{log_path}.1")) == 2
+    log.close()
+
+def test_rejects_foreign_file(log_path):
+    """Test that a file without the log header is not treated as a log."""
+    with open(log_path, "wb") as handle:
+        handle.write(b"not a calculation log")
+    with pytest.raises(ValueError, match="not a calculation history log"):
+        LogHistory(log_path)
+
+def test_pool_workers_record_into_log(log_path):
+    """Test that calculations evaluated in worker processes reach the shared log."""
+    Calculations.use_store(LogHistory(log_path))
+    try:
+        Calculations.clear_history()
+        with CalculationPool(processes=1, start_method="fork") as pool:
+            pool.run("6", "7", "multiply")
+            pool.run("2", "3", "power")
+        assert [calc.perform() for calc in Calculations.get_history()] == [Decimal(42), Decimal(8)]
+    finally:
+        Calculations.history.close()
+        Calculations.history = IndexedHistory()
+    assert os.path.getsize(log_path) > 0
@@ -0,0 +1,99 @@
+"""Test range and time-window queries over the calculation history"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculation import Calculation
+from app.calculations import Calculations, IndexedHistory
+from app.columnar import ColumnarHistory
+from app.history_log import LogHistory
+from app.history_query import Range, magnitude_at_least
+from app.operations import operations
+from app.pool import CalculationPool
+
+NOW = 1_700_000_000.0
+
+def _entry(x, y, name, seconds_ago):
+    """Returns a performed calculation made some seconds before NOW."""
+    calculation = Calculation(Decimal(x), Decimal(y), operations[name], timestamp=NOW - seconds_ago)
+    calculation.perform()
+    return calculation
+
+def _fill(store):
+    store.append(_entry(5_000_000, 2, "divide", 600))   # Too old
+    store.append(_entry(9_000_000, 3, "divide", 200))   # Matches
+    store.append(_entry(10, 3, "divide", 100))          # Result too small
+    store.append(_entry(-8_000_000, 4, "divide", 50))   # Matches, negative
+    store.append(_entry(9_000_000, 3, "multiply", 10))  # Other operation
+    return store
+
+@pytest.fixture(name="store", params=["indexed", "columnar", "log"])
+def fixture_store(request, tmp_path):
+    """Fixture that yields each kind of history store, filled with the same entries."""
+    store = {"indexed": IndexedHistory, "columnar": ColumnarHistory,
+             "log": lambda: LogHistory(str(tmp_path / "history.log"))}[request.param]()
+    yield _fill(store)
+    if request.param == "log":
+        store.close()
+
+def test_recent_large_divisions(store):
+    """Test the divisions of the last five minutes whose result is at least a million in absolute value."""
+    found = store.select("divide", since=NOW - 300, result=magnitude_at_least(10 ** 6))
+    assert sorted(calc.result for calc in found) == [Decimal(-2_000_000), Decimal(3_000_000)]
+
+def test_ranges_are_inclusive_and_combine(store):
+    """Test operand ranges, open ends and time windows on their own and together."""
+    assert [calc.a for calc in store.select(a=(10, 10))] == [Decimal(10)]
+    assert len(list(store.select(a=Range(low=9_000_000)))) == 2
+    assert len(list(store.select(until=NOW - 200))) == 2
+    assert [calc.operation.__name__ for calc in store.select(a=Range(low=0), b=(3, 3), since=NOW - 60)] == ["multiply"]
+    assert not list(store.select("add"))
+    with pytest.raises(ValueError, match="Cannot select on c, time"):
+        store.select(c=(1, 2), time=(0, 1))
+
+def test_appends_after_a_query_are_found(store):
+    """Test that entries added after the indexes were built are merged in by the next query."""
+    assert len(list(store.select(result=Range(high=0)))) == 1
+    store.append(_entry(-1, 1, "subtract", 0))
+    store.append(_entry(1, 1, "subtract", 5))  # Older than the latest entry, so the time index is re-sorted
+    assert len(list(store.select(result=Range(high=0)))) == 3
+    assert [calc.b for calc in store.select(since=NOW - 5)] == [Decimal(1), Decimal(1)]
+
+def test_evicted_entries_are_not_returned():
+    """Test that entries dropped from a bounded history disappear from query results."""
+    history = IndexedHistory(capacity=4)
+    for i in range(4):
+        history.append(_entry(i, 1, "add", 100 - i))
+    assert len(list(history.select(since=0))) == 4
+    for i in range(4, 10):
+        history.append(_entry(i, 1, "add", 100 - i))
+    assert [calc.a for calc in history.select(since=0)] == [Decimal(i) for i in range(6, 10)]
+    history.clear()
+    assert not list(history.select(since=0))
+
+def test_query_is_lazy():
+    """Test that a query returns an iterator that sees only entries present when it gets to them."""
+    history = IndexedHistory()
+    for i in range(1000):
+        history.append(_entry(i, 1, "add", 0))
+    matches = history.select(result=Range(low=1))
+    assert next(matches).a == Decimal(0)
+    history.clear()
+    assert next(matches, None) is None
+
+def test_query_through_calculations_and_pool():
+    """Test that timestamps and results recorded in pool workers reach the parent's history."""
+    Calculations.clear_history()
+    try:
+        with CalculationPool(processes=1, start_method="fork") as pool:
+            pool.run("6", "7", "multiply")
+            pool.run("9", "3", "divide")
+        found = list(Calculations.query(result=Range(low=10)))
+        assert [(calc.operation.__name__, calc.result) for calc in found] == [("multiply", Decimal(42))]
+        assert all(calc.timestamp > NOW for calc in Calculations.iterate())
+    finally:
+        Calculations.clear_history()
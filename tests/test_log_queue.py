@@ -0,0 +1,90 @@
+"""Test queued logging for the calculation hot path"""
+
+# Standard library imports
+import logging
+import queue
+import threading
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.log_queue import BoundedQueueHandler, QueuedLogging, get_queued_logging, start_queued_logging, stop_queued_logging
+from app.pool import CalculationPool
+
+class RecordingHandler(logging.Handler):
+    """Handler that remembers the messages it handled and the threads it ran on."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+@pytest.fixture(name="recording_root")
+def fixture_recording_root():
+    """Fixture that installs a RecordingHandler as the only root handler."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    handler = RecordingHandler()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    yield handler
+    stop_queued_logging()
+    root.removeHandler(handler)
+    for saved in saved_handlers:
+        root.addHandler(saved)
+    root.setLevel(saved_level)
+
+def test_drop_policy_counts_dropped_records():
+    """Test that a full queue drops records instead of blocking the caller."""
+    handler = BoundedQueueHandler(queue.Queue(2), policy="drop")
+    logger = logging.getLogger("test_drop_policy")
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(5):
+        logger.warning("record %d", i)
+    logger.removeHandler(handler)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+def test_unknown_policy_is_rejected():
+    """Test that only the drop and block policies are accepted."""
+    with pytest.raises(ValueError, match="Unknown queue policy"):
+        BoundedQueueHandler(queue.Queue(), policy="spill")
+
+def test_records_reach_original_handlers_from_listener_thread(recording_root):
+    """Test that the existing handlers keep receiving records, written by the listener thread."""
+    queued = start_queued_logging(QueuedLogging(queue_size=100, policy="block"))
+    assert get_queued_logging() is queued
+    assert logging.getLogger().handlers == [queued.handler]  # Every other handler moved to the listener
+    for i in range(50):
+        logging.info("Calculated: %d", i)
+    stop_queued_logging()
+
+    assert recording_root.messages == [f"Calculated: {i}" for i in range(50)]
+    assert threading.current_thread().name not in recording_root.threads
+    assert recording_root in logging.getLogger().handlers
+
+def test_worker_records_are_forwarded_to_parent(recording_root):
+    """Test that pool workers log through the parent's listener."""
+    start_queued_logging(QueuedLogging(queue_size=100, policy="block"))
+    with CalculationPool(processes=1, start_method="fork") as pool:
+        pool.run("6", "7", "multiply")
+    stop_queued_logging()
+    assert "Calculated: 6 multiply 7 = 42" in recording_root.messages
+
+def test_queued_logging_is_opt_in(monkeypatch):
+    """Test that queued logging is configured from the environment only when requested."""
+    monkeypatch.delenv("CALC_LOG_QUEUE", raising=False)
+    assert QueuedLogging.from_environment() is None
+    monkeypatch.setenv("CALC_LOG_QUEUE", "1")
+    monkeypatch.setenv("CALC_LOG_QUEUE_SIZE", "64")
+    monkeypatch.setenv("CALC_LOG_QUEUE_POLICY", "block")
+    config = QueuedLogging.from_environment()
+    assert (config.queue_size, config.policy) == (64, "block")
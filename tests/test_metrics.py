@@ -0,0 +1,126 @@
+"""Test per-operation latency histograms and counters"""
+
+# Standard library imports
+import sys
+import threading
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculation import Calculation
+from app.evaluation import evaluate
+from app.metrics import OPERATION, REQUEST, MetricsExporter, MetricsRegistry, metrics
+from app.operations import operations
+from app.pool import CalculationPool
+
+@pytest.fixture(name="fresh_metrics")
+def fixture_fresh_metrics():
+    """Fixture that starts and ends each test with empty process-wide counters."""
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+def test_counts_latency_and_errors_by_type(fresh_metrics):
+    """Test that Calculation.perform counts calls and failures under the operation's registry name."""
+    Calculation(Decimal(2), Decimal(10), operations["power"]).perform()
+    Calculation(Decimal(2), Decimal(3), operations["power"]).perform()
+    with pytest.raises(ZeroDivisionError):
+        Calculation(Decimal(1), Decimal(0), operations["divide"]).perform()
+
+    stats = {(row.family, row.name): row for row in fresh_metrics.stats()}
+    assert (stats[(OPERATION, "power")].calls, stats[(OPERATION, "power")].errors) == (2, 0)
+    assert (stats[(OPERATION, "divide")].calls, stats[(OPERATION, "divide")].errors) == (1, 1)
+    assert fresh_metrics.snapshot().errors == {(OPERATION, "divide", "ZeroDivisionError"): 1}
+
+def test_collect_while_recording_loses_nothing():
+    """Test that counters collected and snapshotted while threads record add up to every call."""
+    registry, collected, done = MetricsRegistry(), [], threading.Event()
+
+    def record(thread):
+        for i in range(5000):
+            registry.observe(OPERATION, f"op{thread}-{i % 50}", 100, "ValueError" if i % 2 else None)
+
+    def drain():
+        while not done.is_set():
+            registry.snapshot()
+            collected.append(registry.collect())
+
+    threads = [threading.Thread(target=record, args=(thread,)) for thread in range(4)]
+    drainer = threading.Thread(target=drain)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switches threads often enough to hit the races
+    try:
+        drainer.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        drainer.join()
+    finally:
+        sys.setswitchinterval(interval)
+    collected.append(registry.collect())
+    snapshots = [snapshot for snapshot in collected if snapshot is not None]
+    assert sum(series[0] for snapshot in snapshots for series in snapshot.series.values()) == 20_000
+    assert sum(count for snapshot in snapshots for count in snapshot.errors.values()) == 10_000
+
+def test_requests_are_timed_including_unknown_operations(fresh_metrics):
+    """Test that evaluate() records each request, folding unknown operations into one series."""
+    evaluate("5", "3", "add")
+    evaluate("x", "3", "add")
+    evaluate("5", "3", "bogus")
+    errors = fresh_metrics.snapshot().errors
+    assert errors == {(REQUEST, "add", "InvalidOperation"): 1, (REQUEST, "unknown", "UnknownOperation"): 1}
+    assert [row.calls for row in fresh_metrics.stats() if row.family == REQUEST] == [2, 1]
+
+def test_histogram_quantiles():
+    """Test that quantiles are reported as the upper bound of their power-of-two bucket."""
+    registry = MetricsRegistry()
+    for elapsed_ns in [1_000] * 98 + [1_000_000] * 2:
+        registry.observe(OPERATION, "add", elapsed_ns)
+    (row,) = registry.stats()
+    assert (row.calls, row.p50_ns, row.p99_ns) == (100, 1024.0, 2.0 ** 20)
+    assert row.mean_ns == pytest.approx(20_980)
+
+def test_collect_and_merge():
+    """Test that counters collected in one registry add up in another."""
+    worker, parent = MetricsRegistry(), MetricsRegistry()
+    parent.observe(OPERATION, "add", 100)
+    worker.observe(OPERATION, "add", 100, "ValueError")
+    worker.observe(OPERATION, "multiply", 100)
+    parent.merge(worker.collect())
+    assert worker.collect() is None
+    assert [(row.name, row.calls, row.errors) for row in parent.stats()] == [("add", 2, 1), ("multiply", 1, 0)]
+
+def test_worker_metrics_reach_the_parent(fresh_metrics):
+    """Test that calculations run on pool workers show up in the parent's counters."""
+    with CalculationPool(processes=2) as pool:
+        for i in range(10):
+            pool.run(str(i), "0" if i == 9 else "2", "divide")
+    rows = {(row.family, row.name): row for row in fresh_metrics.stats()}
+    assert (rows[(REQUEST, "divide")].calls, rows[(REQUEST, "divide")].errors) == (10, 1)
+    assert rows[(OPERATION, "divide")].calls == 10
+
+def test_disabled_registry_records_nothing(fresh_metrics, monkeypatch):
+    """Test that CALC_METRICS=0 style disabling skips recording in Calculation.perform."""
+    monkeypatch.setattr(fresh_metrics, "enabled", False)
+    Calculation(Decimal(1), Decimal(2), operations["add"]).perform()
+    assert fresh_metrics.stats() == []
+
+def test_prometheus_file_export(tmp_path):
+    """Test that the exporter writes cumulative histogram buckets and error counters."""
+    registry = MetricsRegistry()
+    registry.observe(OPERATION, "add", 1_500)
+    registry.observe(OPERATION, "add", 3_000_000, "ZeroDivisionError")
+    path = tmp_path / "calculator.prom"
+    exporter = MetricsExporter(str(path), interval=60, registry=registry).start()
+    exporter.stop()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert "# TYPE calc_operation_duration_seconds histogram" in lines
+    assert 'calc_operation_duration_seconds_bucket{operation="add",le="2.048e-06"} 1' in lines
+    assert 'calc_operation_duration_seconds_bucket{operation="add",le="+Inf"} 2' in lines
+    assert 'calc_operation_duration_seconds_count{operation="add"} 2' in lines
+    assert 'calc_operation_errors_total{operation="add",error="ZeroDivisionError"} 1' in lines
@@ -1,12 +1,14 @@
 """Test Operations with Dynamic Plugin Support"""
 
 # Standard library imports
+import os
+import sys
 from decimal import Decimal
 import pytest
 
 # Application-specific imports
 from app.calculation import Calculation
-from app.operations import operations  # Import dynamically loaded operations
+from app.operations import LazyOperations, operations, read_manifest  # Import dynamically loaded operations
 
 @pytest.mark.parametrize(
     "x, y, op_name, expected_result",
@@ -47,3 +49,50 @@ def test_plugin_discovery():
     # Explicitly check that functions are callable
     assert callable(operations["modulus"]), "Modulus operation is not callable"
     assert callable(operations["power"]), "Power operation is not callable"
+
+
+def _write_plugin_package(root, name, source):
+    package = root / "lazyplugins"
+    package.mkdir(exist_ok=True)
+    (package / "__init__.py").write_text("")
+    (package / f"{name}.py").write_text(source)
+    return package
+
+
+def test_manifest_lists_plugins_without_importing(tmp_path, monkeypatch):
+    """Ensure plugin discovery reads the manifest and defers imports to the first lookup."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    package = _write_plugin_package(tmp_path, "double", "def operation(a, b):\n    return (a + b) * 2\n")
+    (package / "helper.py").write_text("VALUE = 1\n")  # Not an operation plugin
+
+    assert read_manifest(str(package)) == {"double": 2}
+    assert (package / "__pycache__" / "operations-manifest.json").exists()
+
+    registry = LazyOperations({})
+    registry.register_lazy("double", "lazyplugins.double")
+    assert "double" in registry and list(registry) == ["double"]
+    assert "lazyplugins.double" not in sys.modules
+    assert registry["double"](Decimal(1), Decimal(2)) == Decimal(6)
+    assert "lazyplugins.double" in sys.modules
+    assert list(registry.loaded()) == ["double"]
+
+
+def test_manifest_invalidated_by_mtime(tmp_path):
+    """Ensure editing or adding a plugin file rebuilds the manifest."""
+    package = _write_plugin_package(tmp_path, "first", "VALUE = 1\n")
+    assert not read_manifest(str(package))
+
+    plugin = package / "first.py"
+    plugin.write_text("def operation(a, b):\n    return a\n")
+    os.utime(plugin, ns=(plugin.stat().st_atime_ns, plugin.stat().st_mtime_ns + 1_000_000_000))
+    (package / "second.py").write_text("from decimal import Decimal\noperation = max\n")
+    assert read_manifest(str(package)) == {"first": 2, "second": 2}
+
+
+def test_broken_plugin_is_dropped_on_lookup():
+    """Ensure a plugin that fails to import is removed from the registry instead of crashing later lookups."""
+    registry = LazyOperations({})
+    registry.register_lazy("ghost", "app.plugins.does_not_exist")
+    with pytest.raises(KeyError):
+        registry["ghost"]  # pylint: disable=pointless-statement
+    assert "ghost" not in registry
@@ -0,0 +1,124 @@
+"""Test the result cache file that is shared across processes and runs"""
+
+# Standard library imports
+import importlib.util
+import multiprocessing
+import time
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.cache import ResultCache, settings_from_environment
+from app.calculation import Calculation
+from app import persistent_cache
+from app.persistent_cache import PersistentCache, operation_version
+
+def slow_add(x, y):
+    """An operation expensive enough to be stored."""
+    time.sleep(0.002)
+    return x + y
+
+def _calc(x, y, func=slow_add):
+    return Calculation(Decimal(x), Decimal(y), func)
+
+@pytest.fixture(name="cache_file")
+def fixture_cache_file(tmp_path):
+    """Fixture that gives each test its own cache file."""
+    return str(tmp_path / "results.db")
+
+def test_results_survive_into_a_new_cache(cache_file):
+    """Test that a later run, with an empty memory cache, gets expensive results from the file."""
+    first = ResultCache.from_settings({"persistent": {"path": cache_file}})
+    assert first.perform("slow_add", _calc("1.5", "2")) == Decimal("3.5")
+    first.store.close()
+
+    second = ResultCache.from_settings({"persistent": {"path": cache_file}})
+    started = time.perf_counter()
+    result = second.perform("slow_add", _calc("1.5", "2"))
+    assert result == Decimal("3.5") and str(result) == "3.5"
+    assert time.perf_counter() - started < 0.002
+    assert second.stats() == (1, 0, 0)
+
+def test_cheap_results_are_not_stored(cache_file):
+    """Test that results faster to compute than to look up stay out of the file."""
+    cache = ResultCache.from_settings({"persistent": {"path": cache_file, "min_seconds": 0.001}})
+    cache.perform("add", _calc("1", "2", func=lambda x, y: x + y))
+    cache.perform("slow_add", _calc("1", "2"))
+    assert len(cache.store) == 1
+
+def test_size_cap_evicts_least_recently_used(cache_file):
+    """Test that the file is trimmed to 90% of max_entries once it holds more, oldest results first."""
+    store = PersistentCache(cache_file, max_entries=10)
+    keys = [("slow_add", str(i), "0", Decimal, ()) for i in range(75)]
+    for i, key in enumerate(keys):
+        store.put(slow_add, key, Decimal(i), 1.0)
+    assert len(store) == 9 + 10  # Trimmed when the 65th result was added; the cap is checked every 64 inserts
+    assert store.get(slow_add, keys[0]) is None
+    assert store.get(slow_add, keys[-1]) == Decimal(74)
+
+def test_results_stored_by_another_process_are_found(cache_file, monkeypatch):
+    """Test that a miss on an operation without results reads the list of operations again after a while."""
+    reader, writer = PersistentCache(cache_file, min_seconds=0), PersistentCache(cache_file, min_seconds=0)
+    key = ("slow_add", "1", "2", Decimal, ())
+    assert reader.get(slow_add, key) is None  # Connects, and notes that slow_add has no results
+    writer.put(slow_add, key, Decimal(3), 1.0)
+    monkeypatch.setattr(persistent_cache, "REFRESH_INTERVAL", 3600.0)
+    assert reader.get(slow_add, key) is None  # Not looked up again yet
+    monkeypatch.setattr(persistent_cache, "REFRESH_INTERVAL", 0.0)
+    assert reader.get(slow_add, key) == Decimal(3)
+
+def test_editing_a_plugin_invalidates_its_results(tmp_path, cache_file):
+    """Test that results are keyed on a hash of the file that defines the operation."""
+    plugin = tmp_path / "double.py"
+
+    def load(body):
+        plugin.write_text(f"def operation(a, b):\n    return {body}\n", encoding="utf-8")
+        spec = importlib.util.spec_from_file_location("double", plugin)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.operation
+
+    old = load("a * 2 + b")
+    old_version = operation_version(old)  # Worked out on first use, before the file is edited
+    new = load("a * 3 + b")
+    assert operation_version(new) != old_version
+    store = PersistentCache(cache_file, min_seconds=0)
+    key = ("double", "5", "0", Decimal, ())
+    store.put(old, key, Decimal(10), 1.0)
+    assert store.get(old, key) == Decimal(10)
+    assert store.get(new, key) is None
+    store.put(new, key, Decimal(15), 1.0)
+    assert len(store) == 1  # The old version's results were dropped
+
+def _fill(path, start):
+    cache = ResultCache.from_settings({"persistent": {"path": path, "min_seconds": 0}})
+    for i in range(start, start + 40):
+        cache.perform("slow_add", _calc(str(i), "1"))
+
+def test_concurrent_processes_share_the_file(cache_file):
+    """Test that several processes can write to the same file at once."""
+    processes = [multiprocessing.Process(target=_fill, args=(cache_file, start)) for start in (0, 20, 40)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    assert len(PersistentCache(cache_file)) == 80
+
+def test_unusable_file_disables_the_cache(tmp_path):
+    """Test that a file that is not a database turns the cache off instead of failing calculations."""
+    path = tmp_path / "not-a-database"
+    path.write_bytes(b"x" * 4096)
+    cache = ResultCache.from_settings({"persistent": {"path": str(path), "min_seconds": 0}})
+    assert cache.perform("slow_add", _calc("1", "2")) == Decimal(3)
+    assert cache.store.disabled
+
+def test_cache_file_settings(monkeypatch):
+    """Test that CALC_CACHE_FILE turns caching on with a cache file behind it."""
+    monkeypatch.delenv("CALC_CACHE", raising=False)
+    monkeypatch.setenv("CALC_CACHE_FILE", "results.db")
+    monkeypatch.setenv("CALC_CACHE_FILE_SIZE", "500")
+    monkeypatch.setenv("CALC_CACHE_FILE_MIN_US", "250")
+    assert settings_from_environment() == {"persistent": {"path": "results.db", "max_entries": 500, "min_seconds": 0.00025}}
@@ -0,0 +1,106 @@
+"""Test the power and modpow plugins and three-operand calculations"""
+
+# Standard library imports
+import io
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_HALF_UP, ROUND_UP, Decimal, localcontext
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.batch import run_batch
+from app.calculation import Calculation
+from app.columnar import ColumnarHistory
+from app.evaluation import evaluate
+from app.expressions import ExpressionError, evaluate_expression
+from app.history_log import LogHistory
+from app.operations import operations
+from app.plugins import power
+
+@pytest.mark.parametrize("base, exponent", [("9", "99999999"), ("1E+500000", "3"), ("0.5", "-10000000")])
+def test_oversized_results_are_rejected_up_front(base, exponent):
+    """Test that results beyond CALC_POWER_MAX_DIGITS fail fast with a clear message."""
+    with pytest.raises(ValueError, match="over the limit of 1000000"):
+        operations["power"](Decimal(base), Decimal(exponent))
+
+def test_limit_is_configurable(monkeypatch):
+    """Test that the digit limit comes from the module setting."""
+    monkeypatch.setattr(power, "MAX_DIGITS", 10)
+    assert operations["power"](Decimal(10), Decimal(10)) == Decimal("1E+10")
+    with pytest.raises(ValueError, match="about 11 digits"):
+        operations["power"](Decimal(10), Decimal(11))
+
+@pytest.mark.parametrize("base", ["4", "2", "0", "0.25", "1E+10", "2.00", "123456789", "863905186225"])
+@pytest.mark.parametrize("precision", [28, 5])
+def test_square_root_fast_path_matches_general_path(base, precision):
+    """Test that x power 0.5 gives exactly the digits the general exp/ln path gives."""
+    with localcontext() as ctx:
+        ctx.prec = precision
+        assert str(operations["power"](Decimal(base), Decimal("0.5"))) == str(Decimal(base) ** Decimal("0.5"))
+
+@pytest.mark.parametrize("base, rounding, root", [
+    ("3", ROUND_DOWN, "1.732050807"),
+    ("2", ROUND_UP, "1.414213563"),
+    ("2", ROUND_CEILING, "1.414213563"),
+    ("3", ROUND_HALF_UP, "1.732050808"),
+])
+def test_irrational_square_roots_follow_the_rounding_mode(base, rounding, root):
+    """Test that irrational roots are rounded with the context's rounding mode, not always half even."""
+    with localcontext() as ctx:
+        ctx.prec, ctx.rounding = 10, rounding
+        assert str(operations["power"](Decimal(base), Decimal("0.5"))) == root == str(Decimal(base) ** Decimal("0.5"))
+
+@pytest.mark.parametrize("rounding", [ROUND_DOWN, ROUND_UP, ROUND_CEILING])
+def test_exact_square_roots_in_any_rounding_mode(rounding):
+    """Test that exact roots stay exact under a directed rounding mode."""
+    with localcontext() as ctx:
+        ctx.prec, ctx.rounding = 5, rounding
+        assert str(operations["power"](Decimal("1E+10"), Decimal("0.5"))) == "1.0000E+5"
+        assert str(operations["power"](Decimal("0.25"), Decimal("0.5"))) == "0.50000"
+
+def test_integral_exponents_are_rounded_to_the_context():
+    """Test that large integral powers are rounded to the context precision."""
+    assert operations["power"](Decimal(2), Decimal(10)) == Decimal(1024)
+    assert str(operations["power"](Decimal(9), Decimal(30))) == str(+Decimal(9 ** 30))  # Unary plus rounds to the context
+
+def test_modpow():
+    """Test modular exponentiation on exact integers, including modular inverses."""
+    modpow = operations["modpow"]
+    assert operations.arity("modpow") == 3
+    assert modpow(Decimal(4), Decimal(13), Decimal(497)) == Decimal(445)
+    assert modpow(Decimal(2), Decimal(10 ** 18), Decimal(10 ** 9 + 7)) == Decimal(pow(2, 10 ** 18, 10 ** 9 + 7))
+    assert modpow(Decimal(3), Decimal(-1), Decimal(11)) == Decimal(4)
+    with pytest.raises(ZeroDivisionError):
+        modpow(Decimal(3), Decimal(2), Decimal(0))
+    with pytest.raises(ValueError, match="integer operands"):
+        modpow(Decimal("2.5"), Decimal(2), Decimal(7))
+
+def test_three_operand_requests():
+    """Test that evaluate(), batches and expressions accept operands up to the operation's arity."""
+    assert evaluate("4", "13", "497", "modpow").message == "The result of modpow(4, 13, 497) is equal to 445"
+    assert evaluate("4", "13", "modpow").message == "modpow takes 3 operands, got 2"
+    assert evaluate("1", "2", "3", "add").message == "add takes 2 operands, got 3"
+    assert evaluate("4", "x", "497", "modpow").message == "Invalid number input: 4, x or 497 is not a valid number."
+
+    output = io.StringIO()
+    run_batch([(1, "4 13 497 modpow"), (2, "1 2 3 add")], output)
+    assert output.getvalue().splitlines() == ["1\tok\t445", "2\terror\tadd takes 2 operands, got 3"]
+
+    assert evaluate_expression("add(modpow(4, 13, 497), 1)") == Decimal(446)
+    with pytest.raises(ExpressionError, match="modpow takes 3 operands"):
+        evaluate_expression("modpow(4, 13)")
+
+def test_third_operand_survives_history_stores(tmp_path):
+    """Test that columnar and log histories keep the third operand."""
+    calculations = [Calculation(Decimal(4), Decimal(13), operations["modpow"], Decimal(497)),
+                    Calculation(Decimal(1), Decimal(2), operations["add"])]
+    columnar, log = ColumnarHistory(), LogHistory(str(tmp_path / "history.log"))
+    for calculation in calculations:
+        columnar.append(calculation)
+        log.append(calculation)
+    log.close()
+    reopened = LogHistory(str(tmp_path / "history.log"))
+    for store in (columnar, reopened):
+        assert [repr(calculation) for calculation in store] == ["Calculation(4, 13, 497, operation)", "Calculation(1, 2, add)"]
+        assert [calculation.perform() for calculation in store] == [Decimal(445), Decimal(3)]
+    reopened.close()
@@ -0,0 +1,53 @@
+"""Test the persistent calculation worker pool"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.pool import CalculationPool, Outcome, evaluate
+
+@pytest.mark.parametrize("a_string, b_string, operation_string, expected_string", [
+    ("5", "3", "add", "The result of 5 add 3 is equal to 8"),
+    ("10", "3", "modulus", "The result of 10 modulus 3 is equal to 1"),  # Plugin test
+    ("1", "0", "divide", "An error occurred: Cannot divide by zero"),
+    ("9", "3", "unknown", "Unknown operation: unknown"),
+    ("a", "3", "add", "Invalid number input: a or 3 is not a valid number."),
+])
+def test_evaluate_returns_message(a_string, b_string, operation_string, expected_string):
+    """Test that evaluate describes the result instead of printing it."""
+    outcome = evaluate(a_string, b_string, operation_string)
+    assert outcome.message == expected_string
+
+def test_evaluate_returns_result():
+    """Test that a successful evaluation carries the Decimal result."""
+    assert evaluate("4", "5", "multiply") == Outcome(True, "The result of 4 multiply 5 is equal to 20", Decimal("20"))
+
+def test_pool_reused_across_calls():
+    """Test that one started pool serves several calculations."""
+    with CalculationPool(processes=1) as pool:
+        first = pool.run("2", "3", "power")
+        second = pool.run("20", "4", "divide")
+        assert pool.running
+    assert first.result == Decimal("8")
+    assert second.result == Decimal("5")
+    assert not pool.running
+
+def test_pool_terminates_on_keyboard_interrupt():
+    """Test that the pool is torn down when the caller is interrupted."""
+    pool = CalculationPool(processes=1)
+    with pytest.raises(KeyboardInterrupt):
+        with pool:
+            raise KeyboardInterrupt
+    assert not pool.running
+
+def test_pool_from_environment(monkeypatch):
+    """Test that the pool reads its configuration from environment variables."""
+    monkeypatch.setenv("CALC_POOL_SIZE", "3")
+    monkeypatch.setenv("CALC_POOL_START_METHOD", "spawn")
+    monkeypatch.setenv("CALC_POOL_MAX_TASKS", "100")
+    pool = CalculationPool.from_environment()
+    assert (pool.processes, pool.start_method, pool.options.max_tasks_per_worker) == (3, "spawn", 100)
+    assert not pool.running  # Configuring a pool does not start it
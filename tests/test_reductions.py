@@ -0,0 +1,99 @@
+"""Test the streaming reductions and how they are reached from the calculator's entry points"""
+
+# Standard library imports
+import io
+import random
+import statistics
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.backends import get_backend, set_backend
+from app.batch import evaluate_record
+from app.commands import CommandHandler
+from app.evaluation import evaluate
+from app.pool import CalculationPool
+from app.reductions import read_blocks, reduce_stream, reduce_values
+
+@pytest.fixture(name="backend")
+def fixture_backend():
+    """Fixture that restores the active backend after a test switches it."""
+    saved = get_backend().name
+    yield set_backend
+    set_backend(saved)
+
+def numbers_file(count, seed=0):
+    """Returns a stream of random numbers, a few to a line."""
+    rng = random.Random(seed)
+    numbers = [f"{rng.uniform(-1e6, 1e6):.3f}" for _ in range(count)]
+    lines = [" ".join(numbers[i:i + 3]) for i in range(0, count, 3)]
+    return io.BytesIO(("\n".join(lines) + "\n").encode()), numbers
+
+def test_blocks_end_at_line_boundaries():
+    """Test that no number is split between blocks, whatever the block size."""
+    stream = io.BytesIO(b"12 345\n6789\n\n10 11\n12")
+    blocks = list(read_blocks(stream, block_size=4))
+    assert b"".join(blocks) == b"12 345\n6789\n\n10 11\n12"
+    assert all(block.endswith(b"\n") for block in blocks[:-1])
+
+@pytest.mark.parametrize("backend_name", ["decimal", "float", "fraction"])
+@pytest.mark.parametrize("reduction", ["sum", "mean", "variance"])
+def test_result_does_not_depend_on_chunking(backend, backend_name, reduction):
+    """Test that partial results combine to the same value for any block size, close to the exact answer."""
+    backend(backend_name)
+    stream, numbers = numbers_file(3000)
+    results = set()
+    for block_size in (64, 1000, 1 << 20):
+        stream.seek(0)
+        summary = reduce_stream(reduction, stream, block_size=block_size)
+        assert summary.count == 3000
+        results.add(summary.result)
+    exact = {"sum": sum, "mean": statistics.mean, "variance": statistics.variance}[reduction]([Fraction(x) for x in numbers])
+    assert all(float(result) == pytest.approx(float(exact), rel=1e-12) for result in results)
+    assert len(results) == 1 or (backend_name, reduction) == ("float", "variance")  # Chan's update rounds per merge
+
+@pytest.mark.parametrize("backend_name", ["decimal", "float"])
+def test_sums_do_not_lose_small_terms(backend, backend_name):
+    """Test that Decimal sums are exact and float sums compensated, across blocks."""
+    backend(backend_name)
+    stream = io.BytesIO(b"1e20\n" + b"0.5\n" * 1000 + b"-1e20\n")
+    assert reduce_stream("sum", stream, block_size=100).result == 500
+
+def test_decimal_results_are_rounded_once(backend):
+    """Test that reductions round to the active context only at the end."""
+    backend("decimal")
+    assert reduce_values("variance", [Decimal(1), Decimal(2), Decimal(4)]) == Decimal("2.333333333333333333333333333")
+    assert reduce_values("product", [Decimal("1.1")] * 30) == Decimal("17.44940226888640731855880375")  # 1.1**30 rounded once
+    assert reduce_values("sum", [Decimal("1e30"), Decimal(1)]) == Decimal("1.000000000000000000000000000E+30")
+
+def test_reductions_on_the_pool(backend):
+    """Test that blocks reduced on the workers give the same result as in this process."""
+    backend("decimal")
+    stream, _ = numbers_file(5000, seed=1)
+    local = reduce_stream("mean", stream, block_size=2048).result
+    stream.seek(0)
+    with CalculationPool(processes=2) as pool:
+        summary = reduce_stream("mean", stream, pool=pool, block_size=2048)
+    assert summary.result == local and summary.blocks > 4
+
+def test_invalid_input_names_the_token():
+    """Test that a bad token and too short inputs are reported."""
+    with pytest.raises(InvalidOperation, match="3x is not a valid number"):
+        reduce_stream("sum", io.BytesIO(b"1 2\n3x 4\n"))
+    with pytest.raises(ValueError, match="at least two numbers"):
+        reduce_stream("variance", io.BytesIO(b"7\n"))
+    assert reduce_stream("sum", io.BytesIO(b"")).result == 0
+
+def test_reductions_from_the_entry_points(capsys):
+    """Test that reductions run like operations in evaluate(), batch records and the command handler."""
+    outcome = evaluate("1", "2", "3", "4", "mean")
+    assert outcome.result == Decimal("2.5") and outcome.message == "The result of mean(1, 2, 3, 4) is equal to 2.5"
+    assert evaluate("3", "variance").message == "variance takes at least 2 operands, got 1"
+    assert evaluate("2", "3", "product").message == "The result of product(2, 3) is equal to 6"
+    assert evaluate_record(7, "1.5 2.5 3 sum") == "7\tok\t7.0"
+    assert evaluate_record(8, "5 6 variance") == "8\tok\t0.5"
+    assert CommandHandler().execute_command("sum 1 2 3 4 5").result == Decimal(15)
+    assert capsys.readouterr().out == "The result of sum(1, 2, 3, 4, 5) is equal to 15\n"
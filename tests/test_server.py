@@ -0,0 +1,144 @@
+"""Test the asyncio calculation server on localhost"""
+
+# Standard library imports
+import asyncio
+import socket
+import struct
+import sys
+import time
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.operations import operations
+from app.pool import CalculationPool
+from app.server import USAGE, CalculationServer
+
+async def _exchange(reader, writer, lines):
+    """Sends all lines at once (pipelined) and reads one response per line."""
+    writer.write("".join(f"{line}\n" for line in lines).encode())
+    await writer.drain()
+    return [(await reader.readline()).decode().strip() for _ in lines]
+
+async def _run_clients(server, clients, open_connection):
+    listener = await server
+    async with listener:
+        connections = [await open_connection(listener) for _ in range(clients)]
+        requests = [[f"{client} {i} add" for i in range(20)] + ["1 0 divide", "nonsense"] for client in range(clients)]
+        responses = await asyncio.gather(*(_exchange(reader, writer, lines)
+                                           for (reader, writer), lines in zip(connections, requests)))
+        for _, writer in connections:
+            writer.write(b"exit\n")
+            writer.close()
+        return responses
+
+def _expected(client):
+    return [f"The result of {client} add {i} is equal to {client + i}" for i in range(20)] + \
+           ["An error occurred: Cannot divide by zero", USAGE]
+
+def test_concurrent_pipelined_clients_over_tcp():
+    """Test that several clients pipelining requests each get their responses in order."""
+    server = CalculationServer(max_pipeline=4)
+
+    async def open_tcp(listener):
+        return await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+
+    responses = asyncio.run(_run_clients(server.start_tcp(port=0), 5, open_tcp))
+    assert responses == [_expected(client) for client in range(5)]
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix domain sockets are not available on Windows")
+def test_unix_socket_with_worker_pool(tmp_path):
+    """Test that the server offloads work to the calculation pool over a Unix socket."""
+    path = str(tmp_path / "calc.sock")
+    with CalculationPool(processes=2) as pool:
+        server = CalculationServer(pool)
+
+        async def open_unix(_listener):
+            return await asyncio.open_unix_connection(path)
+
+        responses = asyncio.run(_run_clients(server.start_unix(path), 2, open_unix))
+    assert responses == [_expected(client) for client in range(2)]
+
+def test_menu_and_session_state():
+    """Test that the menu is served and each session counts its requests and keeps its latest outcome."""
+    server = CalculationServer()
+
+    async def scenario():
+        listener = await server.start_tcp(port=0)
+        async with listener:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            responses = await _exchange(reader, writer, ["menu", "2 3 power", "1 0 divide"])
+            responses += await _exchange(reader, writer, ["3 3 multiply"])  # Answered last, so kept as the latest outcome
+            session = server.sessions[0]
+            state = (session.requests, session.errors, session.last_outcome.result)
+            writer.write(b"quit\n")
+            await writer.drain()
+            assert await reader.read() == b""  # The server closes the connection on quit
+            writer.close()
+            return responses, state
+
+    responses, state = asyncio.run(scenario())
+    assert responses[0].startswith("Available commands: add, subtract, multiply, divide")
+    assert ", sum, mean, variance, product" in responses[0]
+    assert responses[1:] == ["The result of 2 power 3 is equal to 8", "An error occurred: Cannot divide by zero",
+                             "The result of 3 multiply 3 is equal to 9"]
+    assert state == (3, 1, 9)
+
+def nap(x, y):
+    """Takes a while, so that requests pile up behind it."""
+    time.sleep(0.02)
+    return x + y
+
+def test_requests_without_a_pool_are_evaluated_one_at_a_time():
+    """Test that a server without a pool never runs two calculations of this process at once."""
+    running, overlaps = [], []
+
+    def crowded(x, y):
+        running.append(x)
+        overlaps.append(len(running))
+        time.sleep(0.005)
+        running.remove(x)
+        return x + y
+
+    async def scenario():
+        listener = await CalculationServer(max_pipeline=8).start_tcp(port=0)
+        async with listener:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            responses = await _exchange(reader, writer, [f"{i} 1 crowded" for i in range(16)])
+            writer.close()
+            return responses
+
+    operations["crowded"] = crowded
+    try:
+        assert len(asyncio.run(scenario())) == 16
+    finally:
+        del operations["crowded"]
+    assert len(overlaps) == 16 and max(overlaps) == 1
+
+def test_client_resetting_a_full_pipeline_is_let_go():
+    """Test that a client resetting the connection with more than max_pipeline requests pending ends its session."""
+    server = CalculationServer(max_pipeline=2)
+
+    async def scenario():
+        listener = await server.start_tcp(port=0)
+        async with listener:
+            _, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write("".join(f"{i} 1 nap\n" for i in range(20)).encode())
+            await writer.drain()
+            while not server.sessions:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)  # The pipeline fills up while the first requests run
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.close()  # With a zero linger time, closing resets the connection
+            for _ in range(500):
+                if not server.sessions:
+                    break
+                await asyncio.sleep(0.01)
+            return len(server.sessions)
+
+    operations["nap"] = nap
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        del operations["nap"]
@@ -0,0 +1,54 @@
+"""Test cold-start behaviour and startup profiling of main.py"""
+
+# Standard library imports
+import subprocess
+import sys
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+import app
+from app.startup import MAIN_SCRIPT, benchmark_startup, parse_importtime
+
+def test_parse_importtime_groups_by_package():
+    """Test that import times are listed per app module and grouped per other package."""
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       500 |        500 |     logging.handlers",
+        "import time:      1500 |       2000 |   logging",
+        "import time:      2000 |       2000 | app.operations",
+        "2024-01-01 - root - INFO - not an import line",
+    ]
+    assert parse_importtime(lines) == {"logging": 2.0, "app.operations": 2.0}
+
+def test_one_shot_cli_defers_unneeded_imports():
+    """Test that a single calculation does not import the pool, the REPL or argparse."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", MAIN_SCRIPT, "5", "3", "add"],
+                               capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "The result of 5 add 3 is equal to 8"
+    imported = {line.split("|")[2].strip() for line in completed.stderr.splitlines() if line.startswith("import time:")}
+    for deferred in ("multiprocessing", "app.pool", "app.application", "app.commands", "pkgutil", "argparse", "app.batch"):
+        assert deferred not in imported, f"{deferred} should not be imported for a single calculation"
+
+def test_package_exports_are_lazy():
+    """Test that the names re-exported by the app package still resolve."""
+    assert app.App.__name__ == "App"
+    assert app.Calculation.__name__ == "Calculation"
+    with pytest.raises(AttributeError):
+        _ = app.NoSuchThing
+
+def test_profile_startup_mode():
+    """Test that --profile-startup reports imports, phases and the benchmark."""
+    completed = subprocess.run([sys.executable, MAIN_SCRIPT, "--profile-startup", "2", "3", "power"],
+                               capture_output=True, text=True, check=True)
+    assert "Import time by module" in completed.stdout
+    assert "calculation" in completed.stdout
+    assert "budget" in completed.stdout
+
+@pytest.mark.benchmark
+def test_startup_within_budget():
+    """Benchmark: a one-shot CLI calculation starts within CALC_STARTUP_BUDGET_MS."""
+    result = benchmark_startup(runs=15)
+    print(f"\n{result.report()}")
+    assert result.within_budget, result.report()
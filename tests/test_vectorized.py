@@ -0,0 +1,70 @@
+"""Test vectorized batch evaluation on the Calculator"""
+
+# Standard library imports
+import math
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.calculator import Calculator
+from app.calculations import Calculations
+from app.operations import operations
+
+np = pytest.importorskip("numpy")
+
+@pytest.mark.parametrize("operation, expected_values", [
+    ("add", [11, -1, 7]),
+    ("subtract", [9, -5, 1]),
+    ("multiply", [10, -6, 12]),
+    ("modulus", [0, -1, 1]),  # Plugin test: sign follows the dividend like Decimal
+    ("power", [10, 9, 64]),  # Plugin test
+])
+def test_integer_kernels(operation, expected_values):
+    """Test that integer batches run as int64 and match the Decimal results."""
+    result = Calculator.evaluate_batch(operation, [10, -3, 4], [1, 2, 3])
+    assert result.values.dtype == np.int64
+    assert result.values.tolist() == expected_values
+    exact = Calculator.evaluate_batch(operation, [10, -3, 4], [1, 2, 3], exact=True)
+    assert [int(value) for value in exact.values] == expected_values
+
+def test_divide_masks_zero_divisors():
+    """Test that division by zero is masked instead of aborting the batch."""
+    result = Calculator.evaluate_batch("divide", np.array([1.0, 4.0, 9.0]), np.array([2.0, 0.0, 3.0]))
+    assert result.errors.tolist() == [False, True, False]
+    assert result.values[0] == 0.5 and result.values[2] == 3.0
+    assert np.isnan(result.values[1])
+
+def test_exact_path_masks_zero_divisors():
+    """Test that the Decimal fallback reports failures through the same mask."""
+    result = Calculator.evaluate_batch("divide", [Decimal("1"), Decimal("1")], [Decimal("3"), Decimal("0")], exact=True)
+    assert result.values[0] == Decimal(1) / Decimal(3)
+    assert result.values[1] is None
+    assert result.errors.tolist() == [False, True]
+
+def test_int64_overflow_falls_back_to_exact():
+    """Test that results beyond int64 are computed exactly instead of wrapping around."""
+    result = Calculator.evaluate_batch("power", [2, 3], [70, 2])
+    assert result.values.tolist() == [Decimal(2) ** 70, Decimal(9)]
+
+def test_batch_is_not_recorded_in_history():
+    """Test that evaluating a batch leaves the calculation history untouched."""
+    Calculations.clear_history()
+    Calculator.evaluate_batch("add", np.arange(1000), np.arange(1000))
+    assert len(Calculations.history) == 0
+
+def test_batches_need_two_operand_operations():
+    """Test that a three-operand operation is refused up front instead of failing on every element."""
+    with pytest.raises(ValueError, match="modpow takes 3 operands"):
+        Calculator.evaluate_batch("modpow", [4, 5], [13, 2])
+
+def test_exact_path_masks_value_errors():
+    """Test that an operation raising ValueError for some elements only masks those."""
+    operations["scaled_root"] = lambda x, y: Decimal(math.sqrt(x)) * y  # math domain error below zero
+    try:
+        result = Calculator.evaluate_batch("scaled_root", [Decimal(9), Decimal(-4)], [Decimal(2), Decimal(2)])
+    finally:
+        del operations["scaled_root"]
+    assert result.values[0] == Decimal(6) and result.values[1] is None
+    assert result.errors.tolist() == [False, True]
@@ -0,0 +1,70 @@
+"""Test the synthetic workload generator and the replay driver"""
+
+# Standard library imports
+import io
+from collections import Counter
+
+# Third-party imports
+import pytest
+
+# Application-specific imports
+from app.evaluation import evaluate
+from app.pool import CalculationPool
+from app.workload import (ReplayOptions, WorkloadSpec, generate_workload, parse_mix, read_workload, replay,
+                          write_workload)
+
+def test_same_seed_gives_the_same_workload():
+    """Test that a workload is reproducible from its spec and seed, and that writing matches generating."""
+    spec = WorkloadSpec(seed=7, error_rate=0.1)
+    records = list(generate_workload(spec, 25_000))
+    assert records == list(generate_workload(spec, 25_000))
+    assert records != list(generate_workload(spec._replace(seed=8), 25_000))
+    output = io.StringIO()
+    assert write_workload(output, spec, 25_000) == 25_000
+    assert list(read_workload(io.StringIO(output.getvalue()))) == records
+
+def test_mix_and_error_rate_are_respected():
+    """Test that operations follow the weights, that operands are valid and only the requested share fails."""
+    spec = WorkloadSpec(mix=parse_mix("add=3,divide=1,modpow"), digits=3, error_rate=0.05, seed=1)
+    records = list(generate_workload(spec, 4000))
+    counts = Counter(record.split()[-1] for record in records)
+    assert counts["add"] > 2 * counts["divide"] > 0 and counts["modpow"] > 0
+    failures = sum(not evaluate(*record.split()).ok for record in records)
+    assert 100 < failures < 300
+
+def test_parse_mix_rejects_unknown_operations():
+    """Test that mixes name registered operations with positive weights."""
+    assert parse_mix("add, power=0.5") == {"add": 1.0, "power": 0.5}
+    with pytest.raises(ValueError, match="Unknown operation in mix: root"):
+        parse_mix("add=1,root=2")
+    with pytest.raises(ValueError, match="must be positive"):
+        parse_mix("add=0")
+
+@pytest.fixture(name="pool", scope="module")
+def fixture_pool():
+    """Fixture that shares one small pool between the replay tests."""
+    with CalculationPool(processes=2) as pool:
+        yield pool
+
+@pytest.mark.parametrize("mode", ["cli", "pool", "batch", "server"])
+def test_replay_modes_answer_every_record(pool, mode):
+    """Test that each entry point answers every record and reports the generated errors."""
+    records = list(generate_workload(WorkloadSpec(error_rate=0.1, seed=3), 300))
+    failures = sum(not evaluate(*record.split()).ok for record in records)
+    report = replay(records, mode, pool=pool, options=ReplayOptions(chunk_size=50))
+    assert (report.records, report.errors) == (300, failures)
+    assert len(report.latencies) == (6 if mode == "batch" else 300)
+    assert report.throughput > 0 and report.latency(50) <= report.latency(99) <= report.latency(100)
+
+def test_replay_keeps_to_the_target_rate():
+    """Test that a paced replay takes as long as its schedule and names the target in the report."""
+    report = replay(list(generate_workload(WorkloadSpec(), 50)), "cli", options=ReplayOptions(rate=500))
+    assert report.elapsed >= 49 / 500
+    assert "(target 500/s)" in report.report()
+
+def test_replay_needs_a_known_mode_and_a_pool():
+    """Test that replay() refuses unknown modes and pool modes without a pool."""
+    with pytest.raises(ValueError, match="Unknown replay mode"):
+        replay([], "carrier-pigeon")
+    with pytest.raises(ValueError, match="needs a pool"):
+        replay([], "batch")